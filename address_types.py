@@ -0,0 +1,162 @@
+# ============================================================
+# Address classification
+# 判斷地址屬於哪條鏈並驗證格式：BTC Base58Check / bech32 / bech32m、
+# BTC xpub / ypub / zpub、ETH EIP-55 checksum、Solana 32-byte 公鑰；支援整批地址一次分類
+#
+# Character sets are checked with str.translate tables (one C-level pass per
+# string), so most malformed input is rejected before any decoding. Only
+# candidates that pass are decoded: base58 two digits per step, bech32 via its
+# polymod checksum, and Keccak only for mixed-case 0x addresses.
+# ============================================================
+
+import hashlib
+
+B58_ALPHABET = "123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz"
+BECH32_CHARSET = "qpzry9x8gf2tvdw0s3jn54khce6mua7l"
+HEX_DIGITS = "0123456789abcdefABCDEF"
+
+B58_VALUES = {c: i for i, c in enumerate(B58_ALPHABET)}
+# Two-digit table: base58 is decoded two characters (one base-3364 digit) per step
+B58_PAIRS = {a + b: B58_VALUES[a] * 58 + B58_VALUES[b] for a in B58_ALPHABET for b in B58_ALPHABET}
+BECH32_VALUES = {c: i for i, c in enumerate(BECH32_CHARSET)}
+
+# str.translate tables deleting every valid character: valid input translates to ""
+B58_STRIP = str.maketrans("", "", B58_ALPHABET)
+BECH32_STRIP = str.maketrans("", "", BECH32_CHARSET)
+HEX_STRIP = str.maketrans("", "", HEX_DIGITS)
+
+BTC_BASE58_VERSIONS = {0x00, 0x05}  # P2PKH ('1...'), P2SH ('3...')
+# BIP32 / BIP49 / BIP84 account public keys (xpub / ypub / zpub), 78 bytes + checksum
+XPUB_VERSIONS = {bytes.fromhex("0488b21e"), bytes.fromhex("049d7cb2"), bytes.fromhex("04b24746")}
+XPUB_LENGTH = 111
+BTC_HRP = "bc"
+BECH32_CONST = 1
+BECH32M_CONST = 0x2BC830A3
+SOLANA_KEY_BYTES = 32
+
+
+def is_charset(text, strip_table):
+    """True when every character of text is in the table's alphabet"""
+    return text.isascii() and not text.translate(strip_table)
+
+
+def b58decode(text):
+    """Base58 string -> bytes (caller has checked the alphabet)"""
+    odd = len(text) & 1
+    n = B58_VALUES[text[0]] if odd else 0
+    for i in range(odd, len(text), 2):
+        n = n * 3364 + B58_PAIRS[text[i:i + 2]]
+    zeros = len(text) - len(text.lstrip("1"))
+    return b"\0" * zeros + n.to_bytes((n.bit_length() + 7) // 8, "big")
+
+
+# ============================================================
+# Per-format validators
+# ============================================================
+def is_base58check_btc(raw):
+    """Decoded legacy / P2SH address: version byte, 20-byte hash, double-SHA256 checksum"""
+    if len(raw) != 25 or raw[0] not in BTC_BASE58_VERSIONS:
+        return False
+    return hashlib.sha256(hashlib.sha256(raw[:21]).digest()).digest()[:4] == raw[21:]
+
+
+def is_extended_pubkey(addr):
+    """Mainnet xpub / ypub / zpub: 78-byte serialized key with a double-SHA256 checksum"""
+    if len(addr) != XPUB_LENGTH or addr[1:4] != "pub" or not is_charset(addr, B58_STRIP):
+        return False
+    raw = b58decode(addr)
+    if len(raw) != 82 or raw[:4] not in XPUB_VERSIONS:
+        return False
+    return hashlib.sha256(hashlib.sha256(raw[:78]).digest()).digest()[:4] == raw[78:]
+
+
+def bech32_polymod(values):
+    generator = (0x3B6A57B2, 0x26508E6D, 0x1EA119FA, 0x3D4233DD, 0x2A1462B3)
+    chk = 1
+    for value in values:
+        top = chk >> 25
+        chk = (chk & 0x1FFFFFF) << 5 ^ value
+        for i in range(5):
+            if (top >> i) & 1:
+                chk ^= generator[i]
+    return chk
+
+
+def is_segwit_btc(addr):
+    """bech32 (witness v0) / bech32m (v1+, e.g. taproot) mainnet address"""
+    if len(addr) > 90 or (addr != addr.lower() and addr != addr.upper()):
+        return False
+    addr = addr.lower()
+    hrp, sep, data = addr.rpartition("1")
+    if hrp != BTC_HRP or not sep or len(data) < 7 or not is_charset(data, BECH32_STRIP):
+        return False
+    values = [BECH32_VALUES[c] for c in data]
+    expanded = [ord(c) >> 5 for c in hrp] + [0] + [ord(c) & 31 for c in hrp]
+    const = bech32_polymod(expanded + values)
+    version = values[0]
+    if version > 16 or const != (BECH32_CONST if version == 0 else BECH32M_CONST):
+        return False
+    # 5-bit groups -> witness program bytes, without padding
+    acc = bits = 0
+    program = []
+    for value in values[1:-6]:
+        acc = acc << 5 | value
+        bits += 5
+        if bits >= 8:
+            bits -= 8
+            program.append(acc >> bits & 0xFF)
+    if bits >= 5 or acc & ((1 << bits) - 1):
+        return False
+    if not 2 <= len(program) <= 40:
+        return False
+    return version != 0 or len(program) in (20, 32)
+
+
+def is_eip55(addr):
+    """0x + 40 hex digits; mixed-case input must carry a valid EIP-55 checksum"""
+    if len(addr) != 42 or addr[:2] not in ("0x", "0X"):
+        return False
+    body = addr[2:]
+    if not is_charset(body, HEX_STRIP):
+        return False
+    if body == body.lower() or body == body.upper():
+        return True
+    return body == to_checksum_address(addr)[2:]
+
+
+def to_checksum_address(addr):
+    """EIP-55 mixed-case form of a 0x address"""
+    from eth_hash.auto import keccak  # only mixed-case checks need Keccak; imported on first use
+
+    body = addr[2:].lower()
+    digest = keccak(body.encode()).hex()
+    return "0x" + "".join(c.upper() if int(h, 16) >= 8 else c for c, h in zip(body, digest))
+
+
+# ============================================================
+# Classification
+# ============================================================
+def classify_address(addr):
+    """'bitcoin', 'ethereum', 'solana' or None for one address string"""
+    addr = addr.strip()
+    if addr[:2] in ("0x", "0X"):
+        return "ethereum" if is_eip55(addr) else None
+    if addr[:3].lower() == "bc1":
+        return "bitcoin" if is_segwit_btc(addr) else None
+    if len(addr) == XPUB_LENGTH:
+        return "bitcoin" if is_extended_pubkey(addr) else None
+    if not 25 <= len(addr) <= 44 or not is_charset(addr, B58_STRIP):
+        return None
+    raw = b58decode(addr)
+    # A 32-35 character '1' / '3' string may be either; the checksum decides
+    if addr[0] in "13" and is_base58check_btc(raw):
+        return "bitcoin"
+    if len(addr) >= 32 and len(raw) == SOLANA_KEY_BYTES:
+        return "solana"
+    return None
+
+
+def classify_addresses(addresses):
+    """Chain (or None) for each address, in order; repeated addresses are classified once"""
+    seen = {}
+    return [seen[addr] if addr in seen else seen.setdefault(addr, classify_address(addr)) for addr in addresses]
@@ -0,0 +1,298 @@
+# ============================================================
+# Headless batch mode
+# 批次分析大量錢包 (檔案清單或 KNOWN_WALLETS)，結果以 JSONL / Parquet 串流輸出
+#
+# Usage:
+#   python batch_lookup.py --input wallets.txt --output results.jsonl
+#   python batch_lookup.py --known --output results.parquet --concurrency 8
+#   python batch_lookup.py --known --traces traces.jsonl --metrics metrics.prom
+#   python batch_lookup.py --input wallets.txt --classify     # validate only, no upstream calls
+#
+# Provider rate limits are enforced by http_client, so raising
+# --concurrency only helps until the slowest provider's quota is saturated.
+# ============================================================
+
+import argparse
+import json
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from streamlit.logger import set_log_level
+
+# Cached fetchers warn about the missing Streamlit runtime when used headless
+set_log_level("error")
+
+import instrumentation
+from address_types import classify_addresses
+from known_wallets import KNOWN_WALLETS
+from tx_records import summaries
+from wallet_core import (
+    TX_PROCESSORS,
+    detect_address_type,
+    get_hyperliquid_positions,
+    resolve_ens,
+)
+
+DEFAULT_CONCURRENCY = 4
+PROGRESS_EVERY = 50  # wallets between throughput reports
+
+
+def analyse_wallet(address, label=None, include_hyperliquid=True, traced=False):
+    """Run the dashboard pipeline for one address and return a JSON-serialisable result
+
+    With traced=True the per-stage / per-request timing breakdown is added as result["trace"].
+    """
+    if traced:
+        with instrumentation.trace(address) as lookup:
+            result = analyse_wallet(address, label, include_hyperliquid)
+        result["trace"] = lookup.to_dict()
+        return result
+
+    started = time.monotonic()
+    result = {
+        "address": address,
+        "label": label,
+        "chain": None,
+        "transactions": [],
+        "hyperliquid": None,
+        "error": None,
+    }
+    try:
+        actual_addr = address.strip()
+        addr_type = detect_address_type(actual_addr)
+        if not addr_type and actual_addr.lower().endswith(".eth"):
+            resolved = resolve_ens(actual_addr)
+            if resolved:
+                actual_addr, addr_type = resolved, "ethereum"
+        result["resolved_address"] = actual_addr
+        result["chain"] = addr_type
+        if not addr_type:
+            result["error"] = "unknown address type"
+            return result
+
+        processor = TX_PROCESSORS.get(addr_type)
+        if processor:
+            # Typed record fields plus the one-line summary the dashboard shows
+            records = processor(actual_addr)
+            result["transactions"] = [
+                {**record.to_dict(), "summary": summary} for record, summary in zip(records, summaries(records))
+            ]
+        # Hyperliquid accounts are EVM addresses
+        if include_hyperliquid and addr_type == "ethereum":
+            result["hyperliquid"] = get_hyperliquid_positions(actual_addr)
+    except Exception as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+    finally:
+        result["elapsed_s"] = round(time.monotonic() - started, 3)
+    return result
+
+
+def iter_batch(wallets, concurrency=DEFAULT_CONCURRENCY, include_hyperliquid=True, traced=False):
+    """Analyse (address, label) pairs with bounded concurrency, yielding results as they finish
+
+    At most 2 * concurrency wallets are in flight, so arbitrarily long input
+    lists are streamed rather than submitted up front.
+    """
+    wallets = iter(wallets)
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        pending = set()
+        exhausted = False
+        while pending or not exhausted:
+            while not exhausted and len(pending) < concurrency * 2:
+                try:
+                    address, label = next(wallets)
+                except StopIteration:
+                    exhausted = True
+                    break
+                pending.add(pool.submit(analyse_wallet, address, label, include_hyperliquid, traced))
+            if not pending:
+                break
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in done:
+                yield fut.result()
+
+
+class JsonlWriter:
+    """One JSON object per line, flushed as each wallet completes"""
+
+    def __init__(self, path):
+        self._fh = sys.stdout if path == "-" else open(path, "w", encoding="utf-8")
+
+    def write(self, result):
+        self._fh.write(json.dumps(result, ensure_ascii=False, default=str) + "\n")
+        self._fh.flush()
+
+    def close(self):
+        if self._fh is not sys.stdout:
+            self._fh.close()
+
+
+class ParquetWriter:
+    """Parquet output written in row groups (requires pyarrow)
+
+    Nested fields (transactions, hyperliquid) are stored as JSON strings.
+    """
+
+    ROW_GROUP = 100
+
+    def __init__(self, path):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise SystemExit("Parquet output requires pyarrow: pip install pyarrow")
+        self._pa = pa
+        self._schema = pa.schema([
+            ("address", pa.string()),
+            ("label", pa.string()),
+            ("resolved_address", pa.string()),
+            ("chain", pa.string()),
+            ("tx_count", pa.int64()),
+            ("transactions", pa.string()),
+            ("hyperliquid", pa.string()),
+            ("error", pa.string()),
+            ("elapsed_s", pa.float64()),
+        ])
+        self._writer = pq.ParquetWriter(path, self._schema)
+        self._rows = []
+
+    def write(self, result):
+        self._rows.append({
+            "address": result["address"],
+            "label": result.get("label"),
+            "resolved_address": result.get("resolved_address"),
+            "chain": result.get("chain"),
+            "tx_count": len(result.get("transactions") or []),
+            "transactions": json.dumps(result.get("transactions") or [], ensure_ascii=False, default=str),
+            "hyperliquid": json.dumps(result.get("hyperliquid"), ensure_ascii=False, default=str),
+            "error": result.get("error"),
+            "elapsed_s": result.get("elapsed_s"),
+        })
+        if len(self._rows) >= self.ROW_GROUP:
+            self._flush()
+
+    def _flush(self):
+        if self._rows:
+            self._writer.write_table(self._pa.Table.from_pylist(self._rows, schema=self._schema))
+            self._rows = []
+
+    def close(self):
+        self._flush()
+        self._writer.close()
+
+
+def open_writer(path):
+    if path.endswith(".parquet"):
+        return ParquetWriter(path)
+    return JsonlWriter(path)
+
+
+def load_wallets(path=None, known=False):
+    """(address, label) pairs from a file (one address per line, '#' comments) and/or KNOWN_WALLETS"""
+    wallets = []
+    if known:
+        for label, meta in KNOWN_WALLETS.items():
+            if meta["status"] != "manual" and meta["address"]:
+                wallets.append((meta["address"], label))
+    if path:
+        with open(path, encoding="utf-8") as fh:
+            for line in fh:
+                line = line.split("#", 1)[0].strip()
+                if line:
+                    wallets.append((line, None))
+    return wallets
+
+
+def classify_wallets(wallets, output, log=sys.stderr):
+    """Write each wallet's chain (checksum-validated, no upstream calls); returns counts per chain
+
+    ENS names are reported as chain "ens" without being resolved.
+    """
+    chains = classify_addresses(address.strip() for address, _ in wallets)
+    counts = {}
+    writer = open_writer(output)
+    try:
+        for (address, label), chain in zip(wallets, chains):
+            if not chain and address.strip().lower().endswith(".eth"):
+                chain = "ens"
+            counts[chain or "invalid"] = counts.get(chain or "invalid", 0) + 1
+            writer.write({"address": address, "label": label, "chain": chain,
+                          "error": None if chain else "unknown address type"})
+    finally:
+        writer.close()
+    print(f"[batch] classified: {json.dumps(counts)}", file=log)
+    return counts
+
+
+def run_batch(wallets, output, concurrency=DEFAULT_CONCURRENCY, include_hyperliquid=True, log=sys.stderr,
+              traces=None, metrics=None):
+    """Analyse wallets, stream results to `output` and report throughput; returns summary stats
+
+    traces: JSONL file receiving one timing trace per wallet
+    metrics: file receiving the Prometheus metrics of the whole run
+    """
+    writer = open_writer(output)
+    trace_writer = JsonlWriter(traces) if traces else None
+    started = time.monotonic()
+    done = errors = records = 0
+    try:
+        for result in iter_batch(wallets, concurrency, include_hyperliquid, traced=bool(trace_writer)):
+            if trace_writer:
+                trace_writer.write(result.pop("trace"))
+            writer.write(result)
+            done += 1
+            records += len(result.get("transactions") or [])
+            if result.get("error"):
+                errors += 1
+            if done % PROGRESS_EVERY == 0:
+                elapsed = time.monotonic() - started
+                print(f"[batch] {done}/{len(wallets)} wallets, "
+                      f"{done / elapsed:.2f} wallets/s, {records / elapsed:.1f} tx/s", file=log)
+    finally:
+        writer.close()
+        if trace_writer:
+            trace_writer.close()
+
+    if metrics:
+        with open(metrics, "w", encoding="utf-8") as fh:
+            fh.write(instrumentation.get_metrics().render())
+
+    elapsed = time.monotonic() - started
+    stats = {
+        "wallets": done,
+        "errors": errors,
+        "transactions": records,
+        "elapsed_s": round(elapsed, 3),
+        "wallets_per_s": round(done / elapsed, 3) if elapsed else 0,
+        "tx_per_s": round(records / elapsed, 1) if elapsed else 0,
+    }
+    print(f"[batch] done: {json.dumps(stats)}", file=log)
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Analyse many wallets without the Streamlit UI")
+    parser.add_argument("--input", help="file with one address / ENS name per line")
+    parser.add_argument("--known", action="store_true", help="include every wallet in KNOWN_WALLETS")
+    parser.add_argument("--output", default="-", help="*.jsonl (default: stdout) or *.parquet")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY, help="wallets processed in parallel")
+    parser.add_argument("--no-hyperliquid", action="store_true", help="skip Hyperliquid positions")
+    parser.add_argument("--traces", help="write a per-wallet timing trace to this JSONL file")
+    parser.add_argument("--metrics", help="write Prometheus metrics for the run to this file")
+    parser.add_argument("--classify", action="store_true", help="only validate and classify the addresses")
+    args = parser.parse_args(argv)
+
+    if not args.input and not args.known:
+        parser.error("provide --input FILE and/or --known")
+
+    wallets = load_wallets(args.input, args.known)
+    if args.classify:
+        classify_wallets(wallets, args.output)
+        return
+    run_batch(wallets, args.output, max(1, args.concurrency), not args.no_hyperliquid,
+              traces=args.traces, metrics=args.metrics)
+
+
+if __name__ == "__main__":
+    main()
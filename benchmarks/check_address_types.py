@@ -0,0 +1,127 @@
+# ============================================================
+# Address classification known-answer check
+# 以 BIP-173 / BIP-350 / EIP-55 / BIP-32 規格中的測試向量與已知地址，驗證 address_types 的分類結果
+#
+# Usage:
+#   python -m benchmarks.check_address_types
+#
+# Every vector is (input, expected chain or None). Invalid vectors cover bad
+# checksums, bech32 vs bech32m constants, padding, program lengths, mixed
+# case, non-mainnet prefixes and corrupted Base58Check / xpub checksums.
+# Exits 1 on a mismatch.
+# ============================================================
+
+import sys
+
+# ============================================================
+# Vectors
+# ============================================================
+# BIP-173 (witness v0, bech32) and BIP-350 (v1+, bech32m) mainnet addresses
+SEGWIT_VALID = (
+    "BC1QW508D6QEJXTDG4Y5R3ZARVARY0C5XW7KV8F3T4",
+    "bc1qar0srrr7xfkvy5l643lydnw9re59gtzzwf5mdq",
+    "bc1qrp33g0q5c5txsp9arysrx4k6zdkfs4nce4xj0gdcccefvpysxf3qccfmv3",
+    "bc1pw508d6qejxtdg4y5r3zarvary0c5xw7kw508d6qejxtdg4y5r3zarvary0c5xw7kt5nd6y",
+    "BC1SW50QGDZ25J",
+    "bc1zw508d6qejxtdg4y5r3zarvaryvaxxpcs",
+    "bc1p0xlxvlhemja6c4dqv22uapctqupfhlxm9h8z3k2e72q4k9hcz7vqzk5jj0",
+)
+SEGWIT_INVALID = (
+    "bc1qw508d6qejxtdg4y5r3zarvary0c5xw7kv8f3t5",  # invalid checksum
+    "bc1p0xlxvlhemja6c4dqv22uapctqupfhlxm9h8z3k2e72q4k9hcz7vqh2y7hd",  # v1 with a bech32 checksum
+    "BC1S0XLXVLHEMJA6C4DQV22UAPCTQUPFHLXM9H8Z3K2E72Q4K9HCZ7VQ54WELL",  # v16 with a bech32 checksum
+    "bc1qw508d6qejxtdg4y5r3zarvary0c5xw7kemeawh",  # v0 with a bech32m checksum
+    "bc1p38j9r5y49hruaue7wxjce0updqjuyyx0kh56v8s25huc6995vvpql3jow4",  # 'o' is not in the charset
+    "BC130XLXVLHEMJA6C4DQV22UAPCTQUPFHLXM9H8Z3K2E72Q4K9HCZ7VQ7ZWS8R",  # witness version 17
+    "bc1pw5dgrnzv",  # 1-byte program
+    "bc10w508d6qejxtdg4y5r3zarvary0c5xw7kw508d6qejxtdg4y5r3zarvary0c5xw7kw5rljs90",  # 41-byte program
+    "bc1p0xlxvlhemja6c4dqv22uapctqupfhlxm9h8z3k2e72q4k9hcz7v8n0nx0muaewav253zgeav",  # 41-byte program
+    "BC1QR508D6QEJXTDG4Y5R3ZARVARYV98GJ9P",  # 16-byte v0 program
+    "bc1p0xlxvlhemja6c4dqv22uapctqupfhlxm9h8z3k2e72q4k9hcz7vq47Zagq",  # mixed case
+    "bc1zw508d6qejxtdg4y5r3zarvaryvqyzf3du",  # invalid padding
+    "bc1p0xlxvlhemja6c4dqv22uapctqupfhlxm9h8z3k2e72q4k9hcz7v07qwwzcrf",  # more than 4 padding bits
+    "bc1p0xlxvlhemja6c4dqv22uapctqupfhlxm9h8z3k2e72q4k9hcz7vpggkg4j",  # non-zero padding
+    "bc1gmk9yu",  # empty data part
+    "tb1qrp33g0q5c5txsp9arysrx4k6zdkfs4nce4xj0gdcccefvpysxf3q0sl5k7",  # testnet
+)
+
+# EIP-55: spec examples (all-caps, all-lower and checksummed mixed case)
+EIP55_CHECKSUMMED = (
+    "0x5aAeb6053F3E94C9b9A09f33669435E7Ef1BeAed",
+    "0xfB6916095ca1df60bB79Ce92cE3Ea74c37c5d359",
+    "0xdbF03B407c01E7cD3CBea99509d93f8DDDC8C6FB",
+    "0xD1220A0cf47c7B9Be7A2E6BA89F429762e7b9aDb",
+)
+EIP55_VALID = EIP55_CHECKSUMMED + (
+    "0x52908400098527886E0F7030069857D2E4169EE7",
+    "0x8617E340B3D01FA5F11F306F4090FD50E238070D",
+    "0xde709f2102306220921060314715629080e2fb77",
+    "0x27b1fdb04752bbc536007a920d24acb045561c26",
+)
+EIP55_INVALID = (
+    "0x5aAeb6053F3E94C9b9A09f33669435E7Ef1BeAeD",  # one letter's case flipped
+    "0xFb6916095ca1df60bB79Ce92cE3Ea74c37c5d359",
+    "0x5aAeb6053F3E94C9b9A09f33669435E7Ef1BeAe",  # 39 digits
+    "0x5aAeb6053F3E94C9b9A09f33669435E7Ef1BeAedd",  # 41 digits
+    "0x5aAeb6053F3E94C9b9A09f33669435E7Ef1BeAeg",  # non-hex
+)
+
+# Base58Check P2PKH / P2SH, BIP-32 test vector 1 master xpub
+BASE58_VALID = (
+    "1A1zP1eP5QGefi2DMPTfTL5SLmv7DivfNa",
+    "3J98t1WpEZ73CNmQviecrnyiWrnqRhWNLy",
+    "xpub661MyMwAqRbcFtXgS5sYJABqqG9YLmC4Q1Rdap9gSE8NqtwybGhePY2gZ29ESFjqJoCu1Rupje8YtGqsefD265TMg7usUDFdp6W1EGMcet8",
+)
+BASE58_INVALID = (
+    "1A1zP1eP5QGefi2DMPTfTL5SLmv7DivfNb",  # corrupted checksum
+    "3J98t1WpEZ73CNmQviecrnyiWrnqRhWNLz",
+    "1A1zP1eP5QGefi2DMPTfTL5SLmv7DivfN0",  # '0' is not base58
+    "xpub661MyMwAqRbcFtXgS5sYJABqqG9YLmC4Q1Rdap9gSE8NqtwybGhePY2gZ29ESFjqJoCu1Rupje8YtGqsefD265TMg7usUDFdp6W1EGMcet9",
+    # private key, never accepted
+    "xprv9s21ZrQH143K3QTDL4LXw2F7HEK3wJUD2nW2nRk4stbPy6cq3jPPqjiChkVvvNKmPGJxWUtg6LnF5kejMRNNU3TGtRBeJgk33yuGBxrMPHi",
+)
+
+# Solana public keys, including '1' / '3' prefixes that look like legacy BTC
+SOLANA_VALID = (
+    "11111111111111111111111111111111",  # System Program: 32 zero bytes, BTC-length
+    "1nc1nerator11111111111111111111111111111111",
+    "3zFqfiRPEoshgaZY7qCcSk6mihDhgnGodBDgqP92stci",
+    "TokenkegQfeZyiNwAJbNbGKPFXCWuBvf9Ss623VQ5DA",
+    "EPjFWdd5AufqSSqeM2qN1xzybapC8G4wEGGkZwyTDt1v",
+)
+SOLANA_INVALID = (
+    "1111111111111111111111111111111",  # 31 zero bytes
+    "z" * 44,  # 33-byte value
+    "EPjFWdd5AufqSSqeM2qN1xzybapC8G4wEGGkZwyTDt1vI",  # 'I' is not base58
+)
+
+VECTORS = (
+    [(a, "bitcoin") for a in SEGWIT_VALID + BASE58_VALID]
+    + [(a, "ethereum") for a in EIP55_VALID]
+    + [(a, "solana") for a in SOLANA_VALID]
+    + [(a, None) for a in SEGWIT_INVALID + EIP55_INVALID + BASE58_INVALID + SOLANA_INVALID]
+    + [(" 1A1zP1eP5QGefi2DMPTfTL5SLmv7DivfNa\n", "bitcoin"), ("", None), ("vitalik.eth", None)]
+)
+
+
+def main():
+    from address_types import classify_address, classify_addresses, to_checksum_address
+
+    failures = [(addr, want, got) for addr, want in VECTORS if (got := classify_address(addr)) != want]
+    for addr in EIP55_CHECKSUMMED:
+        got = to_checksum_address(addr.lower())
+        if got != addr:
+            failures.append((addr.lower(), addr, got))
+    batch = [addr for addr, _ in VECTORS]
+    if classify_addresses(batch + batch) != [classify_address(addr) for addr in batch] * 2:
+        failures.append(("classify_addresses", "classify_address per item", "a different list"))
+
+    for addr, want, got in failures:
+        print(f"MISMATCH {addr!r}: expected {want}, got {got}", file=sys.stderr)
+    if failures:
+        sys.exit(1)
+    print(f"OK: {len(VECTORS)} classification and {len(EIP55_CHECKSUMMED)} checksum vectors")
+
+
+if __name__ == "__main__":
+    main()
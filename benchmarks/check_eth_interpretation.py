@@ -0,0 +1,189 @@
+# ============================================================
+# Ethereum interpretation equivalence check
+# 以隨機 (含異常值) 的 txlist / tokentx 批次，比對向量化解析與原本逐筆迴圈的輸出是否逐列一致
+#
+# Usage:
+#   python -m benchmarks.check_eth_interpretation
+#   python -m benchmarks.check_eth_interpretation --batches 50 --size 400 --seed 7
+#
+# The reference below is the per-row loop that interpret_eth_transfers /
+# interpret_eth_token_transfers replaced. Both sides are compared on the
+# rows the dashboard shows (時間 / 摘要 / Tx Hash), under several local
+# timezones (DST, half- and quarter-hour offsets). Exits 1 on a mismatch.
+# ============================================================
+
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime
+
+from benchmarks.run import prepare_environment
+
+TIMEZONES = ("UTC", "America/New_York", "Europe/London", "Asia/Kolkata", "Asia/Kathmandu",
+             "Australia/Lord_Howe", "Asia/Taipei")
+ADDRESS = "0x1111111111111111111111111111111111111111"
+
+
+# ============================================================
+# Reference: the per-row loop
+# ============================================================
+def reference_eth_tx(tx, address, staking, is_token=False):
+    from tx_records import format_address
+
+    if not is_token:
+        try:
+            value = int(tx.get("value", 0)) / 1e18
+        except (ValueError, TypeError):
+            value = 0
+        from_addr = tx.get("from", "").lower()
+        to_addr = tx.get("to", "").lower()
+        if from_addr == address.lower():
+            if to_addr in staking:
+                return f"🪙 質押 {value:.4f} ETH 至 {staking[to_addr]}"
+            return f"💸 轉出 {value:.4f} ETH 給 {format_address(to_addr)}"
+        if from_addr in staking:
+            return f"💎 解質押/獎勵 {value:.4f} ETH 來自 {staking[from_addr]}"
+        return f"📥 接收 {value:.4f} ETH 來自 {format_address(from_addr)}"
+    token = tx.get("tokenSymbol", "")
+    try:
+        value = int(tx.get("value", 0)) / (10 ** int(tx.get("tokenDecimal", 18)))
+    except (ValueError, TypeError, ZeroDivisionError):
+        value = 0
+    if tx.get("from", "").lower() == address.lower():
+        return f"💰 轉出 {value:.4f} {token} 給 {format_address(tx.get('to', ''))}"
+    return f"📥 接收 {value:.4f} {token} 來自 {format_address(tx.get('from', ''))}"
+
+
+def reference_row(timestamp, desc, h):
+    return (datetime.fromtimestamp(timestamp).strftime("%Y-%m-%d %H:%M"), desc, f"{h[:8]}...{h[-6:]}")
+
+
+def reference_transfers(eth_txs, address, staking):
+    rows = []
+    for tx in eth_txs:
+        try:
+            rows.append(reference_row(int(tx["timeStamp"]), reference_eth_tx(tx, address, staking), tx["hash"]))
+        except (ValueError, KeyError):
+            continue
+    return rows
+
+
+def reference_token_transfers(token_txs, address, staking):
+    groups = {}
+    for tx in token_txs:
+        if "hash" in tx:
+            groups.setdefault(tx["hash"], []).append(tx)
+    rows = []
+    for tx_hash, transfers in groups.items():
+        if len(transfers) >= 2:
+            sent, received, timestamp = [], [], 0
+            for tx in transfers:
+                try:
+                    token = tx.get("tokenSymbol", "Token")
+                    value = int(tx.get("value", 0)) / (10 ** int(tx.get("tokenDecimal", 18)))
+                    timestamp = int(tx.get("timeStamp", 0))
+                    if tx.get("from", "").lower() == address.lower():
+                        sent.append(f"{value:.4f} {token}")
+                    elif tx.get("to", "").lower() == address.lower():
+                        received.append(f"{value:.4f} {token}")
+                except (ValueError, TypeError, ZeroDivisionError, KeyError):
+                    continue
+            if sent and received:
+                rows.append(reference_row(timestamp, f"💱 兌換 {', '.join(sent)} → {', '.join(received)}", tx_hash))
+                continue
+        for tx in transfers:
+            try:
+                rows.append(reference_row(int(tx["timeStamp"]), reference_eth_tx(tx, address, staking, True), tx["hash"]))
+            except (ValueError, KeyError):
+                continue
+    return rows
+
+
+# ============================================================
+# Random batches with malformed fields
+# ============================================================
+def random_value(rng):
+    return rng.choice([
+        str(rng.randrange(10 ** 12, 10 ** 20)), str(rng.randrange(10 ** 6)), "0", str(10 ** 40 + rng.randrange(10 ** 9)),
+        " 1500000000000000000 ", "-25", "12.5", "1e18", "abc", "",
+    ])
+
+
+def random_batch(rng, size, staking):
+    peers = [f"0x{rng.getrandbits(160):040x}" for _ in range(8)] + list(staking)
+    me = rng.choice([ADDRESS, ADDRESS.upper().replace("0X", "0x")])
+    eth, tokens = [], []
+    ts = 1_700_000_000
+    for i in range(size):
+        ts -= rng.randrange(0, 400_000)
+        out = rng.random() < 0.5
+        peer = rng.choice(peers)
+        eth.append({"timeStamp": rng.choice([str(ts)] * 8 + [f" {ts} ", "x"]), "hash": f"0x{i:064x}",
+                    "from": me if out else peer, "to": peer if out else me, "value": random_value(rng)})
+        if rng.random() < 0.02:
+            del eth[-1]["timeStamp"]
+    i = 0
+    while len(tokens) < size:
+        h = f"0x{10 ** 6 + i:064x}"
+        i += 1
+        ts -= rng.randrange(0, 400_000)
+        for _ in range(rng.choice([1, 1, 2, 3])):
+            side = rng.random()
+            peer = rng.choice(peers)
+            tokens.append({
+                "timeStamp": rng.choice([str(ts)] * 10 + ["", "y"]), "hash": h,
+                "from": me if side < 0.45 else peer, "to": peer if side < 0.45 else (me if side < 0.9 else peer),
+                "value": random_value(rng), "tokenSymbol": rng.choice(["USDC", "WETH", "PEPE", ""]),
+                "tokenDecimal": rng.choice(["18", "6", "0", "30", "-2", "x", "8"]),
+            })
+    return eth, tokens
+
+
+def vectorised_rows(records):
+    from tx_records import display_frame
+
+    df = display_frame(records)
+    return list(zip(df["時間"], df["摘要"], df["Tx Hash"]))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare vectorised Ethereum interpretation with the per-row loop")
+    parser.add_argument("--batches", type=int, default=20)
+    parser.add_argument("--size", type=int, default=300)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args(argv)
+
+    prepare_environment()
+    import wallet_core
+
+    staking = wallet_core.ETH_STAKING_CONTRACTS
+    rng = random.Random(args.seed)
+    batches = [random_batch(rng, args.size, staking) for _ in range(args.batches)]
+    mismatches = 0
+    for zone in TIMEZONES:
+        os.environ["TZ"] = zone
+        time.tzset()
+        rows = 0
+        for eth, tokens in batches:
+            for name, got, want in (
+                ("txlist", vectorised_rows(wallet_core.interpret_eth_transfers(eth, ADDRESS)),
+                 reference_transfers(eth, ADDRESS, staking)),
+                ("tokentx", vectorised_rows(wallet_core.interpret_eth_token_transfers(tokens, ADDRESS)),
+                 reference_token_transfers(tokens, ADDRESS, staking)),
+            ):
+                rows += len(want)
+                if got != want:
+                    mismatches += 1
+                    first = next((i for i, (a, b) in enumerate(zip(got, want)) if a != b), min(len(got), len(want)))
+                    print(f"MISMATCH {zone} {name} row {first}: {got[first:first + 1]} != {want[first:first + 1]} "
+                          f"({len(got)} vs {len(want)} rows)", file=sys.stderr)
+        print(f"{zone:<22} {rows} rows compared")
+    if mismatches:
+        sys.exit(1)
+    print("OK: vectorised output matches the per-row loop")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+# ============================================================
+# Incremental history sync check
+# 以可控的假上游重播錢包歷史的成長，驗證 HistoryStore 的游標與合併邏輯：
+# 首次同步、增量同步、落後超過一頁時整頁重抓，以及 BTC 未確認交易被取代 (RBF) 的情況
+#
+# Usage:
+#   python -m benchmarks.check_history_sync
+#
+# Upstream fetchers are replaced by in-memory chains, so every step can
+# compare the stored history with the expected newest records and check
+# which pages were requested. Exits 1 on a mismatch.
+# ============================================================
+
+import inspect
+import sys
+
+from benchmarks.run import prepare_environment
+
+BTC_ADDRESS = "bc1qar0srrr7xfkvy5l643lydnw9re59gtzzwf5mdq"
+ETH_ADDRESS = "0x5aAeb6053F3E94C9b9A09f33669435E7Ef1BeAed"
+
+
+class Checker:
+    def __init__(self):
+        self.failures = 0
+
+    def expect(self, name, got, want):
+        if got != want:
+            self.failures += 1
+            print(f"MISMATCH {name}: {got!r:.200} != {want!r:.200}", file=sys.stderr)
+        else:
+            print(f"ok  {name}")
+
+
+# ============================================================
+# Bitcoin: n_tx cursor, probe page, offset top-up, full refetch
+# ============================================================
+class FakeBitcoin:
+    """Blockchain.info history, newest first; n_tx counts unconfirmed transactions too"""
+
+    def __init__(self):
+        self.txs = []
+        self.height = 800000
+        self.calls = []
+        self.down = False
+
+    def confirmed(self, n):
+        for _ in range(n):
+            self.height += 1
+            self.txs.insert(0, {"hash": f"btc{self.height}", "time": self.height, "block_height": self.height})
+
+    def pending(self, tx_hash):
+        self.txs.insert(0, {"hash": tx_hash, "time": self.height + 1, "block_height": None})
+
+    def fetch(self, address, limit, offset=0):
+        self.calls.append((limit, offset))
+        if self.down:
+            return None
+        return {"n_tx": len(self.txs), "txs": [dict(tx) for tx in self.txs[offset:offset + limit]]}
+
+
+def check_bitcoin(check, wallet_core):
+    chain = FakeBitcoin()
+    wallet_core.fetch_bitcoin_page = chain.fetch
+    sync = inspect.unwrap(wallet_core.get_bitcoin_transactions)
+    page, probe = wallet_core.BTC_PAGE_SIZE, wallet_core.BTC_SYNC_PROBE
+
+    def step(name, calls, want=None):
+        chain.calls.clear()
+        got = [tx["hash"] for tx in sync(BTC_ADDRESS)]
+        check.expect(f"bitcoin {name}: pages", chain.calls, calls)
+        # Unconfirmed transactions come first, then the newest stored page
+        pending = [tx["hash"] for tx in chain.txs if not tx["block_height"]]
+        confirmed = [tx["hash"] for tx in chain.txs if tx["block_height"]]
+        check.expect(f"bitcoin {name}: history", got, want or pending + confirmed[:page])
+
+    chain.confirmed(120)
+    step("first sync", [(page, 0)])
+    chain.confirmed(10)
+    step("incremental within the probe", [(probe, 0)])
+    chain.confirmed(probe + 30)
+    step("incremental beyond the probe", [(probe, 0), (30, probe)])
+    chain.confirmed(page + 100)
+    step("gap larger than a page", [(probe, 0), (page, 0)])
+
+    chain.pending("rbf-original")
+    step("unconfirmed shown", [(probe, 0)])
+    chain.txs.pop(0)
+    chain.pending("rbf-replacement")
+    step("replaced transaction dropped", [(probe, 0)])
+    chain.txs[0]["block_height"] = chain.height + 1
+    step("replacement confirmed", [(probe, 0)])
+    stored = [tx["hash"] for tx in wallet_core.get_history_store().load("bitcoin", BTC_ADDRESS, "tx")]
+    check.expect("bitcoin: nothing unconfirmed stored", "rbf-original" in stored, False)
+
+    want = [tx["hash"] for tx in chain.txs[:page]]
+    chain.down = True
+    step("upstream down serves the stored history", [(probe, 0)], want)
+
+
+# ============================================================
+# Etherscan: startblock cursor, full page starts over
+# ============================================================
+class FakeEtherscan:
+    def __init__(self):
+        self.txs = []
+        self.block = 19000000
+        self.calls = []
+
+    def mine(self, n):
+        for _ in range(n):
+            self.block += 1
+            self.txs.insert(0, {"hash": f"0x{self.block:064x}", "blockNumber": str(self.block),
+                                "timeStamp": str(self.block)})
+
+    def fetch(self, address, action, startblock=None, endblock=None, offset=300, chainid=1):
+        self.calls.append(startblock)
+        rows = [tx for tx in self.txs if startblock is None or int(tx["blockNumber"]) >= startblock]
+        return [dict(tx) for tx in rows[:offset]]
+
+
+def check_etherscan(check, wallet_core):
+    chain = FakeEtherscan()
+    wallet_core.fetch_etherscan_list = chain.fetch
+    page = wallet_core.ETHERSCAN_PAGE_SIZE
+
+    def step(name, startblock):
+        chain.calls.clear()
+        got = [tx["hash"] for tx in wallet_core.sync_etherscan_history(ETH_ADDRESS, "txlist")]
+        check.expect(f"etherscan {name}: startblock", chain.calls, [startblock])
+        check.expect(f"etherscan {name}: history", got, [tx["hash"] for tx in chain.txs[:page]])
+
+    chain.mine(40)
+    step("first sync", None)
+    newest = chain.block
+    chain.mine(25)
+    step("incremental", newest)
+    newest = chain.block
+    chain.mine(page + 50)
+    step("gap larger than a page", newest)
+
+
+def main():
+    prepare_environment()
+    import wallet_core
+
+    check = Checker()
+    check_bitcoin(check, wallet_core)
+    check_etherscan(check, wallet_core)
+    if check.failures:
+        sys.exit(1)
+    print("OK: history cursors and merges behave as expected")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,286 @@
+# ============================================================
+# Benchmark fixtures
+# 產生 (或從上游錄製) 各鏈的錢包資料，格式與各 API 回應相同，供離線基準測試重播
+#
+# Usage:
+#   python -m benchmarks.fixtures generate                 # small / 300 / 50k per chain
+#   python -m benchmarks.fixtures record ethereum 0xADDR --limit 5000
+#
+# wallet_core is only imported by the generators / recorder, so the mock
+# server can load fixtures without it.
+#
+# One JSON file per fixture, named {chain}-{tier}.json. Every file holds the
+# wallet address it was built for; the mock server substitutes the address a
+# request asks for, so a fixture can be replayed under any address.
+# ============================================================
+
+import argparse
+import json
+import os
+import random
+import string
+
+FIXTURE_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+TIERS = {"small": 25, "300": 300, "50k": 50000}
+CHAINS = ("ethereum", "solana", "bitcoin", "hyperliquid")
+
+BASE58 = "123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz"
+START_TIME = 1735689600  # 2025-01-01 UTC; records walk backwards from here
+# One position per perp market, of which Hyperliquid lists a few hundred
+HYPERLIQUID_MAX_POSITIONS = 500
+
+
+def fixture_path(name, directory=FIXTURE_DIR):
+    return os.path.join(directory, f"{name}.json")
+
+
+def load_fixture(name, directory=FIXTURE_DIR):
+    with open(fixture_path(name, directory), encoding="utf-8") as fh:
+        return json.load(fh)
+
+
+def save_fixture(name, fixture, directory=FIXTURE_DIR):
+    os.makedirs(directory, exist_ok=True)
+    with open(fixture_path(name, directory), "w", encoding="utf-8") as fh:
+        json.dump(fixture, fh)
+
+
+def _hex(rng, n):
+    return "".join(rng.choice("0123456789abcdef") for _ in range(n))
+
+
+def _b58(rng, n):
+    return "".join(rng.choice(BASE58) for _ in range(n))
+
+
+def random_address(chain, rng=random):
+    """A fresh, well-formed looking address for `chain`"""
+    if chain in ("ethereum", "hyperliquid"):
+        return "0x" + _hex(rng, 40)
+    if chain == "solana":
+        return _b58(rng, 44)
+    return "bc1q" + "".join(rng.choice(string.ascii_lowercase + string.digits) for _ in range(38))
+
+
+# ============================================================
+# Synthetic generators
+# ============================================================
+def generate_ethereum(size, rng):
+    from wallet_core import ETH_STAKING_CONTRACTS
+
+    address = random_address("ethereum", rng)
+    peers = [random_address("ethereum", rng) for _ in range(200)] + list(ETH_STAKING_CONTRACTS)
+    tokens = [("USDC", "6"), ("USDT", "6"), ("WETH", "18"), ("DAI", "18"), ("PEPE", "18"), ("WBTC", "8")]
+    contracts = {symbol: random_address("ethereum", rng) for symbol, _ in tokens}
+
+    block, ts = 21500000, START_TIME
+    txlist = []
+    while len(txlist) < size:
+        block -= rng.randint(1, 40)
+        ts -= rng.randint(12, 480)
+        for _ in range(rng.choice((1, 1, 1, 2, 3))):
+            outgoing = rng.random() < 0.5
+            peer = rng.choice(peers)
+            txlist.append({
+                "blockNumber": str(block), "timeStamp": str(ts), "hash": "0x" + _hex(rng, 64),
+                "nonce": str(rng.randint(0, 5000)), "from": address if outgoing else peer,
+                "to": peer if outgoing else address, "value": str(rng.randint(0, 5 * 10 ** 18)),
+                "gas": "21000", "gasPrice": str(rng.randint(10 ** 9, 10 ** 11)), "isError": "0",
+                "input": "0x", "gasUsed": "21000", "confirmations": str(rng.randint(1, 10 ** 6)),
+            })
+
+    block, ts = 21500000, START_TIME
+    tokentx = []
+    while len(tokentx) < size:
+        block -= rng.randint(1, 40)
+        ts -= rng.randint(12, 480)
+        tx_hash = "0x" + _hex(rng, 64)
+        # Roughly a third of token transactions are two-leg swaps
+        legs = [True, False] if rng.random() < 0.33 else [rng.random() < 0.5]
+        for log_index, outgoing in enumerate(legs):
+            symbol, decimals = rng.choice(tokens)
+            peer = rng.choice(peers)
+            tokentx.append({
+                "blockNumber": str(block), "timeStamp": str(ts), "hash": tx_hash,
+                "from": address if outgoing else peer, "to": peer if outgoing else address,
+                "value": str(rng.randint(1, 10 ** (int(decimals) + 5))), "contractAddress": contracts[symbol],
+                "tokenName": symbol, "tokenSymbol": symbol, "tokenDecimal": decimals,
+                "logIndex": str(log_index), "gas": "120000", "gasUsed": "95000",
+            })
+    return {"chain": "ethereum", "address": address, "txlist": txlist[:size], "tokentx": tokentx[:size]}
+
+
+def generate_solana(size, rng):
+    from wallet_core import SOL_WSOL_MINT
+
+    address = random_address("solana", rng)
+    peers = [random_address("solana", rng) for _ in range(200)]
+    mints = [random_address("solana", rng) for _ in range(300)] + [SOL_WSOL_MINT]
+    # Most mints are known to DAS; the rest come back as null
+    assets = {
+        mint: {"id": mint, "token_info": {"symbol": "".join(rng.choice(string.ascii_uppercase) for _ in range(4))},
+               "content": {"metadata": {"name": f"Token {i}"}}}
+        for i, mint in enumerate(mints) if rng.random() < 0.9
+    }
+
+    ts = START_TIME
+    txs = []
+    for _ in range(size):
+        ts -= rng.randint(2, 600)
+        kind = rng.choice(("TRANSFER", "TRANSFER", "SWAP", "SWAP", "STAKE", "UNKNOWN"))
+        peer = rng.choice(peers)
+        native, tokens = [], []
+        if kind == "TRANSFER":
+            outgoing = rng.random() < 0.5
+            native.append({"fromUserAccount": address if outgoing else peer, "toUserAccount": peer if outgoing else address,
+                           "amount": rng.randint(1, 50 * 10 ** 9)})
+        elif kind == "SWAP":
+            sold, bought = rng.sample(mints, 2)
+            tokens.append({"fromUserAccount": address, "toUserAccount": peer, "tokenAmount": rng.uniform(0.1, 10000), "mint": sold})
+            tokens.append({"fromUserAccount": peer, "toUserAccount": address, "tokenAmount": rng.uniform(0.1, 10000), "mint": bought})
+        elif kind == "STAKE":
+            native.append({"fromUserAccount": address, "toUserAccount": peer, "amount": rng.randint(1, 10 ** 11)})
+        txs.append({
+            "signature": _b58(rng, 88), "timestamp": ts, "slot": 300000000 - len(txs), "type": kind,
+            "source": "SYSTEM_PROGRAM", "fee": 5000, "feePayer": address,
+            "description": f"{address} interacted with {peer}" if kind == "UNKNOWN" else "",
+            "nativeTransfers": native, "tokenTransfers": tokens,
+            "instructions": [{"programId": "11111111111111111111111111111111", "accounts": [address, peer]}],
+        })
+    return {"chain": "solana", "address": address, "transactions": txs, "assets": assets}
+
+
+def generate_bitcoin(size, rng):
+    address = random_address("bitcoin", rng)
+    peers = [random_address("bitcoin", rng) for _ in range(200)]
+    ts = START_TIME
+    txs = []
+    for _ in range(size):
+        ts -= rng.randint(60, 7200)
+        outgoing = rng.random() < 0.5
+        value = rng.randint(1000, 10 ** 8)
+        if outgoing:
+            inputs = [{"prev_out": {"addr": address, "value": value + 2000}}]
+            outs = [{"addr": rng.choice(peers), "value": value}, {"addr": address, "value": 1000}]
+        else:
+            inputs = [{"prev_out": {"addr": rng.choice(peers), "value": value + 5000}}]
+            outs = [{"addr": address, "value": value}, {"addr": rng.choice(peers), "value": 4000}]
+        txs.append({"hash": _hex(rng, 64), "time": ts, "block_height": 880000 - len(txs), "fee": 1000, "size": 225,
+                    "inputs": inputs, "out": outs})
+    return {"chain": "bitcoin", "address": address, "txs": txs}
+
+
+def generate_hyperliquid(size, rng):
+    address = random_address("hyperliquid", rng)
+    positions = []
+    for i in range(min(size, HYPERLIQUID_MAX_POSITIONS)):
+        entry = rng.uniform(0.01, 100000)
+        size_ = rng.uniform(-50, 50) or 1.0
+        mark = entry * rng.uniform(0.8, 1.2)
+        positions.append({"type": "oneWay", "position": {
+            "coin": f"COIN{i}", "szi": f"{size_:.4f}", "entryPx": f"{entry:.4f}", "markPx": f"{mark:.4f}",
+            "positionValue": f"{abs(size_) * mark:.2f}", "unrealizedPnl": f"{size_ * (mark - entry):.2f}",
+            "returnOnEquity": f"{rng.uniform(-1, 1):.4f}", "liquidationPx": f"{entry * 0.5:.4f}",
+            "leverage": {"type": rng.choice(("cross", "isolated")), "value": rng.randint(1, 50)},
+            "marginUsed": f"{abs(size_) * mark / 10:.2f}",
+        }})
+    state = {"assetPositions": positions, "marginSummary": {"accountValue": "1000000.0"}, "time": START_TIME * 1000}
+    return {"chain": "hyperliquid", "address": address, "clearinghouseState": state}
+
+
+GENERATORS = {
+    "ethereum": generate_ethereum,
+    "solana": generate_solana,
+    "bitcoin": generate_bitcoin,
+    "hyperliquid": generate_hyperliquid,
+}
+
+
+def ensure_fixtures(chains=CHAINS, tiers=TIERS, directory=FIXTURE_DIR, seed=7):
+    """Generate any missing {chain}-{tier} fixtures (deterministic per name) and return their names"""
+    names = []
+    for chain in chains:
+        for tier in tiers:
+            name = f"{chain}-{tier}"
+            if not os.path.exists(fixture_path(name, directory)):
+                rng = random.Random(f"{seed}:{name}")
+                save_fixture(name, GENERATORS[chain](TIERS[tier], rng), directory)
+            names.append(name)
+    return names
+
+
+# ============================================================
+# Recording from the live providers
+# ============================================================
+def record(chain, address, limit):
+    """Capture up to `limit` records of a real wallet through wallet_core's fetchers"""
+    import wallet_core
+
+    if chain == "ethereum":
+        fixture = {"chain": chain, "address": address.lower()}
+        for action in ("txlist", "tokentx"):
+            records = []
+            for page in wallet_core.iter_etherscan_pages(address, action):
+                records.extend(page)
+                if len(records) >= limit:
+                    break
+            fixture[action] = records[:limit]
+        return fixture
+    if chain == "solana":
+        txs = []
+        for page in wallet_core.iter_helius_pages(address):
+            txs.extend(page)
+            if len(txs) >= limit:
+                break
+        txs = txs[:limit]
+        mints = sorted(wallet_core.collect_solana_mints(txs))
+        assets = {}
+        for i in range(0, len(mints), wallet_core.SOL_ASSET_BATCH_SIZE):
+            res = wallet_core.http_client.post(
+                f"{wallet_core.HELIUS_RPC_URL}/?api-key={wallet_core.HELIUS_API_KEY}",
+                json={"jsonrpc": "2.0", "id": "record", "method": "getAssetBatch",
+                      "params": {"ids": mints[i:i + wallet_core.SOL_ASSET_BATCH_SIZE]}},
+            )
+            for asset in res.json().get("result") or []:
+                if asset and asset.get("id"):
+                    assets[asset["id"]] = asset
+        return {"chain": chain, "address": address, "transactions": txs, "assets": assets}
+    if chain == "bitcoin":
+        txs = []
+        for page in wallet_core.iter_bitcoin_pages(address):
+            txs.extend(page)
+            if len(txs) >= limit:
+                break
+        return {"chain": chain, "address": address, "txs": txs[:limit]}
+    return {"chain": chain, "address": address.lower(),
+            "clearinghouseState": wallet_core.get_hyperliquid_positions(address)}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate or record benchmark fixtures")
+    sub = parser.add_subparsers(dest="command", required=True)
+    gen = sub.add_parser("generate", help="write synthetic fixtures for every chain and tier")
+    gen.add_argument("--force", action="store_true", help="regenerate existing files")
+    rec = sub.add_parser("record", help="capture a real wallet from the live providers")
+    rec.add_argument("chain", choices=CHAINS)
+    rec.add_argument("address")
+    rec.add_argument("--limit", type=int, default=5000)
+    rec.add_argument("--name", help="fixture name (default: {chain}-recorded)")
+    args = parser.parse_args(argv)
+
+    if args.command == "generate":
+        if args.force:
+            for name in (f"{c}-{t}" for c in CHAINS for t in TIERS):
+                if os.path.exists(fixture_path(name)):
+                    os.remove(fixture_path(name))
+        for name in ensure_fixtures():
+            print(fixture_path(name))
+        return
+
+    name = args.name or f"{args.chain}-recorded"
+    save_fixture(name, record(args.chain, args.address, args.limit))
+    print(fixture_path(name))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,231 @@
+# ============================================================
+# Mock provider server
+# 本機模擬 Etherscan / Helius / Blockchain.info / Hyperliquid 端點，以 fixture 回應請求
+#
+# Usage:
+#   python -m benchmarks.mock_server --port 8900
+#   ETHERSCAN_API_BASE=http://127.0.0.1:8900/ethereum-300/etherscan/v2/api \
+#       streamlit run wallet_activity_dashboard.py
+#
+# Every path starts with a fixture name; the rest mirrors the provider:
+#   GET  /{fixture}/etherscan/v2/api?action=txlist|tokentx&startblock&endblock&offset&chainid
+#        (chainid other than 1 replays the fixture's "txlist@<chainid>" lists, empty if absent)
+#   GET  /{fixture}/helius/v0/addresses/{address}/transactions?before&until&limit
+#   POST /{fixture}/helius/v0/transactions  {"transactions": [signature, ...]}
+#   POST /{fixture}/helius-rpc/         (getAsset / getAssetBatch / getSignaturesForAddress)
+#   GET  /{fixture}/blockchain/rawaddr/{address}?limit&offset
+#   GET  /{fixture}/blockchain/multiaddr?active&n&offset
+#   POST /{fixture}/hyperliquid/info    (clearinghouseState)
+# ============================================================
+
+import argparse
+import json
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from benchmarks.fixtures import FIXTURE_DIR, load_fixture
+
+ENDPOINT_PATHS = {
+    "ETHERSCAN_API_BASE": "etherscan/v2/api",
+    "HELIUS_API_BASE": "helius",
+    "HELIUS_RPC_URL": "helius-rpc",
+    "BLOCKCHAIN_INFO_BASE": "blockchain",
+    "HYPERLIQUID_API_URL": "hyperliquid/info",
+}
+
+
+def endpoints(base_url, fixture):
+    """{wallet_core endpoint setting: URL} serving `fixture` from a mock server at base_url"""
+    return {name: f"{base_url}/{fixture}/{path}" for name, path in ENDPOINT_PATHS.items()}
+
+
+class FixtureStore:
+    """Fixtures loaded on first use, with lookup indexes for pagination"""
+
+    def __init__(self, directory=FIXTURE_DIR):
+        self.directory = directory
+        self._fixtures = {}
+        self._lock = threading.Lock()
+
+    def get(self, name):
+        with self._lock:
+            if name not in self._fixtures:
+                fixture = load_fixture(name, self.directory)
+                if "transactions" in fixture:
+                    fixture["_signature_index"] = {
+                        tx.get("signature"): i for i, tx in enumerate(fixture["transactions"])
+                    }
+                self._fixtures[name] = fixture
+            return self._fixtures[name]
+
+    def preload(self):
+        """Load every fixture up front so no timed request pays for parsing"""
+        for filename in sorted(os.listdir(self.directory)):
+            if filename.endswith(".json"):
+                self.get(filename[:-len(".json")])
+
+
+def etherscan_page(fixture, params):
+    action = params.get("action", "txlist")
+    chainid = params.get("chainid", "1")
+    records = fixture.get(action if chainid == "1" else f"{action}@{chainid}", [])
+    start = int(params.get("startblock", 0))
+    end = int(params.get("endblock", 10 ** 12))
+    offset = int(params.get("offset", 10000))
+    page = []
+    for tx in records:  # stored newest first, like sort=desc
+        block = int(tx.get("blockNumber", 0))
+        if block > end:
+            continue
+        if block < start or len(page) >= offset:
+            break
+        page.append(tx)
+    return {"status": "1" if page else "0", "message": "OK" if page else "No transactions found", "result": page}
+
+
+def helius_page(fixture, params):
+    txs = fixture.get("transactions", [])
+    index = fixture.get("_signature_index", {})
+    start = index[params["before"]] + 1 if params.get("before") in index else 0
+    stop = index[params["until"]] if params.get("until") in index else len(txs)
+    limit = int(params.get("limit", 100))
+    return txs[start:min(stop, start + limit)]
+
+
+def helius_signatures(fixture, address, options):
+    page = helius_page(fixture, {"limit": 1000, **options})
+    # Parse requests carry no address: replay them under the last one listed
+    fixture["_replay_address"] = address
+    return [{"signature": tx.get("signature"), "slot": tx.get("slot"), "blockTime": tx.get("timestamp"), "err": None}
+            for tx in page]
+
+
+def helius_parse(fixture, payload):
+    txs = fixture.get("transactions", [])
+    index = fixture.get("_signature_index", {})
+    return [txs[index[sig]] for sig in payload.get("transactions", []) if sig in index]
+
+
+def helius_rpc(fixture, payload):
+    assets = fixture.get("assets", {})
+    params = payload.get("params") or {}
+    if payload.get("method") == "getSignaturesForAddress":
+        address, options = (params + [{}])[:2]
+        result = helius_signatures(fixture, address, options)
+    elif payload.get("method") == "getAssetBatch":
+        result = [assets.get(mint) for mint in params.get("ids", [])]
+    else:
+        result = assets.get(params.get("id"))
+    return {"jsonrpc": "2.0", "id": payload.get("id"), "result": result}
+
+
+def bitcoin_page(fixture, params):
+    txs = fixture.get("txs", [])
+    offset = int(params.get("offset", 0))
+    limit = int(params.get("limit", 50))
+    return {"address": fixture["address"], "n_tx": len(txs), "txs": txs[offset:offset + limit]}
+
+
+def bitcoin_multiaddr(fixture, params):
+    page = bitcoin_page(fixture, {"limit": params.get("n", 50), "offset": params.get("offset", 0)})
+    return {"wallet": {"n_tx": page["n_tx"]}, "addresses": [{"address": params.get("active")}], "txs": page["txs"]}
+
+
+def make_handler(store, quiet=True):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive, like the real providers
+        # Headers and body are written separately; without this every
+        # keep-alive response stalls on Nagle + delayed ACK (~40ms)
+        disable_nagle_algorithm = True
+
+        def log_message(self, fmt, *args):
+            if not quiet:
+                super().log_message(fmt, *args)
+
+        def _reply(self, status, body, fixture=None, address=None):
+            data = json.dumps(body).encode()
+            if fixture and address and fixture["address"] != address:
+                # Replay the fixture under whatever address was requested
+                data = data.replace(fixture["address"].encode(), address.encode())
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _route(self, method):
+            url = urlsplit(self.path)
+            parts = [unquote(p) for p in url.path.strip("/").split("/")]
+            params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+            payload = {}
+            if method == "POST":
+                length = int(self.headers.get("Content-Length") or 0)
+                payload = json.loads(self.rfile.read(length) or b"{}")
+            try:
+                fixture = store.get(parts[0])
+            except (OSError, IndexError, ValueError):
+                return self._reply(404, {"error": f"unknown fixture {parts[:1]}"})
+
+            route = parts[1:]
+            if route[:1] == ["etherscan"]:
+                address = params.get("address", "").lower()
+                return self._reply(200, etherscan_page(fixture, params), fixture, address)
+            if route[:3] == ["helius", "v0", "addresses"] and len(route) >= 5:
+                return self._reply(200, helius_page(fixture, params), fixture, route[3])
+            if route[:3] == ["helius", "v0", "transactions"]:
+                return self._reply(200, helius_parse(fixture, payload), fixture, fixture.get("_replay_address"))
+            if route[:1] == ["helius-rpc"]:
+                return self._reply(200, helius_rpc(fixture, payload))
+            if route[:2] == ["blockchain", "multiaddr"]:
+                return self._reply(200, bitcoin_multiaddr(fixture, params), fixture, params.get("active"))
+            if route[:2] == ["blockchain", "rawaddr"] and len(route) >= 3:
+                return self._reply(200, bitcoin_page(fixture, params), fixture, route[2])
+            if route[:1] == ["hyperliquid"]:
+                return self._reply(200, fixture.get("clearinghouseState", {}))
+            return self._reply(404, {"error": f"no route for {url.path}"})
+
+        def do_GET(self):
+            self._route("GET")
+
+        def do_POST(self):
+            self._route("POST")
+
+    return Handler
+
+
+def make_server(host="127.0.0.1", port=0, directory=FIXTURE_DIR, quiet=True, preload=False):
+    store = FixtureStore(directory)
+    if preload:
+        store.preload()
+    server = ThreadingHTTPServer((host, port), make_handler(store, quiet))
+    server.daemon_threads = True
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve benchmark fixtures as mock provider APIs")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=0, help="0 picks a free port")
+    parser.add_argument("--fixtures", default=FIXTURE_DIR, help="fixture directory")
+    parser.add_argument("--verbose", action="store_true", help="log every request")
+    parser.add_argument("--preload", action="store_true", help="parse every fixture before listening")
+    args = parser.parse_args(argv)
+
+    server = make_server(args.host, args.port, args.fixtures, quiet=not args.verbose, preload=args.preload)
+    host, port = server.server_address[:2]
+    # The benchmark harness reads this line to find the port
+    print(f"listening on http://{host}:{port}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        sys.stdout.flush()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,207 @@
+# ============================================================
+# Offline benchmark harness
+# 以本機 mock server 重播 fixture，量測各鏈處理流程的耗時、每筆 CPU 成本與記憶體峰值
+#
+# Usage:
+#   python -m benchmarks.run                                   # every chain and tier
+#   python -m benchmarks.run --chains ethereum --tiers 300,50k --repeat 5
+#   python -m benchmarks.run --json baseline.json
+#   python -m benchmarks.run --compare baseline.json --threshold 0.25
+#
+# The mock server runs in a subprocess so its CPU time is not counted.
+# Every timed run uses a fresh wallet address (cold per-address caches and
+# history); "warm" runs repeat an address after the result caches expire, i.e.
+# the incremental-sync path. Token metadata stays warm after the first run,
+# as it does in production.
+# ============================================================
+
+import argparse
+import gc
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.fixtures import TIERS, ensure_fixtures, random_address
+
+DEEP_CHAINS = ("ethereum", "solana", "bitcoin")
+
+
+def start_mock_server():
+    """Launch benchmarks.mock_server in a subprocess; returns (process, base_url)"""
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.mock_server", "--port", "0", "--preload"],
+        stdout=subprocess.PIPE, text=True,
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    )
+    line = proc.stdout.readline().strip()
+    if not line.startswith("listening on "):
+        proc.kill()
+        raise SystemExit(f"mock server failed to start: {line!r}")
+    return proc, line[len("listening on "):]
+
+
+def prepare_environment():
+    """Dummy keys and a throwaway cache dir, set before wallet_core is imported"""
+    os.environ.setdefault("ETH_API_KEY", "benchmark")
+    os.environ.setdefault("HELIUS_API_KEY", "benchmark")
+    os.environ.setdefault("INFURA_API_URL", "http://127.0.0.1:9")
+    os.environ["WALLET_CACHE_DIR"] = tempfile.mkdtemp(prefix="wallet-bench-")
+
+
+def build_cases(chains, tiers):
+    """[(chain, tier, mode)] in reporting order"""
+    cases = []
+    for chain in chains:
+        for tier in tiers:
+            if chain == "hyperliquid":
+                cases.append((chain, tier, "render"))
+                continue
+            cases.append((chain, tier, "process"))
+            cases.append((chain, tier, "warm"))
+            if chain in DEEP_CHAINS:
+                cases.append((chain, tier, "deep"))
+    return cases
+
+
+def case_runner(chain, mode):
+    """(run(address) -> number of records produced, expire() dropping cached results)"""
+    import streamlit as st
+    import wallet_core
+    from shared_cache import get_shared_cache
+    from dashboard_views import render_hyperliquid_positions
+    from tx_records import display_frame
+
+    if mode == "render":
+        def run(address):
+            data = wallet_core.get_hyperliquid_positions(address)
+            render_hyperliquid_positions(data)
+            return len(data.get("assetPositions", []))
+    elif mode == "deep":
+        def run(address):
+            return sum(len(page) for page in wallet_core.iter_activity_pages(chain, address))
+    else:  # process / warm, including the table the dashboard renders
+        def run(address):
+            return len(display_frame(wallet_core.TX_PROCESSORS[chain](address)))
+
+    def expire():
+        # As if the 5-minute TTL had lapsed in every cache layer
+        st.cache_data.clear()
+        if get_shared_cache():
+            get_shared_cache().clear()
+    return run, expire
+
+
+def measure(chain, mode, repeat):
+    run, expire = case_runner(chain, mode)
+
+    def fresh_address():
+        address = random_address(chain)
+        if mode == "warm":
+            run(address)  # initial sync, untimed
+            expire()
+        return address
+
+    walls, cpus, records = [], [], 0
+    for _ in range(repeat):
+        address = fresh_address()
+        gc.collect()
+        wall, cpu = time.perf_counter(), time.process_time()
+        records = run(address)
+        walls.append(time.perf_counter() - wall)
+        cpus.append(time.process_time() - cpu)
+
+    # Peak memory is measured on a separate run: tracemalloc slows everything down
+    address = fresh_address()
+    gc.collect()
+    tracemalloc.start()
+    run(address)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    cpu = statistics.median(cpus)
+    return {
+        "wall_s": round(statistics.median(walls), 4),
+        "cpu_s": round(cpu, 4),
+        "records": records,
+        "cpu_us_per_record": round(cpu / records * 1e6, 2) if records else None,
+        "peak_mib": round(peak / 2 ** 20, 2),
+    }
+
+
+def compare(results, baseline, threshold):
+    """Lines describing cases whose CPU per record or peak memory grew beyond threshold"""
+    previous = {r["case"]: r for r in baseline}
+    regressions = []
+    for result in results:
+        before = previous.get(result["case"])
+        if not before:
+            continue
+        for metric in ("cpu_us_per_record", "peak_mib"):
+            old, new = before.get(metric), result.get(metric)
+            if old and new and new > old * (1 + threshold):
+                regressions.append(f"{result['case']}: {metric} {old} -> {new} (+{(new / old - 1) * 100:.0f}%)")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the dashboard pipelines against recorded fixtures")
+    parser.add_argument("--chains", default="ethereum,solana,bitcoin,hyperliquid")
+    parser.add_argument("--tiers", default=",".join(TIERS), help=f"comma separated, from {list(TIERS)}")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per case (median is reported)")
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--compare", help="baseline results file to check for regressions")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed relative growth vs baseline")
+    args = parser.parse_args(argv)
+
+    chains = [c for c in args.chains.split(",") if c]
+    tiers = [t for t in args.tiers.split(",") if t]
+    unknown = [t for t in tiers if t not in TIERS]
+    if unknown:
+        parser.error(f"unknown tiers {unknown}")
+
+    prepare_environment()
+    from streamlit import config
+    from streamlit.logger import set_log_level
+
+    # Streamlit elements warn about the missing runtime when used headless.
+    # Load the config first: parsing it later would reset the log level.
+    config.get_config_options()
+    set_log_level("error")
+    import wallet_core
+    from benchmarks.mock_server import endpoints
+
+    ensure_fixtures(chains, tiers)
+    server, base_url = start_mock_server()
+    results = []
+    try:
+        print(f"{'case':<28} {'wall s':>9} {'cpu s':>9} {'records':>8} {'cpu µs/rec':>11} {'peak MiB':>9}")
+        for chain, tier, mode in build_cases(chains, tiers):
+            for name, url in endpoints(base_url, f"{chain}-{tier}").items():
+                setattr(wallet_core, name, url)
+            result = {"case": f"{chain}/{tier}/{mode}", **measure(chain, mode, max(1, args.repeat))}
+            results.append(result)
+            print(f"{result['case']:<28} {result['wall_s']:>9.4f} {result['cpu_s']:>9.4f} {result['records']:>8} "
+                  f"{result['cpu_us_per_record'] or 0:>11.2f} {result['peak_mib']:>9.2f}", flush=True)
+    finally:
+        server.terminate()
+        server.wait()
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as fh:
+            json.dump(results, fh, indent=2)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as fh:
+            regressions = compare(results, json.load(fh), args.threshold)
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+# ============================================================
+# Startup benchmark
+# 量測冷啟動時 import 核心模組的耗時，並確認 web3 等重量級依賴沒有在啟動時被載入
+#
+# Usage:
+#   python -m benchmarks.startup
+#   python -m benchmarks.startup --repeat 7 --json startup.json
+#   python -m benchmarks.startup --compare startup.json --threshold 0.25
+#
+# Every sample imports the module in a fresh interpreter; one untimed
+# sample first warms the OS file cache.
+# ============================================================
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from benchmarks.run import prepare_environment
+
+STARTUP_MODULES = ("wallet_core", "portfolio", "batch_lookup", "prefetch")
+# Must only be imported when first needed (ENS lookups)
+LAZY_MODULES = ("web3",)
+
+PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - started
+print(json.dumps({{"import_s": elapsed, "eager": [m for m in {lazy!r} if m in sys.modules]}}))
+"""
+
+
+def sample(module):
+    """{"import_s", "eager"} from importing module in a fresh interpreter"""
+    proc = subprocess.run(
+        [sys.executable, "-c", PROBE.format(module=module, lazy=LAZY_MODULES)],
+        capture_output=True, text=True, check=True,
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    )
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def measure(module, repeat):
+    sample(module)  # warm the OS file cache
+    samples = [sample(module) for _ in range(repeat)]
+    return {
+        "case": f"startup/{module}",
+        "import_s": round(statistics.median(s["import_s"] for s in samples), 4),
+        "eager": samples[-1]["eager"],
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure cold import time of the core modules")
+    parser.add_argument("--modules", default=",".join(STARTUP_MODULES))
+    parser.add_argument("--repeat", type=int, default=5, help="fresh interpreters per module (median is reported)")
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--compare", help="baseline results file to check for regressions")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed relative growth vs baseline")
+    args = parser.parse_args(argv)
+
+    prepare_environment()
+    results = []
+    print(f"{'case':<28} {'import s':>9}  eagerly loaded")
+    for module in (m for m in args.modules.split(",") if m):
+        result = measure(module, max(1, args.repeat))
+        results.append(result)
+        print(f"{result['case']:<28} {result['import_s']:>9.4f}  {', '.join(result['eager']) or '-'}", flush=True)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as fh:
+            json.dump(results, fh, indent=2)
+
+    problems = [f"{r['case']}: {', '.join(r['eager'])} imported at startup" for r in results if r["eager"]]
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as fh:
+            previous = {r["case"]: r for r in json.load(fh)}
+        for result in results:
+            old = previous.get(result["case"], {}).get("import_s")
+            if old and result["import_s"] > old * (1 + args.threshold):
+                problems.append(f"{result['case']}: import_s {old} -> {result['import_s']} "
+                                f"(+{(result['import_s'] / old - 1) * 100:.0f}%)")
+    for line in problems:
+        print(f"REGRESSION {line}", file=sys.stderr)
+    if problems:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
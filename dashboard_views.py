@@ -0,0 +1,121 @@
+# ============================================================
+# Dashboard views
+# 儀表板的繪製函式，獨立於 Streamlit 腳本之外，方便在基準測試中直接呼叫
+# ============================================================
+
+import streamlit as st
+import numpy as np
+import pandas as pd
+
+from instrumentation import timed
+from tx_records import display_frame
+
+PNL_POSITIVE = "color: #00ff00; font-weight: bold"
+PNL_NEGATIVE = "color: #ff4d4d; font-weight: bold"
+PNL_NEUTRAL = "color: #e0e0e0"
+
+
+def pnl_colours(column):
+    """CSS per cell from the sign of a numeric column (for Styler.apply)"""
+    values = pd.to_numeric(column, errors="coerce")
+    return np.select([values > 0, values < 0], [PNL_POSITIVE, PNL_NEGATIVE], PNL_NEUTRAL)
+
+
+# ============================================================
+# Transactions
+# ============================================================
+@timed("render_transactions_table")
+def render_records(records, lookup_names=None, height=800, chain_column=False):
+    """One table of newest-first TxRecords, formatted once and sent once
+
+    lookup_names(records) may return {address: name} for the counterparties;
+    chain_column adds a 鏈 column (multi-chain feeds).
+    """
+    frame = display_frame(records, lookup_names(records) if lookup_names else None)
+    if chain_column:
+        frame.insert(1, "鏈", [record.chain for record in records])
+    st.dataframe(frame, use_container_width=True, height=height)
+
+
+# ============================================================
+# Hyperliquid
+# ============================================================
+@timed("render_hyperliquid")
+def render_hyperliquid_positions(data):
+    if not data or "assetPositions" not in data or not data["assetPositions"]:
+        st.info("📭 目前沒有倉位資料")
+        return
+
+    rows = []
+    for p in data["assetPositions"]:
+        pos = p["position"]
+        symbol = pos.get("coin", "N/A")
+        side = "多單 🟢" if float(pos.get("szi", 0)) > 0 else "空單 🔴"
+
+        lev_info = pos.get("leverage", {})
+        if isinstance(lev_info, dict):
+            lev_val = lev_info.get("value", "—")
+            lev_type = lev_info.get("type", "")
+            leverage = f"{lev_val}x ({lev_type.capitalize()})"
+        else:
+            leverage = f"{lev_info}x" if lev_info != "—" else "—"
+
+        entry = float(pos.get("entryPx", 0))
+        mark = float(pos.get("markPx", entry))
+        pnl = float(pos.get("unrealizedPnl", 0))
+        pnl_pct = ((mark - entry) / entry * 100) if entry > 0 else 0
+        liq = pos.get("liqPx")
+
+        rows.append({
+            "幣種": symbol,
+            "方向": side,
+            "開倉均價": entry,
+            "現價": mark,
+            "盈虧率": pnl_pct,
+            "未實現盈虧 (USD)": pnl,
+            "槓桿": leverage,
+            "爆倉價": float(liq) if liq not in (None, "", "—") else np.nan,
+        })
+
+    # Numeric columns: colour from the values, format only for display
+    usd = "{:,.2f}"
+    styler = (
+        pd.DataFrame(rows).style
+        .format({"開倉均價": usd, "現價": usd, "盈虧率": "{:+.2f}%", "未實現盈虧 (USD)": usd, "爆倉價": usd}, na_rep="—")
+        .apply(pnl_colours, subset=["盈虧率", "未實現盈虧 (USD)"])
+    )
+    st.markdown("### 📊 Hyperliquid 倉位概覽")
+    st.dataframe(styler)
+
+
+# ============================================================
+# Multi-wallet portfolio
+# ============================================================
+@timed("render_portfolio")
+def render_portfolio_exposure(exposure, totals, account_value=0.0):
+    """Per-coin totals and the per-wallet Hyperliquid positions behind them"""
+    if exposure.empty:
+        st.info("📭 這些錢包目前沒有 Hyperliquid 倉位")
+        return
+    overall = totals.iloc[-1]
+    cols = st.columns(4)
+    cols[0].metric("帳戶總值 (USD)", f"{account_value:,.2f}")
+    cols[1].metric("總名目價值 (USD)", f"{overall['總名目價值 (USD)']:,.2f}")
+    cols[2].metric("淨名目價值 (USD)", f"{overall['淨名目價值 (USD)']:,.2f}")
+    cols[3].metric("未實現盈虧 (USD)", f"{overall['未實現盈虧 (USD)']:,.2f}")
+
+    usd = "{:,.2f}"
+    st.markdown("### 📊 合併曝險 (依幣種)")
+    st.dataframe(
+        totals.style.format({"淨倉位": "{:,.4f}", "淨名目價值 (USD)": usd, "總名目價值 (USD)": usd,
+                             "未實現盈虧 (USD)": usd}, na_rep="—")
+        .apply(pnl_colours, subset=["未實現盈虧 (USD)"]),
+        hide_index=True, use_container_width=True,
+    )
+    with st.expander(f"各錢包倉位明細 ({len(exposure)})"):
+        st.dataframe(
+            exposure.style.format({"倉位": "{:,.4f}", "開倉均價": usd, "名目價值 (USD)": usd,
+                                   "未實現盈虧 (USD)": usd})
+            .apply(pnl_colours, subset=["未實現盈虧 (USD)"]),
+            hide_index=True, use_container_width=True,
+        )
@@ -0,0 +1,130 @@
+# ============================================================
+# Bulk ENS resolution
+# 以 Multicall3 批次解析 ENS：多個名稱 → 地址、多個地址 → 主要名稱 (反向解析)，
+# 每一輪只需少數幾次 eth_call，不必逐一發出 RPC
+#
+# Lookups walk the ENS registry in rounds. Each round is one Multicall3
+# aggregate3 eth_call per MULTICALL_BATCH lookups: registry.resolver(node)
+# for every node, then resolver.addr(node) (forward) or resolver.name(node)
+# (reverse). A reverse name only counts when it resolves forward to the same
+# address (ENS primary-name rule), which costs two more rounds.
+# Plain JSON-RPC through http_client: no web3 import, and any node URL works
+# (Infura, or a local dev node / mainnet fork for testing).
+# ============================================================
+
+import http_client
+from address_types import to_checksum_address
+from http_client import UpstreamError
+
+MULTICALL3 = "0xcA11bde05977b3631167028862bE2a173976CA11"
+ENS_REGISTRY = "0x00000000000C2E074eC69A0dFb2997BA6C7d2e1e"
+ZERO_ADDRESS = "0x" + "0" * 40
+
+# Function selectors: first 4 bytes of keccak256(signature)
+AGGREGATE3 = bytes.fromhex("82ad56cb")  # aggregate3((address,bool,bytes)[])
+RESOLVER = bytes.fromhex("0178b8bf")  # resolver(bytes32)
+ADDR = bytes.fromhex("3b3b57de")  # addr(bytes32)
+NAME = bytes.fromhex("691f3431")  # name(bytes32)
+
+MULTICALL_BATCH = 200  # lookups per eth_call
+
+
+def namehash(name):
+    """EIP-137 namehash of a normalised (lower-case) ENS name"""
+    from eth_hash.auto import keccak
+
+    node = b"\0" * 32
+    if name:
+        for label in reversed(name.split(".")):
+            node = keccak(node + keccak(label.encode()))
+    return node
+
+
+def reverse_node(address):
+    """namehash of <address>.addr.reverse"""
+    return namehash(f"{address.lower()[2:]}.addr.reverse")
+
+
+# ============================================================
+# JSON-RPC / Multicall3
+# ============================================================
+def eth_call(rpc_url, to, data):
+    """eth_call at the latest block -> returned bytes; UpstreamError if the node fails"""
+    payload = {"jsonrpc": "2.0", "id": 1, "method": "eth_call",
+               "params": [{"to": to, "data": "0x" + data.hex()}, "latest"]}
+    res = http_client.post(rpc_url, json=payload)
+    body = res.json() if res.status_code == 200 else {}
+    result = body.get("result")
+    if not isinstance(result, str):
+        raise UpstreamError(f"eth_call failed: {body.get('error') or res.status_code}")
+    return bytes.fromhex(result[2:])
+
+
+def multicall(rpc_url, calls):
+    """[(success, return bytes)] for [(target, calldata)]; one aggregate3 eth_call per MULTICALL_BATCH"""
+    from eth_abi import decode, encode
+
+    results = []
+    for i in range(0, len(calls), MULTICALL_BATCH):
+        chunk = [(target, True, data) for target, data in calls[i:i + MULTICALL_BATCH]]
+        returned = eth_call(rpc_url, MULTICALL3, AGGREGATE3 + encode(["(address,bool,bytes)[]"], [chunk]))
+        results.extend(decode(["(bool,bytes)[]"], returned)[0])
+    return results
+
+
+def decode_address(success, data):
+    """A returned address word; None for failed calls and the zero address"""
+    if not success or len(data) < 32:
+        return None
+    addr = "0x" + data[12:32].hex()
+    return None if addr == ZERO_ADDRESS else addr
+
+
+def decode_string(success, data):
+    """A returned ABI string; None for failed calls and empty strings"""
+    from eth_abi import decode
+
+    if not success or len(data) < 64:
+        return None
+    try:
+        return decode(["string"], data)[0] or None
+    except Exception:
+        return None
+
+
+def resolver_round(rpc_url, nodes, selector, decoder):
+    """{index: decoder(resolver(node).<selector>(node))} for the nodes that have a resolver set"""
+    resolvers = [decode_address(*r) for r in multicall(rpc_url, [(ENS_REGISTRY, RESOLVER + node) for node in nodes])]
+    pending = [(i, resolver) for i, resolver in enumerate(resolvers) if resolver]
+    answers = multicall(rpc_url, [(resolver, selector + nodes[i]) for i, resolver in pending])
+    return {i: decoder(*answer) for (i, _), answer in zip(pending, answers)}
+
+
+# ============================================================
+# Forward / reverse lookups (uncached; see wallet_core for the cached API)
+# ============================================================
+def forward_lookup(rpc_url, names):
+    """{name: checksummed address or None} for lower-case ENS names; UpstreamError if the node fails
+
+    Names with no resolver in the registry are left out: wildcard (ENSIP-10)
+    and off-chain names only resolve through a client that follows them.
+    """
+    names = list(dict.fromkeys(names))
+    if not names:
+        return {}
+    found = resolver_round(rpc_url, [namehash(name) for name in names], ADDR, decode_address)
+    return {names[i]: to_checksum_address(addr) if addr else None for i, addr in found.items()}
+
+
+def reverse_lookup(rpc_url, addresses):
+    """{address: primary name or None} for lower-case 0x addresses, forward-verified"""
+    addresses = list(dict.fromkeys(addresses))
+    if not addresses:
+        return {}
+    found = resolver_round(rpc_url, [reverse_node(a) for a in addresses], NAME, decode_string)
+    claimed = {addr: found.get(i) for i, addr in enumerate(addresses)}
+    forward = forward_lookup(rpc_url, [name.lower() for name in claimed.values() if name])
+    return {
+        addr: name if name and (forward.get(name.lower()) or "").lower() == addr else None
+        for addr, name in claimed.items()
+    }
@@ -0,0 +1,360 @@
+# ============================================================
+# Per-address transaction history store
+# 記錄每個地址已抓取的交易與最新游標 (block / signature / n_tx)，
+# 之後只向上游要求比游標更新的紀錄再合併；
+# 另以 ActivityIndex 索引所有查詢過錢包的交易，可跨錢包依對手方 / 資產 / 類型 / 時間搜尋
+# ============================================================
+
+import json
+import os
+import sqlite3
+import time
+import uuid
+
+from persistent_cache import SQLiteStore
+
+# Newest records kept per (chain, address, kind)
+HISTORY_MAX_RECORDS = int(os.getenv("WALLET_HISTORY_MAX_RECORDS", "300"))
+# Deep-history spools older than this are dropped (seconds)
+SPOOL_MAX_AGE = 86400
+
+
+class HistoryStore(SQLiteStore):
+    """SQLite-backed per-address history with a sync cursor per stream"""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS history (
+            chain     TEXT NOT NULL,
+            address   TEXT NOT NULL,
+            kind      TEXT NOT NULL,
+            record_id TEXT NOT NULL,
+            sort_key  INTEGER NOT NULL,
+            record    TEXT NOT NULL,
+            PRIMARY KEY (chain, address, kind, record_id)
+        );
+        CREATE INDEX IF NOT EXISTS history_sort ON history (chain, address, kind, sort_key DESC);
+        CREATE TABLE IF NOT EXISTS sync_state (
+            chain     TEXT NOT NULL,
+            address   TEXT NOT NULL,
+            kind      TEXT NOT NULL,
+            cursor    TEXT NOT NULL,
+            synced_at REAL NOT NULL,
+            PRIMARY KEY (chain, address, kind)
+        );
+    """
+
+    def __init__(self, filename="wallet_history.sqlite3", max_records=HISTORY_MAX_RECORDS):
+        super().__init__(filename)
+        self.max_records = max_records
+
+    def get_cursor(self, chain, address, kind):
+        """Newest cursor synced for this stream, or None if never synced"""
+        try:
+            row = self._conn().execute(
+                "SELECT cursor FROM sync_state WHERE chain = ? AND address = ? AND kind = ?",
+                (chain, address, kind),
+            ).fetchone()
+        except sqlite3.Error:
+            return None
+        return row[0] if row else None
+
+    def load(self, chain, address, kind, limit=None):
+        """Stored records, newest first"""
+        try:
+            rows = self._conn().execute(
+                "SELECT record FROM history WHERE chain = ? AND address = ? AND kind = ? "
+                "ORDER BY sort_key DESC LIMIT ?",
+                (chain, address, kind, limit or self.max_records),
+            ).fetchall()
+        except sqlite3.Error:
+            return []
+        return [json.loads(record) for (record,) in rows]
+
+    def merge(self, chain, address, kind, records, cursor, replace=False):
+        """Upsert [(record_id, sort_key, record)] and advance the cursor
+
+        replace=True drops the stored history first (used when the gap since
+        the last sync was larger than one upstream page).
+        """
+        try:
+            conn = self._conn()
+            with conn:
+                if replace:
+                    conn.execute(
+                        "DELETE FROM history WHERE chain = ? AND address = ? AND kind = ?",
+                        (chain, address, kind),
+                    )
+                conn.executemany(
+                    "INSERT OR REPLACE INTO history (chain, address, kind, record_id, sort_key, record) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    [(chain, address, kind, rid, int(key), json.dumps(rec)) for rid, key, rec in records],
+                )
+                # Only the newest max_records are ever displayed
+                conn.execute(
+                    "DELETE FROM history WHERE chain = ? AND address = ? AND kind = ? AND record_id NOT IN ("
+                    "SELECT record_id FROM history WHERE chain = ? AND address = ? AND kind = ? "
+                    "ORDER BY sort_key DESC LIMIT ?)",
+                    (chain, address, kind, chain, address, kind, self.max_records),
+                )
+                if cursor is not None:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO sync_state (chain, address, kind, cursor, synced_at) "
+                        "VALUES (?, ?, ?, ?, ?)",
+                        (chain, address, kind, str(cursor), time.time()),
+                    )
+        except (sqlite3.Error, TypeError, ValueError):
+            pass
+
+
+class ActivitySpool(SQLiteStore):
+    """Interpreted deep-history rows spilled to disk and read back one page at a time
+
+    Keeps the UI's memory bounded for histories of tens of thousands of rows.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS spools (
+            spool_id   TEXT PRIMARY KEY,
+            created_at REAL NOT NULL,
+            row_count  INTEGER NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS spool_rows (
+            spool_id TEXT NOT NULL,
+            seq      INTEGER NOT NULL,
+            row      TEXT NOT NULL,
+            PRIMARY KEY (spool_id, seq)
+        );
+    """
+
+    def __init__(self, filename="wallet_spool.sqlite3"):
+        super().__init__(filename)
+
+    def create(self):
+        """Start a new spool (expiring stale ones) and return its id"""
+        spool_id = uuid.uuid4().hex
+        conn = self._conn()
+        with conn:
+            stale = [sid for (sid,) in conn.execute(
+                "SELECT spool_id FROM spools WHERE created_at < ?", (time.time() - SPOOL_MAX_AGE,)
+            )]
+            for sid in stale:
+                self._drop(conn, sid)
+            conn.execute("INSERT INTO spools (spool_id, created_at, row_count) VALUES (?, ?, 0)",
+                         (spool_id, time.time()))
+        return spool_id
+
+    def append(self, spool_id, rows):
+        conn = self._conn()
+        with conn:
+            (start,) = conn.execute("SELECT row_count FROM spools WHERE spool_id = ?", (spool_id,)).fetchone()
+            conn.executemany(
+                "INSERT INTO spool_rows (spool_id, seq, row) VALUES (?, ?, ?)",
+                [(spool_id, start + i, json.dumps(row, ensure_ascii=False)) for i, row in enumerate(rows)],
+            )
+            conn.execute("UPDATE spools SET row_count = ? WHERE spool_id = ?", (start + len(rows), spool_id))
+
+    def count(self, spool_id):
+        try:
+            row = self._conn().execute("SELECT row_count FROM spools WHERE spool_id = ?", (spool_id,)).fetchone()
+        except sqlite3.Error:
+            return 0
+        return row[0] if row else 0
+
+    def page(self, spool_id, page, page_size):
+        """Rows of a 0-based page, in the order they were appended"""
+        start = page * page_size
+        rows = self._conn().execute(
+            "SELECT row FROM spool_rows WHERE spool_id = ? AND seq >= ? AND seq < ? ORDER BY seq",
+            (spool_id, start, start + page_size),
+        ).fetchall()
+        return [json.loads(row) for (row,) in rows]
+
+    def drop(self, spool_id):
+        conn = self._conn()
+        with conn:
+            self._drop(conn, spool_id)
+
+    @staticmethod
+    def _drop(conn, spool_id):
+        conn.execute("DELETE FROM spool_rows WHERE spool_id = ?", (spool_id,))
+        conn.execute("DELETE FROM spools WHERE spool_id = ?", (spool_id,))
+
+
+def address_key(addr):
+    """Indexed form of a wallet / counterparty address: EVM hex is case-insensitive, base58 is not"""
+    if not addr:
+        return None
+    addr = addr.strip()
+    return addr.lower() if addr[:2] in ("0x", "0X") else addr
+
+
+class ActivityIndex(SQLiteStore):
+    """Normalized TxRecords of every wallet ever looked up, indexed for cross-wallet search
+
+    Rows are upserted whenever a wallet's history is processed, so the index
+    only grows; the full record is kept as JSON next to the indexed columns.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS activity (
+            wallet       TEXT NOT NULL,
+            chain        TEXT NOT NULL,
+            record_id    TEXT NOT NULL,
+            timestamp    INTEGER NOT NULL,
+            kind         TEXT NOT NULL,
+            asset        TEXT COLLATE NOCASE,
+            counterparty TEXT,
+            note         TEXT,
+            record       TEXT NOT NULL,
+            PRIMARY KEY (wallet, chain, record_id)
+        );
+        CREATE INDEX IF NOT EXISTS activity_counterparty ON activity (counterparty, timestamp DESC);
+        CREATE INDEX IF NOT EXISTS activity_asset ON activity (asset, timestamp DESC);
+        CREATE INDEX IF NOT EXISTS activity_kind ON activity (kind, timestamp DESC);
+        CREATE INDEX IF NOT EXISTS activity_time ON activity (timestamp DESC);
+    """
+
+    def __init__(self, filename="wallet_activity.sqlite3"):
+        super().__init__(filename)
+
+    def add(self, wallet, records, complete=True):
+        """Upsert one wallet's TxRecords, replacing whatever was indexed for the same transactions
+
+        A row is identified by (wallet, chain, hash, leg), leg being the
+        record's position among the transaction's records, so re-interpreting
+        a transaction (a new token symbol, a send that became internal)
+        updates its rows instead of adding new ones. Pass every leg of a
+        transaction in one call; with complete=False (a capped list) the
+        transactions at each chain's oldest timestamp may be cut short, so
+        their other stored legs are kept.
+        """
+        wallet = address_key(wallet)
+        rows, legs, times = [], {}, {}
+        for r in records:
+            if not r.hash:
+                continue
+            ids = legs.setdefault((r.chain, r.hash), [])
+            ids.append(f"{r.hash}:{len(ids)}")
+            times[r.chain, r.hash] = int(r.timestamp)
+            rows.append((wallet, r.chain, ids[-1], int(r.timestamp), r.kind, r.asset, address_key(r.counterparty),
+                         r.note, json.dumps(r.to_dict(), ensure_ascii=False)))
+        if not rows:
+            return
+        if not complete:
+            oldest = {}
+            for (chain, _), timestamp in times.items():
+                oldest[chain] = min(oldest.get(chain, timestamp), timestamp)
+            legs = {key: ids for key, ids in legs.items() if times[key] != oldest[key[0]]}
+        try:
+            conn = self._conn()
+            with conn:
+                # Drop rows of these transactions that the new legs do not cover
+                conn.executemany(
+                    "DELETE FROM activity WHERE wallet = ? AND chain = ? AND record_id >= ? AND record_id < ? "
+                    "AND record_id NOT IN (SELECT value FROM json_each(?))",
+                    [(wallet, chain, f"{tx_hash}:", f"{tx_hash};", json.dumps(ids))
+                     for (chain, tx_hash), ids in legs.items()],
+                )
+                # Re-indexing an unchanged record is a no-op (no index writes)
+                conn.executemany(
+                    "INSERT INTO activity (wallet, chain, record_id, timestamp, kind, asset, counterparty, note, record) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?) ON CONFLICT (wallet, chain, record_id) DO UPDATE SET "
+                    "timestamp = excluded.timestamp, kind = excluded.kind, asset = excluded.asset, "
+                    "counterparty = excluded.counterparty, note = excluded.note, record = excluded.record "
+                    "WHERE record != excluded.record",
+                    rows,
+                )
+        except (sqlite3.Error, TypeError, ValueError):
+            pass
+
+    @staticmethod
+    def _where(counterparty=None, asset=None, kinds=None, note=None, wallet=None, since=None, until=None):
+        clauses, params = [], []
+        if counterparty:
+            clauses.append("counterparty = ?")
+            params.append(address_key(counterparty))
+        if asset:
+            clauses.append("asset = ?")
+            params.append(asset.strip())
+        if kinds:
+            clauses.append(f"kind IN ({','.join('?' * len(kinds))})")
+            params.extend(kinds)
+        if note:
+            clauses.append("note LIKE ?")
+            params.append(f"%{note.strip()}%")
+        if wallet:
+            clauses.append("wallet = ?")
+            params.append(address_key(wallet))
+        if since is not None:
+            clauses.append("timestamp >= ?")
+            params.append(int(since))
+        if until is not None:
+            clauses.append("timestamp < ?")
+            params.append(int(until))
+        return " AND ".join(clauses) or "1", params
+
+    def search(self, limit=500, **filters):
+        """[(wallet, record dict)] newest first matching every given filter
+
+        Filters: counterparty (address), asset (symbol, any case), kinds
+        (tuple of TxRecord kinds), note (substring, e.g. a staking protocol),
+        wallet, since / until (unix seconds, until exclusive).
+        """
+        where, params = self._where(**filters)
+        try:
+            rows = self._conn().execute(
+                f"SELECT wallet, record FROM activity WHERE {where} ORDER BY timestamp DESC LIMIT ?",
+                [*params, limit],
+            ).fetchall()
+        except sqlite3.Error:
+            return []
+        return [(wallet, json.loads(record)) for wallet, record in rows]
+
+    def interactions(self, **filters):
+        """[{"wallet", "chain", "count", "first", "last"}] per indexed wallet with matching records, latest first"""
+        where, params = self._where(**filters)
+        try:
+            rows = self._conn().execute(
+                f"SELECT wallet, chain, COUNT(*), MIN(timestamp), MAX(timestamp) FROM activity WHERE {where} "
+                "GROUP BY wallet, chain ORDER BY MAX(timestamp) DESC",
+                params,
+            ).fetchall()
+        except sqlite3.Error:
+            return []
+        return [{"wallet": w, "chain": c, "count": n, "first": first, "last": last} for w, c, n, first, last in rows]
+
+    def stats(self):
+        """(indexed wallets, indexed records)"""
+        try:
+            return self._conn().execute("SELECT COUNT(DISTINCT wallet), COUNT(*) FROM activity").fetchone()
+        except sqlite3.Error:
+            return 0, 0
+
+
+_store = None
+_spool = None
+_index = None
+
+
+def get_history_store():
+    """Process-wide HistoryStore instance"""
+    global _store
+    if _store is None:
+        _store = HistoryStore()
+    return _store
+
+
+def get_activity_spool():
+    """Process-wide ActivitySpool instance"""
+    global _spool
+    if _spool is None:
+        _spool = ActivitySpool()
+    return _spool
+
+
+def get_activity_index():
+    """Process-wide ActivityIndex instance"""
+    global _index
+    if _index is None:
+        _index = ActivityIndex()
+    return _index
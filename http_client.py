@@ -0,0 +1,128 @@
+# ============================================================
+# Shared HTTP client
+# 所有上游 API (Etherscan / Helius / Blockchain.info / Hyperliquid / ENS)
+# 共用同一個連線池，避免每次請求都重新握手 TLS
+#
+# NOTE: requests/urllib3 only speak HTTP/1.1. Keep-alive on a pooled
+# session removes the per-call TCP + TLS handshake, which is where the
+# latency went; HTTP/2 multiplexing is not available on this stack.
+# ============================================================
+
+import os
+import re
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import instrumentation
+import rate_limit
+
+# Number of per-host pools kept alive (one per upstream API host)
+POOL_CONNECTIONS = int(os.getenv("HTTP_POOL_CONNECTIONS", "10"))
+# Max keep-alive connections per host (should cover the fetch thread pool)
+POOL_MAXSIZE = int(os.getenv("HTTP_POOL_MAXSIZE", "20"))
+DEFAULT_TIMEOUT = 10
+
+MAX_RETRIES = int(os.getenv("HTTP_MAX_RETRIES", "3"))
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# Wallet addresses / ENS names in paths would give every wallet its own metric series
+ADDRESS_SEGMENT = re.compile(r"^(0x[0-9a-fA-F]{40}|[1-9A-HJ-NP-Za-km-z]{25,44}|bc1[0-9a-z]{8,87}|[^/]+\.eth)$")
+
+_session = None
+_session_lock = threading.Lock()
+
+
+class UpstreamError(Exception):
+    """An upstream API could not be reached or kept failing after retries"""
+
+
+def get_session():
+    """Return the process-wide pooled session, creating it on first use"""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(
+                    pool_connections=POOL_CONNECTIONS,
+                    pool_maxsize=POOL_MAXSIZE,
+                    pool_block=False,
+                )
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                _session = session
+    return _session
+
+
+def is_soft_throttled(provider, res):
+    """Etherscan reports rate limiting as HTTP 200 with a NOTOK string result"""
+    if provider != "etherscan" or res.status_code != 200:
+        return False
+    return "rate limit" in res.text[:300].lower()
+
+
+def endpoint_label(url, params=None, json=None):
+    """Low-cardinality endpoint name for metrics: rpc:<method>, info:<type>, module/action or the path"""
+    if isinstance(json, dict):
+        if json.get("method"):
+            return f"rpc:{json['method']}"
+        if json.get("type"):
+            return f"info:{json['type']}"
+    if isinstance(params, dict) and params.get("action"):
+        return f"{params.get('module', '')}/{params['action']}"
+    segments = [":address" if ADDRESS_SEGMENT.match(s) else s for s in urlsplit(url).path.split("/") if s]
+    return "/" + "/".join(segments)
+
+
+def request(method, url, retries=MAX_RETRIES, **kwargs):
+    """Send a request through the provider's token bucket, retrying throttles and 5xx
+
+    Retry-After is honoured (and pauses the whole provider on 429); otherwise
+    jittered exponential backoff is used. The last response is returned once
+    retries are exhausted; connection errors are re-raised.
+    """
+    kwargs.setdefault("timeout", DEFAULT_TIMEOUT)
+    provider = rate_limit.provider_for(url)
+    label = provider or urlsplit(url).hostname or "unknown"
+    endpoint = endpoint_label(url, kwargs.get("params"), kwargs.get("json"))
+    for attempt in range(retries + 1):
+        rate_limit.acquire(provider)
+        started = time.perf_counter()
+        try:
+            res = get_session().request(method, url, **kwargs)
+        except requests.RequestException as e:
+            instrumentation.record_upstream(
+                label, endpoint, method, type(e).__name__, 0, time.perf_counter() - started, attempt)
+            if attempt == retries:
+                raise
+            time.sleep(rate_limit.backoff_delay(attempt))
+            continue
+        instrumentation.record_upstream(
+            label, endpoint, method, res.status_code, len(res.content), time.perf_counter() - started, attempt)
+
+        throttled = res.status_code == 429 or is_soft_throttled(provider, res)
+        if not throttled and res.status_code not in RETRY_STATUSES:
+            return res
+        if attempt == retries:
+            return res
+        delay = rate_limit.retry_after_seconds(res)
+        if delay is None:
+            delay = rate_limit.backoff_delay(attempt)
+        if throttled:
+            rate_limit.pause(provider, delay)
+        time.sleep(delay)
+    return res
+
+
+def get(url, **kwargs):
+    """GET through the shared session (default 10s timeout)"""
+    return request("GET", url, **kwargs)
+
+
+def post(url, **kwargs):
+    """POST through the shared session (default 10s timeout)"""
+    return request("POST", url, **kwargs)
@@ -0,0 +1,131 @@
+# ============================================================
+# Hyperliquid WebSocket recorder / replay stand-in
+# 錄製 Hyperliquid WebSocket 訊框，並在本機重播，供離線測試即時倉位串流
+#
+# Usage:
+#   python hyperliquid_replay.py record 0xADDRESS frames.jsonl --seconds 60
+#   python hyperliquid_replay.py serve frames.jsonl --port 8765 --loop
+#   HYPERLIQUID_WS_URL=ws://127.0.0.1:8765 streamlit run wallet_activity_dashboard.py
+#
+# Recorded position frames are re-addressed to whichever user subscribes,
+# so one recording can drive any wallet in the dashboard.
+# ============================================================
+
+import argparse
+import json
+import threading
+import time
+
+from websockets.exceptions import ConnectionClosed
+from websockets.sync.client import connect
+from websockets.sync.server import serve
+
+from hyperliquid_stream import HYPERLIQUID_WS_URL, MIDS_SUBSCRIPTION, POSITION_CHANNELS, position_subscription
+
+
+def record(address, path, seconds, url=HYPERLIQUID_WS_URL):
+    """Write {"t": offset_seconds, "frame": message} lines for `seconds` of live traffic"""
+    started = time.monotonic()
+    count = 0
+    with connect(url) as ws, open(path, "w", encoding="utf-8") as fh:
+        for subscription in (MIDS_SUBSCRIPTION, position_subscription(address.lower())):
+            ws.send(json.dumps({"method": "subscribe", "subscription": subscription}))
+        while time.monotonic() - started < seconds:
+            try:
+                raw = ws.recv(timeout=1)
+            except TimeoutError:
+                continue
+            frame = json.loads(raw)
+            if frame.get("channel") in ("allMids", *POSITION_CHANNELS):
+                fh.write(json.dumps({"t": round(time.monotonic() - started, 3), "frame": frame}) + "\n")
+                count += 1
+    return count
+
+
+def load_frames(path):
+    with open(path, encoding="utf-8") as fh:
+        return [json.loads(line) for line in fh if line.strip()]
+
+
+def make_handler(frames, speed=1.0, loop=False):
+    """Connection handler replaying `frames` to each client according to its subscriptions"""
+
+    def handler(ws):
+        users = set()
+        mids = threading.Event()
+        subscribed = threading.Event()  # set once a user is subscribed
+
+        def read_requests():
+            try:
+                for raw in ws:
+                    msg = json.loads(raw)
+                    if msg.get("method") == "ping":
+                        ws.send(json.dumps({"channel": "pong"}))
+                        continue
+                    sub = msg.get("subscription") or {}
+                    if sub.get("type") == "allMids":
+                        mids.set()
+                    elif sub.get("user") and msg.get("method") == "subscribe":
+                        users.add(sub["user"].lower())
+                        subscribed.set()
+                    elif sub.get("user"):
+                        users.discard(sub["user"].lower())
+                    ws.send(json.dumps({"channel": "subscriptionResponse", "data": msg}))
+            except (ConnectionClosed, ValueError):
+                pass
+
+        reader = threading.Thread(target=read_requests, daemon=True)
+        reader.start()
+        # Playback starts once a user is subscribed so no opening frame is lost
+        subscribed.wait(10)
+        try:
+            while reader.is_alive():
+                started = time.monotonic()
+                for item in frames:
+                    delay = item["t"] / speed - (time.monotonic() - started)
+                    if delay > 0:
+                        time.sleep(delay)
+                    frame = item["frame"]
+                    if frame.get("channel") == "allMids":
+                        if mids.is_set():
+                            ws.send(json.dumps(frame))
+                        continue
+                    for user in list(users):
+                        ws.send(json.dumps({**frame, "data": {**frame["data"], "user": user}}))
+                if not loop:
+                    break
+            reader.join()
+        except ConnectionClosed:
+            pass
+
+    return handler
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Record or replay Hyperliquid WebSocket frames")
+    sub = parser.add_subparsers(dest="command", required=True)
+    rec = sub.add_parser("record", help="capture live frames for one address")
+    rec.add_argument("address")
+    rec.add_argument("output")
+    rec.add_argument("--seconds", type=float, default=60)
+    srv = sub.add_parser("serve", help="replay recorded frames as a local WebSocket server")
+    srv.add_argument("frames")
+    srv.add_argument("--host", default="127.0.0.1")
+    srv.add_argument("--port", type=int, default=8765)
+    srv.add_argument("--speed", type=float, default=1.0, help="replay speed multiplier")
+    srv.add_argument("--loop", action="store_true", help="replay the recording forever")
+    args = parser.parse_args(argv)
+
+    if args.command == "record":
+        count = record(args.address, args.output, args.seconds)
+        print(f"recorded {count} frames to {args.output}")
+        return
+
+    frames = load_frames(args.frames)
+    with serve(make_handler(frames, args.speed, args.loop), args.host, args.port) as server:
+        print(f"replaying {len(frames)} frames on ws://{args.host}:{args.port}")
+        server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+# ============================================================
+# Hyperliquid live position stream
+# 透過 WebSocket 訂閱 Hyperliquid 倉位 (webData2) 與標記價格 (allMids)，
+# 在記憶體中維護每個地址的最新倉位，UI 只需讀取快照即可即時更新
+#
+# One connection per process carries every watched address. Point
+# HYPERLIQUID_WS_URL at hyperliquid_replay.py to run against recorded
+# frames instead of the live feed.
+# ============================================================
+
+import copy
+import json
+import os
+import threading
+import time
+
+from websockets.exceptions import WebSocketException
+from websockets.sync.client import connect
+
+import rate_limit
+
+HYPERLIQUID_WS_URL = os.getenv("HYPERLIQUID_WS_URL", "wss://api.hyperliquid.xyz/ws")
+PING_INTERVAL = 30   # Hyperliquid closes connections idle for 60s
+WATCH_TIMEOUT = 300  # addresses whose snapshot is not read for this long are unsubscribed
+POSITION_CHANNELS = ("webData2", "clearinghouseState")
+
+
+def position_subscription(address):
+    return {"type": "webData2", "user": address}
+
+
+MIDS_SUBSCRIPTION = {"type": "allMids"}
+
+
+def mark_positions(clearinghouse, mids):
+    """Copy of a clearinghouseState with markPx / unrealizedPnl re-marked at the latest mids"""
+    state = copy.deepcopy(clearinghouse)
+    for item in state.get("assetPositions") or []:
+        pos = item.get("position") or {}
+        mid = mids.get(pos.get("coin"))
+        if mid is None:
+            continue
+        try:
+            mark = float(mid)
+            size = float(pos.get("szi", 0))
+            entry = float(pos.get("entryPx") or 0)
+        except (TypeError, ValueError):
+            continue
+        pos["markPx"] = mid
+        if entry:
+            pos["unrealizedPnl"] = str(size * (mark - entry))
+    return state
+
+
+class HyperliquidStream:
+    """Shared WebSocket subscription keeping the latest positions of watched addresses
+
+    watch() subscribes an address and snapshot() returns its current state. The
+    connection runs on a daemon thread, reconnects with backoff and re-subscribes
+    whatever is still watched; it shuts down once nothing has been read for
+    WATCH_TIMEOUT seconds.
+    """
+
+    def __init__(self, url=HYPERLIQUID_WS_URL):
+        self.url = url
+        self.connected = False
+        self.last_error = None
+        self._lock = threading.Lock()
+        self._watched = {}     # address -> last snapshot() time
+        self._positions = {}   # address -> (clearinghouseState, received_at)
+        self._mids = {}
+        self._outbox = []
+        self._thread = None
+
+    def watch(self, address):
+        key = address.lower()
+        with self._lock:
+            if key not in self._watched:
+                self._outbox.append({"method": "subscribe", "subscription": position_subscription(key)})
+            self._watched[key] = time.monotonic()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="hyperliquid-stream", daemon=True)
+                self._thread.start()
+
+    def unwatch(self, address):
+        key = address.lower()
+        with self._lock:
+            if self._watched.pop(key, None) is not None:
+                self._outbox.append({"method": "unsubscribe", "subscription": position_subscription(key)})
+            self._positions.pop(key, None)
+
+    def snapshot(self, address):
+        """(clearinghouseState re-marked at live mids, received_at) or None before the first frame"""
+        key = address.lower()
+        with self._lock:
+            if key in self._watched:
+                self._watched[key] = time.monotonic()
+            entry = self._positions.get(key)
+            if entry is None:
+                return None
+            clearinghouse, received_at = entry
+            return mark_positions(clearinghouse, self._mids), received_at
+
+    def apply_message(self, msg):
+        """Fold one decoded server frame into the in-memory state"""
+        channel = msg.get("channel")
+        data = msg.get("data") or {}
+        if channel == "allMids":
+            with self._lock:
+                self._mids.update(data.get("mids") or {})
+        elif channel in POSITION_CHANNELS:
+            user = (data.get("user") or "").lower()
+            clearinghouse = data.get("clearinghouseState")
+            if not clearinghouse:
+                return
+            with self._lock:
+                if user in self._watched:
+                    self._positions[user] = (clearinghouse, time.time())
+
+    def _keep_running(self):
+        """Expire idle watches; False once this connection thread should exit"""
+        cutoff = time.monotonic() - WATCH_TIMEOUT
+        with self._lock:
+            for key in [k for k, seen in self._watched.items() if seen < cutoff]:
+                del self._watched[key]
+                self._positions.pop(key, None)
+                self._outbox.append({"method": "unsubscribe", "subscription": position_subscription(key)})
+            if self._thread is not threading.current_thread():
+                return False
+            if not self._watched:
+                self._thread = None
+                return False
+        return True
+
+    def _run(self):
+        attempt = 0
+        while self._keep_running():
+            try:
+                with connect(self.url, open_timeout=10) as ws:
+                    with self._lock:
+                        self._outbox = [{"method": "subscribe", "subscription": position_subscription(key)}
+                                        for key in self._watched]
+                    ws.send(json.dumps({"method": "subscribe", "subscription": MIDS_SUBSCRIPTION}))
+                    self.connected, self.last_error, attempt = True, None, 0
+                    last_ping = time.monotonic()
+                    while self._keep_running():
+                        with self._lock:
+                            outbox, self._outbox = self._outbox, []
+                        for msg in outbox:
+                            ws.send(json.dumps(msg))
+                        if time.monotonic() - last_ping > PING_INTERVAL:
+                            ws.send(json.dumps({"method": "ping"}))
+                            last_ping = time.monotonic()
+                        try:
+                            raw = ws.recv(timeout=1)
+                        except TimeoutError:
+                            continue
+                        try:
+                            self.apply_message(json.loads(raw))
+                        except (ValueError, AttributeError):
+                            pass
+            except (OSError, WebSocketException) as e:
+                self.last_error = f"{type(e).__name__}: {e}"
+                time.sleep(rate_limit.backoff_delay(min(attempt, 6)))
+                attempt += 1
+            finally:
+                self.connected = False
+
+
+_stream = None
+_stream_lock = threading.Lock()
+
+
+def get_hyperliquid_stream():
+    """Process-wide HyperliquidStream instance"""
+    global _stream
+    if _stream is None:
+        with _stream_lock:
+            if _stream is None:
+                _stream = HyperliquidStream()
+    return _stream
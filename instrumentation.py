@@ -0,0 +1,279 @@
+# ============================================================
+# Hot-path instrumentation
+# 記錄每個上游請求 (provider / endpoint / status / bytes / 延遲) 與處理階段的耗時，
+# 輸出 Prometheus 格式指標，並可保存單次查詢的完整 trace 供偵錯面板或離線分析
+#
+# - Metrics are process-wide and always on (a dict update under a lock)
+# - Spans are also collected into a Trace while one is active: wrap a lookup
+#   in `with trace(label):` and hand work to other threads via propagate()
+# - WALLET_METRICS_PORT=9464 serves /metrics for Prometheus to scrape
+# ============================================================
+
+import contextvars
+import functools
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+METRICS_PORT = os.getenv("WALLET_METRICS_PORT")
+
+METRIC_HELP = {
+    "wallet_upstream_requests_total": ("counter", "Upstream HTTP attempts by provider, endpoint and status"),
+    "wallet_upstream_bytes_total": ("counter", "Upstream response body bytes"),
+    "wallet_upstream_latency_seconds": ("histogram", "Upstream HTTP attempt latency"),
+    "wallet_upstream_errors_total": ("counter", "Upstream calls that returned no usable data, by reason"),
+    "wallet_cache_requests_total": ("counter", "Persistent cache lookups by namespace and result"),
+    "wallet_stage_seconds": ("histogram", "Processing stage duration"),
+    "wallet_stage_errors_total": ("counter", "Processing stages that raised"),
+}
+
+
+class Metrics:
+    """Thread-safe counters and histograms rendered in Prometheus text format"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}    # (name, labels) -> value
+        self._histograms = {}  # (name, labels) -> [bucket counts..., sum, count]
+
+    def inc(self, name, labels, value=1):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, labels, value):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            hist = self._histograms.get(key)
+            if hist is None:
+                hist = self._histograms[key] = [0] * len(LATENCY_BUCKETS) + [0.0, 0]
+            for i, bound in enumerate(LATENCY_BUCKETS):
+                if value <= bound:
+                    hist[i] += 1
+            hist[-2] += value
+            hist[-1] += 1
+
+    def render(self):
+        """Prometheus text exposition of every metric recorded so far"""
+        with self._lock:
+            counters = dict(self._counters)
+            histograms = {key: list(hist) for key, hist in self._histograms.items()}
+
+        lines = []
+        names = sorted({name for name, _ in counters} | {name for name, _ in histograms})
+        for name in names:
+            kind, help_text = METRIC_HELP.get(name, ("untyped", name))
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for (metric, labels), value in sorted(counters.items()):
+                if metric == name:
+                    lines.append(f"{name}{_labels(labels)} {value:g}")
+            for (metric, labels), hist in sorted(histograms.items()):
+                if metric != name:
+                    continue
+                for bound, count in zip(LATENCY_BUCKETS, hist):
+                    lines.append(f"{name}_bucket{_labels(labels + (('le', f'{bound:g}'),))} {count}")
+                lines.append(f"{name}_bucket{_labels(labels + (('le', '+Inf'),))} {hist[-1]}")
+                lines.append(f"{name}_sum{_labels(labels)} {hist[-2]:.6f}")
+                lines.append(f"{name}_count{_labels(labels)} {hist[-1]}")
+        return "\n".join(lines) + "\n"
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    escaped = (
+        f'{k}="' + str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") + '"'
+        for k, v in labels
+    )
+    return "{" + ",".join(escaped) + "}"
+
+
+class Trace:
+    """Spans recorded during one lookup, from every thread it fanned out to"""
+
+    def __init__(self, label):
+        self.label = label
+        self.started_at = time.time()
+        self.duration = None
+        self.spans = []
+        self._t0 = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def add(self, span):
+        span["offset_ms"] = round((span.pop("_start") - self._t0) * 1000, 2)
+        with self._lock:
+            self.spans.append(span)
+
+    def stage_summary(self):
+        """[{kind, name, calls, total_ms, max_ms}] sorted by total time"""
+        groups = {}
+        for span in self.spans:
+            key = (span["kind"], span["name"])
+            group = groups.setdefault(key, {"kind": key[0], "name": key[1], "calls": 0, "total_ms": 0.0, "max_ms": 0.0})
+            group["calls"] += 1
+            group["total_ms"] = round(group["total_ms"] + span["ms"], 2)
+            group["max_ms"] = max(group["max_ms"], span["ms"])
+        return sorted(groups.values(), key=lambda g: g["total_ms"], reverse=True)
+
+    def to_dict(self):
+        with self._lock:
+            spans = sorted(self.spans, key=lambda s: s["offset_ms"])
+        return {
+            "label": self.label,
+            "started_at": self.started_at,
+            "duration_ms": round(self.duration * 1000, 2) if self.duration is not None else None,
+            "spans": spans,
+            "summary": self.stage_summary(),
+        }
+
+
+_metrics = Metrics()
+_current_trace = contextvars.ContextVar("wallet_trace", default=None)
+
+
+def get_metrics():
+    """Process-wide Metrics instance"""
+    return _metrics
+
+
+def current_trace():
+    return _current_trace.get()
+
+
+@contextmanager
+def trace(label):
+    """Collect every span recorded in this context (and propagated threads) into a Trace"""
+    lookup = Trace(label)
+    token = _current_trace.set(lookup)
+    try:
+        yield lookup
+    finally:
+        lookup.duration = time.perf_counter() - lookup._t0
+        _current_trace.reset(token)
+
+
+def propagate(fn):
+    """Bind fn to the caller's trace, so spans from a worker thread join it
+
+    The wrapper may be submitted many times and run concurrently.
+    """
+    lookup = _current_trace.get()
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        token = _current_trace.set(lookup)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            _current_trace.reset(token)
+    return wrapper
+
+
+def _record(span):
+    lookup = _current_trace.get()
+    if lookup is not None:
+        lookup.add(span)
+
+
+@contextmanager
+def span(name, **attrs):
+    """Time a processing stage; extra attributes may be added to the yielded dict"""
+    record = {"kind": "stage", "name": name, **attrs, "_start": time.perf_counter()}
+    try:
+        yield record
+    except BaseException as e:
+        record["error"] = type(e).__name__
+        # Streamlit control flow (st.stop / reruns) is not a failure
+        if isinstance(e, Exception):
+            _metrics.inc("wallet_stage_errors_total", {"stage": name})
+        raise
+    finally:
+        seconds = time.perf_counter() - record["_start"]
+        record["ms"] = round(seconds * 1000, 2)
+        _metrics.observe("wallet_stage_seconds", {"stage": name}, seconds)
+        _record(record)
+
+
+def timed(name):
+    """Decorator form of span()"""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def record_upstream(provider, endpoint, method, status, nbytes, seconds, attempt):
+    """One upstream HTTP attempt (status is the HTTP code or an exception name)"""
+    labels = {"provider": provider, "endpoint": endpoint, "status": str(status)}
+    _metrics.inc("wallet_upstream_requests_total", labels)
+    _metrics.inc("wallet_upstream_bytes_total", {"provider": provider, "endpoint": endpoint}, nbytes)
+    _metrics.observe("wallet_upstream_latency_seconds", {"provider": provider, "endpoint": endpoint}, seconds)
+    _record({
+        "kind": "upstream", "name": f"{provider} {endpoint}", "provider": provider, "endpoint": endpoint,
+        "method": method, "status": status, "bytes": nbytes, "attempt": attempt,
+        "ms": round(seconds * 1000, 2), "_start": time.perf_counter() - seconds,
+    })
+
+
+def record_upstream_error(provider, endpoint, reason, detail=None):
+    """An upstream call whose response could not be used (reason: http_<code>, invalid_json, rpc_error or an exception name)"""
+    _metrics.inc("wallet_upstream_errors_total", {"provider": provider, "endpoint": endpoint, "reason": reason})
+    _record({"kind": "error", "name": f"{provider} {endpoint}", "provider": provider, "endpoint": endpoint,
+             "reason": reason, "detail": str(detail)[:200] if detail else None, "ms": 0.0,
+             "_start": time.perf_counter()})
+
+
+def record_cache(namespace, hits, misses):
+    """Outcome of one persistent-cache lookup batch"""
+    if hits:
+        _metrics.inc("wallet_cache_requests_total", {"namespace": namespace, "result": "hit"}, hits)
+    if misses:
+        _metrics.inc("wallet_cache_requests_total", {"namespace": namespace, "result": "miss"}, misses)
+    _record({"kind": "cache", "name": namespace, "hits": hits, "misses": misses, "ms": 0.0,
+             "_start": time.perf_counter()})
+
+
+# ============================================================
+# /metrics endpoint
+# ============================================================
+_server = None
+_server_lock = threading.Lock()
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = _metrics.render().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, fmt, *args):
+        pass
+
+
+def start_metrics_server(port=METRICS_PORT, host="0.0.0.0"):
+    """Serve /metrics on a daemon thread (once per process); no-op when port is unset"""
+    global _server
+    if not port:
+        return None
+    with _server_lock:
+        if _server is None:
+            try:
+                _server = ThreadingHTTPServer((host, int(port)), _MetricsHandler)
+            except (OSError, ValueError):
+                return None
+            _server.daemon_threads = True
+            threading.Thread(target=_server.serve_forever, name="metrics-server", daemon=True).start()
+    return _server
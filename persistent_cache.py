@@ -0,0 +1,141 @@
+# ============================================================
+# Persistent on-disk cache
+# 以 SQLite 持久化 token metadata / ENS 解析結果，重啟或重新部署後不需重新查詢
+#
+# - One SQLite file (WAL mode) shared by every worker process on the host
+# - Per-entry TTL, size bound enforced with LRU eviction on last access
+# - Any SQLite failure degrades to a cache miss, never to a failed lookup
+# ============================================================
+
+import json
+import os
+import sqlite3
+import threading
+import time
+
+import instrumentation
+
+CACHE_DIR = os.getenv("WALLET_CACHE_DIR", ".cache")
+CACHE_MAX_ENTRIES = int(os.getenv("WALLET_CACHE_MAX_ENTRIES", "100000"))
+
+
+def connect(filename):
+    """Open a SQLite database under CACHE_DIR tuned for multi-process access"""
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    conn = sqlite3.connect(os.path.join(CACHE_DIR, filename), timeout=10)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+class SQLiteStore:
+    """Base for the SQLite-backed stores: one connection per thread, SCHEMA applied on first use"""
+
+    SCHEMA = ""
+
+    def __init__(self, filename):
+        self.filename = filename
+        self._local = threading.local()
+
+    def _conn(self):
+        # sqlite3 connections must not be shared across threads
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = connect(self.filename)
+            conn.executescript(self.SCHEMA)
+            self._local.conn = conn
+        return conn
+
+
+class PersistentCache(SQLiteStore):
+    """Namespaced key/value store with per-entry TTL and LRU eviction"""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS kv (
+            namespace   TEXT NOT NULL,
+            key         TEXT NOT NULL,
+            value       TEXT NOT NULL,
+            expires_at  REAL NOT NULL,
+            accessed_at REAL NOT NULL,
+            PRIMARY KEY (namespace, key)
+        );
+        CREATE INDEX IF NOT EXISTS kv_accessed ON kv (accessed_at);
+        CREATE INDEX IF NOT EXISTS kv_expires ON kv (expires_at);
+    """
+
+    def __init__(self, filename="wallet_cache.sqlite3", max_entries=CACHE_MAX_ENTRIES):
+        super().__init__(filename)
+        self.max_entries = max_entries
+
+    def get(self, namespace, key, default=None):
+        found = self.get_many(namespace, [key])
+        return found.get(key, default)
+
+    def get_many(self, namespace, keys):
+        """Return {key: value} for the keys that are present and not expired"""
+        keys = list(keys)
+        if not keys:
+            return {}
+        now = time.time()
+        found = {}
+        try:
+            conn = self._conn()
+            # Stay well below SQLite's bound-parameter limit
+            for i in range(0, len(keys), 500):
+                chunk = keys[i:i + 500]
+                marks = ",".join("?" * len(chunk))
+                rows = conn.execute(
+                    f"SELECT key, value FROM kv WHERE namespace = ? AND key IN ({marks}) AND expires_at > ?",
+                    [namespace, *chunk, now],
+                ).fetchall()
+                for key, value in rows:
+                    found[key] = json.loads(value)
+            if found:
+                with conn:
+                    conn.executemany(
+                        "UPDATE kv SET accessed_at = ? WHERE namespace = ? AND key = ?",
+                        [(now, namespace, key) for key in found],
+                    )
+        except (sqlite3.Error, ValueError):
+            pass
+        instrumentation.record_cache(namespace, len(found), len(keys) - len(found))
+        return found
+
+    def set(self, namespace, key, value, ttl):
+        self.set_many(namespace, {key: value}, ttl)
+
+    def set_many(self, namespace, items, ttl):
+        """Store {key: value} (JSON-serialisable values) for ttl seconds"""
+        if not items:
+            return
+        now = time.time()
+        try:
+            conn = self._conn()
+            with conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO kv (namespace, key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                    [(namespace, key, json.dumps(value), now + ttl, now) for key, value in items.items()],
+                )
+                self._evict(conn, now)
+        except (sqlite3.Error, TypeError, ValueError):
+            pass
+
+    def _evict(self, conn, now):
+        conn.execute("DELETE FROM kv WHERE expires_at <= ?", (now,))
+        (count,) = conn.execute("SELECT COUNT(*) FROM kv").fetchone()
+        if count > self.max_entries:
+            conn.execute(
+                "DELETE FROM kv WHERE rowid IN (SELECT rowid FROM kv ORDER BY accessed_at LIMIT ?)",
+                (count - self.max_entries,),
+            )
+
+
+_cache = None
+
+
+def get_cache():
+    """Process-wide PersistentCache instance"""
+    global _cache
+    if _cache is None:
+        _cache = PersistentCache()
+    return _cache
@@ -0,0 +1,189 @@
+# ============================================================
+# Multi-wallet portfolio
+# 將同一實體的多個錢包 (可跨鏈) 一次查詢，合併成單一時間排序的活動紀錄，
+# 以及含合計的 Hyperliquid 曝險表
+#
+# ENS names are resolved in one Multicall3 batch, then every wallet is fetched
+# concurrently through the same cached per-chain functions as the
+# single-wallet view. Each processor already
+# returns its records newest first, so the combined feed is a k-way
+# heapq.merge of those streams rather than a concatenate-and-resort.
+# ============================================================
+
+import heapq
+from concurrent.futures import as_completed
+
+import pandas as pd
+
+import instrumentation
+from http_client import UpstreamError
+from address_types import classify_addresses
+from history_store import address_key
+from tx_records import display_frame, format_address
+from wallet_core import (
+    TX_PROCESSORS,
+    ens_counterparty_names,
+    get_hyperliquid_positions,
+    process_bitcoin_transactions,
+    resolve_ens_names,
+)
+
+PORTFOLIO_WORKERS = 4
+MAX_PORTFOLIO_WALLETS = 20
+
+
+def parse_wallet_lines(text):
+    """Addresses / ENS names from free text, one per line ('#' starts a comment)"""
+    return [line for line in (raw.split("#", 1)[0].strip() for raw in text.splitlines()) if line]
+
+
+def wallet_label(address):
+    """Short label for an unnamed wallet (ENS names are kept as typed)"""
+    return address if address.lower().endswith(".eth") else format_address(address)
+
+
+def resolve_wallets(addresses):
+    """[(address, chain)] with every ENS name resolved in one batch; chain is None when unrecognised"""
+    addresses = [address.strip() for address in addresses]
+    chains = classify_addresses(addresses)
+    names = [a for a, chain in zip(addresses, chains) if not chain and a.lower().endswith(".eth")]
+    resolved = resolve_ens_names(names) if names else {}
+    out = []
+    for address, chain in zip(addresses, chains):
+        target = resolved.get(address.lower()) if not chain else None
+        out.append((target, "ethereum") if target else (address, chain))
+    return out
+
+
+def load_portfolio(wallets, pool, on_progress=None):
+    """Fetch every (address, label) pair's history and Hyperliquid state on `pool`
+
+    Returns one dict per distinct wallet, in input order:
+    {"label", "address", "chain", "records", "positions", "error"}. Entries that
+    resolve to the same address are merged under the first label given. A failing
+    provider only marks its own wallet's error; the other wallets still load.
+    on_progress(done, total) is called as fetches complete.
+    """
+    # Resolve first (all ENS names in one Multicall3 pass), then drop repeats of the same
+    # wallet: a name, its 0x address and a re-cased 0x address are fetched (and counted) once
+    results, named = {}, set()
+    for (typed, label), (address, chain) in zip(wallets, resolve_wallets(typed for typed, _ in wallets)):
+        key = address_key(address)
+        if key not in results:
+            results[key] = {"label": label or wallet_label(typed), "address": address, "chain": chain,
+                            "records": [], "positions": None, "error": None if chain else "無法判斷地址類型"}
+        elif label and key not in named:
+            results[key]["label"] = label
+        if label:
+            named.add(key)
+    results = list(results.values())
+
+    # The portfolio's Bitcoin addresses form one wallet: payments between them are internal
+    btc_owned = frozenset(result["address"] for result in results if result["chain"] == "bitcoin")
+    futures = {}
+    for result in results:
+        chain = result["chain"]
+        if chain == "bitcoin":
+            fut = pool.submit(instrumentation.propagate(process_bitcoin_transactions), result["address"], btc_owned)
+            futures[fut] = (result, "records")
+        elif chain in TX_PROCESSORS:
+            futures[pool.submit(instrumentation.propagate(TX_PROCESSORS[chain]), result["address"])] = (result, "records")
+        # Hyperliquid accounts are EVM addresses
+        if chain == "ethereum":
+            futures[pool.submit(instrumentation.propagate(get_hyperliquid_positions), result["address"])] = (result, "positions")
+
+    for done, fut in enumerate(as_completed(futures), 1):
+        result, field = futures[fut]
+        try:
+            result[field] = fut.result()
+        except UpstreamError:
+            result["error"] = "上游 API 暫時無法使用"
+        except Exception as e:
+            result["error"] = f"{type(e).__name__}: {e}"
+        if on_progress:
+            on_progress(done, len(futures))
+    return results
+
+
+# ============================================================
+# Combined views
+# ============================================================
+def labelled(result):
+    """(label, record) pairs of one wallet's newest-first records"""
+    label = result["label"]
+    return ((label, record) for record in result["records"])
+
+
+def merge_activity(results):
+    """(label, record) pairs of every wallet, newest first, k-way merged from the per-wallet streams"""
+    return heapq.merge(*(labelled(result) for result in results), key=lambda item: item[1].timestamp, reverse=True)
+
+
+def activity_frame(merged, names=None):
+    """The dashboard's 時間 / 摘要 / Tx Hash table with 錢包 / 鏈 columns
+
+    names: {lower-case address: ENS name} for counterparties; looked up when None.
+    """
+    merged = list(merged)
+    records = [record for _, record in merged]
+    df = display_frame(records, ens_counterparty_names(records) if names is None else names)
+    df.insert(1, "錢包", [label for label, _ in merged])
+    df.insert(2, "鏈", [record.chain for _, record in merged])
+    return df
+
+
+def exposure_frame(results):
+    """One numeric row per open Hyperliquid position across the portfolio"""
+    rows = []
+    for result in results:
+        state = result["positions"] or {}
+        for p in state.get("assetPositions") or []:
+            pos = p.get("position", {})
+            size = float(pos.get("szi", 0))
+            entry = float(pos.get("entryPx") or 0)
+            mark = float(pos.get("markPx") or entry)
+            notional = float(pos.get("positionValue") or abs(size) * mark)
+            lev = pos.get("leverage", {})
+            rows.append({
+                "錢包": result["label"],
+                "幣種": pos.get("coin", "N/A"),
+                "倉位": size,
+                "開倉均價": entry,
+                "名目價值 (USD)": notional if size >= 0 else -notional,
+                "未實現盈虧 (USD)": float(pos.get("unrealizedPnl", 0)),
+                "槓桿": lev.get("value") if isinstance(lev, dict) else lev,
+            })
+    return pd.DataFrame(rows, columns=["錢包", "幣種", "倉位", "開倉均價", "名目價值 (USD)", "未實現盈虧 (USD)", "槓桿"])
+
+
+def exposure_totals(exposure):
+    """Net size, net / gross notional and PnL per coin, plus a 合計 row over all coins"""
+    columns = ["幣種", "錢包數", "淨倉位", "淨名目價值 (USD)", "總名目價值 (USD)", "未實現盈虧 (USD)"]
+    if exposure.empty:
+        return pd.DataFrame(columns=columns)
+    grouped = exposure.assign(gross=exposure["名目價值 (USD)"].abs()).groupby("幣種", sort=False)
+    totals = pd.DataFrame({
+        "錢包數": grouped["錢包"].nunique(),
+        "淨倉位": grouped["倉位"].sum(),
+        "淨名目價值 (USD)": grouped["名目價值 (USD)"].sum(),
+        "總名目價值 (USD)": grouped["gross"].sum(),
+        "未實現盈虧 (USD)": grouped["未實現盈虧 (USD)"].sum(),
+    }).sort_values("總名目價值 (USD)", ascending=False).reset_index()
+    overall = {
+        "幣種": "合計",
+        "錢包數": exposure["錢包"].nunique(),
+        "淨倉位": float("nan"),  # sizes of different coins do not add up
+        "淨名目價值 (USD)": totals["淨名目價值 (USD)"].sum(),
+        "總名目價值 (USD)": totals["總名目價值 (USD)"].sum(),
+        "未實現盈虧 (USD)": totals["未實現盈虧 (USD)"].sum(),
+    }
+    return pd.concat([totals, pd.DataFrame([overall])], ignore_index=True)[columns]
+
+
+def account_value(results):
+    """Summed Hyperliquid account value (USD) of the wallets that reported one"""
+    total = 0.0
+    for result in results:
+        summary = (result["positions"] or {}).get("marginSummary") or {}
+        total += float(summary.get("accountValue") or 0)
+    return total
@@ -0,0 +1,190 @@
+# ============================================================
+# Background prefetch
+# 定期在背景刷新 KNOWN_WALLETS 與自訂觀察清單的倉位與交易紀錄，
+# 讓下拉選單選到的錢包直接讀取已預熱的快取，而不是在使用者等待時才向上游抓取
+#
+# Usage:
+#   started automatically by the dashboard (WALLET_PREFETCH_INTERVAL=0 disables)
+#   python prefetch.py --once --watchlist watchlist.txt    # warm once and exit
+#   python prefetch.py                                     # standalone sidecar loop
+#
+# Results land in the shared result cache (shared_cache.py), so with a SQLite
+# or Redis backend one sidecar can warm every replica. Entries another process
+# refreshed within the last half interval are skipped, and jobs are spread
+# over half the interval so prefetch traffic never bursts into the provider
+# quotas that interactive lookups share.
+# ============================================================
+
+import argparse
+import inspect
+import os
+import threading
+import time
+
+import instrumentation
+from known_wallets import KNOWN_WALLETS
+from shared_cache import MemoryBackend, get_shared_cache
+
+# Below the 5-minute result TTL, so a curated wallet is never cold
+PREFETCH_INTERVAL = int(os.getenv("WALLET_PREFETCH_INTERVAL", "240"))
+PREFETCH_WATCHLIST = os.getenv("WALLET_PREFETCH_WATCHLIST")
+PREFETCH_SPREAD = 0.5  # fraction of the interval over which a cycle's jobs are spread
+
+
+def load_watchlist(path):
+    """Addresses / ENS names from a file, one per line ('#' starts a comment)"""
+    if not path:
+        return []
+    try:
+        with open(path, encoding="utf-8") as fh:
+            return [line for line in (raw.split("#", 1)[0].strip() for raw in fh) if line]
+    except OSError:
+        return []
+
+
+def prefetch_targets(watchlist=None):
+    """Curated KNOWN_WALLETS addresses followed by the watchlist, de-duplicated"""
+    targets = [meta["address"] for meta in KNOWN_WALLETS.values()
+               if meta["status"] != "manual" and meta["address"]]
+    targets += load_watchlist(watchlist)
+    return list(dict.fromkeys(targets))
+
+
+def prefetch_jobs(targets):
+    """[(kind, address)]: Hyperliquid positions (0x addresses) plus the chain history, as the dashboard fetches them"""
+    from address_types import classify_addresses
+    from wallet_core import TX_FETCHERS, resolve_ens_names
+
+    types = classify_addresses(targets)
+    names = [target for target, addr_type in zip(targets, types) if not addr_type and target.lower().endswith(".eth")]
+    resolved = resolve_ens_names(names) if names else {}  # one Multicall3 pass for the whole watchlist
+    jobs = []
+    for target, addr_type in zip(targets, types):
+        if not addr_type and resolved.get(target.lower()):
+            target, addr_type = resolved[target.lower()], "ethereum"
+        if not addr_type:
+            continue
+        if addr_type == "ethereum":  # Hyperliquid accounts are EVM addresses
+            jobs.append(("hyperliquid", target))
+        if addr_type in TX_FETCHERS:
+            jobs.append((addr_type, target))
+    return list(dict.fromkeys(jobs))
+
+
+def refresh(kind, address, max_age=0):
+    """Warm one result; False when it was fresh enough or already being refreshed elsewhere"""
+    from wallet_core import TX_FETCHERS, get_hyperliquid_positions
+
+    fetcher = get_hyperliquid_positions if kind == "hyperliquid" else TX_FETCHERS[kind]
+    if get_shared_cache() is None:
+        # No shared cache: warm this process's st.cache_data instead
+        fetcher(address)
+        return True
+    shared = inspect.unwrap(fetcher, stop=lambda f: hasattr(f, "refresh"))
+    return shared.refresh(address, max_age=max_age)
+
+
+class Prefetcher:
+    """Daemon thread refreshing every prefetch job once per interval"""
+
+    def __init__(self, interval=PREFETCH_INTERVAL, watchlist=PREFETCH_WATCHLIST):
+        self.interval = interval
+        self.watchlist = watchlist
+        self.status = {"cycles": 0, "jobs": 0, "refreshed": 0, "skipped": 0, "errors": 0, "last_cycle_at": None}
+        self._stop = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            if self.interval <= 0 or (self._thread and self._thread.is_alive()):
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self.run_forever, name="prefetch", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def run_cycle(self, spacing=0.0):
+        """Refresh every job once, waiting `spacing` seconds between jobs; returns the cycle's counts"""
+        counts = {"jobs": 0, "refreshed": 0, "skipped": 0, "errors": 0}
+        try:
+            jobs = prefetch_jobs(prefetch_targets(self.watchlist))
+        except Exception:
+            jobs = []
+            counts["errors"] += 1
+        counts["jobs"] = len(jobs)
+        for i, (kind, address) in enumerate(jobs):
+            if i and self._stop.wait(spacing):
+                break
+            try:
+                with instrumentation.span("prefetch", chain=kind):
+                    done = refresh(kind, address, max_age=self.interval / 2)
+                counts["refreshed" if done else "skipped"] += 1
+            except Exception:
+                counts["errors"] += 1
+        self.status.update(counts, cycles=self.status["cycles"] + 1, last_cycle_at=time.time())
+        return counts
+
+    def run_forever(self, on_cycle=None):
+        """Cycle every interval until stop(); jobs are spread using the previous cycle's job count"""
+        while not self._stop.is_set():
+            started = time.monotonic()
+            jobs = max(1, self.status["jobs"] or len(KNOWN_WALLETS))
+            counts = self.run_cycle(spacing=self.interval * PREFETCH_SPREAD / jobs)
+            if on_cycle:
+                on_cycle(counts)
+            self._stop.wait(max(0.0, self.interval - (time.monotonic() - started)))
+
+
+_prefetcher = None
+_prefetcher_lock = threading.Lock()
+
+
+def get_prefetcher():
+    """Process-wide Prefetcher instance"""
+    global _prefetcher
+    if _prefetcher is None:
+        with _prefetcher_lock:
+            if _prefetcher is None:
+                _prefetcher = Prefetcher()
+    return _prefetcher
+
+
+def start_prefetcher():
+    """Start the background prefetcher once per process (no-op when disabled)"""
+    prefetcher = get_prefetcher()
+    prefetcher.start()
+    return prefetcher
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Keep curated wallets warm in the shared result cache")
+    parser.add_argument("--watchlist", default=PREFETCH_WATCHLIST, help="file with extra addresses / ENS names")
+    parser.add_argument("--interval", type=int, default=PREFETCH_INTERVAL or 240, help="seconds between refreshes")
+    parser.add_argument("--once", action="store_true", help="refresh everything once and exit")
+    args = parser.parse_args(argv)
+
+    from streamlit.logger import set_log_level
+
+    # Cached fetchers warn about the missing Streamlit runtime when used headless
+    set_log_level("error")
+
+    backend = get_shared_cache()
+    if backend is None or isinstance(backend, MemoryBackend):
+        print("[prefetch] warning: WALLET_SHARED_CACHE is not shared across processes; "
+              "set it to sqlite or redis:// for this process to warm the dashboard")
+
+    prefetcher = Prefetcher(args.interval, args.watchlist)
+    if args.once:
+        print(f"[prefetch] {prefetcher.run_cycle()}")
+        return
+    try:
+        prefetcher.run_forever(on_cycle=lambda counts: print(f"[prefetch] {counts}", flush=True))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
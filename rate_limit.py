@@ -0,0 +1,125 @@
+# ============================================================
+# Per-provider rate limiting
+# 每個上游 API 各自一個 token bucket，所有請求 (UI / 批次 / 背景) 共用同一組額度
+#
+# Quotas are requests per second with a burst allowance and can be
+# overridden per provider, e.g. RATE_LIMIT_ETHERSCAN=10 or =10/20 (rate/burst).
+# ============================================================
+
+import os
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+# provider: (requests per second, burst)
+PROVIDER_LIMITS = {
+    "etherscan": (5.0, 5),          # free tier: 5 calls/s per key
+    "helius_rest": (10.0, 10),
+    "helius_rpc": (10.0, 10),
+    "hyperliquid": (20.0, 20),
+    "blockchain_info": (1.0, 2),
+}
+
+HOST_PROVIDERS = {
+    "api.etherscan.io": "etherscan",
+    "api.helius.xyz": "helius_rest",
+    "mainnet.helius-rpc.com": "helius_rpc",
+    "api.hyperliquid.xyz": "hyperliquid",
+    "blockchain.info": "blockchain_info",
+}
+
+BACKOFF_BASE = 0.5  # seconds
+BACKOFF_CAP = 30.0
+
+
+class TokenBucket:
+    """Thread-safe token bucket; callers reserve a slot and sleep until it is due"""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._blocked_until)
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            # Going negative queues the caller behind earlier reservations
+            self._tokens -= 1
+            wait = max(start - now, -self._tokens / self.rate if self._tokens < 0 else 0.0)
+        if wait > 0:
+            time.sleep(wait)
+
+    def pause(self, seconds):
+        """Hold every caller back (e.g. after a 429 with Retry-After)"""
+        with self._lock:
+            self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+
+
+def _limits_for(provider):
+    rate, burst = PROVIDER_LIMITS[provider]
+    override = os.getenv(f"RATE_LIMIT_{provider.upper()}")
+    if override:
+        try:
+            parts = override.split("/")
+            rate = float(parts[0])
+            burst = int(parts[1]) if len(parts) > 1 else max(1, int(rate))
+        except ValueError:
+            pass
+    return rate, burst
+
+
+_buckets = {}
+_buckets_lock = threading.Lock()
+
+
+def provider_for(url):
+    """Provider name for a URL, or None for hosts without a quota"""
+    return HOST_PROVIDERS.get(urlsplit(url).hostname)
+
+
+def get_bucket(provider):
+    bucket = _buckets.get(provider)
+    if bucket is None:
+        with _buckets_lock:
+            bucket = _buckets.get(provider)
+            if bucket is None:
+                bucket = _buckets[provider] = TokenBucket(*_limits_for(provider))
+    return bucket
+
+
+def acquire(provider):
+    if provider:
+        get_bucket(provider).acquire()
+
+
+def pause(provider, seconds):
+    if provider:
+        get_bucket(provider).pause(seconds)
+
+
+def backoff_delay(attempt):
+    """Full-jitter exponential backoff for the given 0-based retry attempt"""
+    return random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * (2 ** attempt)))
+
+
+def retry_after_seconds(res):
+    """Parse a Retry-After header (seconds or HTTP date); None if absent/invalid"""
+    value = res.headers.get("Retry-After") if res is not None else None
+    if not value:
+        return None
+    try:
+        return min(BACKOFF_CAP, max(0.0, float(value)))
+    except ValueError:
+        pass
+    try:
+        return min(BACKOFF_CAP, max(0.0, parsedate_to_datetime(value).timestamp() - time.time()))
+    except (TypeError, ValueError):
+        return None
@@ -0,0 +1,310 @@
+# ============================================================
+# Shared result cache
+# 讓多個 Streamlit 副本共用交易紀錄 / 倉位查詢結果，並合併同一 key 的並發請求，
+# 避免同一個熱門錢包被每個副本、每個 session 各自向上游抓取
+#
+# WALLET_SHARED_CACHE selects the backend:
+#   memory (default)        in-process only, coalesces concurrent sessions
+#                           (LRU, WALLET_SHARED_CACHE_MEMORY_ENTRIES results)
+#   sqlite                  one file under WALLET_CACHE_DIR, shared by replicas on a host
+#   redis://host:6379/0     any Redis-compatible server (Redis, Valkey, KeyDB), e.g.
+#                           `docker run -p 6379:6379 valkey/valkey`; requires `pip install redis`
+#   off                     disabled
+#
+# A miss takes a short-lived fill lock in the backend, so concurrent misses
+# for one key (threads in this process or other replicas) cause a single
+# upstream fetch; the others wait for the stored result. Backend failures
+# degrade to a plain uncached fetch.
+# ============================================================
+
+import functools
+import json
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+import instrumentation
+from persistent_cache import CACHE_MAX_ENTRIES, SQLiteStore
+
+SHARED_CACHE_URL = os.getenv("WALLET_SHARED_CACHE", "memory")
+FILL_LOCK_TTL = 60       # seconds a replica may hold a key while fetching it
+FILL_WAIT_POLL = 0.2     # seconds between checks while another replica fills a key
+KEY_PREFIX = "wallet:"
+# The memory backend holds whole histories (~1 MB per 300-record wallet), so it is kept small
+MEMORY_MAX_ENTRIES = int(os.getenv("WALLET_SHARED_CACHE_MEMORY_ENTRIES", "256"))
+MEMORY_SWEEP_EVERY = 64  # writes between sweeps of expired entries
+
+
+class MemoryBackend:
+    """LRU dict with per-entry expiry; fill locks only span this process
+
+    At most max_entries results are kept (least recently used evicted first),
+    and expired entries are swept every MEMORY_SWEEP_EVERY writes.
+    """
+
+    def __init__(self, max_entries=MEMORY_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._values = OrderedDict()  # key -> (expires_at, value), least recently used first
+        self._fills = {}   # key -> (expires_at, token)
+        self._writes = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._values.get(key)
+            if entry and entry[0] > time.time():
+                self._values.move_to_end(key)
+                return entry[1]
+            self._values.pop(key, None)
+        return None
+
+    def set(self, key, value, ttl):
+        now = time.time()
+        with self._lock:
+            self._writes += 1
+            if self._writes % MEMORY_SWEEP_EVERY == 0:
+                for k in [k for k, (expires_at, _) in self._values.items() if expires_at <= now]:
+                    del self._values[k]
+            self._values[key] = (now + ttl, value)
+            self._values.move_to_end(key)
+            while len(self._values) > self.max_entries:
+                self._values.popitem(last=False)
+
+    def acquire(self, key, token, ttl):
+        now = time.time()
+        with self._lock:
+            holder = self._fills.get(key)
+            if holder and holder[0] > now:
+                return False
+            self._fills[key] = (now + ttl, token)
+            return True
+
+    def release(self, key, token):
+        with self._lock:
+            if self._fills.get(key, (0, None))[1] == token:
+                del self._fills[key]
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+            self._fills.clear()
+
+
+class SQLiteBackend(SQLiteStore):
+    """Results and fill locks in a WAL-mode SQLite file shared by processes on one host"""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS results (
+            key         TEXT PRIMARY KEY,
+            value       TEXT NOT NULL,
+            expires_at  REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS results_expires ON results (expires_at);
+        CREATE TABLE IF NOT EXISTS fills (
+            key         TEXT PRIMARY KEY,
+            token       TEXT NOT NULL,
+            expires_at  REAL NOT NULL
+        );
+    """
+
+    def __init__(self, filename="shared_results.sqlite3", max_entries=CACHE_MAX_ENTRIES):
+        super().__init__(filename)
+        self.max_entries = max_entries
+
+    def get(self, key):
+        row = self._conn().execute(
+            "SELECT value FROM results WHERE key = ? AND expires_at > ?", (key, time.time())
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def set(self, key, value, ttl):
+        now = time.time()
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO results (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, json.dumps(value), now + ttl),
+            )
+            conn.execute("DELETE FROM results WHERE expires_at <= ?", (now,))
+            conn.execute(
+                "DELETE FROM results WHERE key IN "
+                "(SELECT key FROM results ORDER BY expires_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+
+    def acquire(self, key, token, ttl):
+        now = time.time()
+        conn = self._conn()
+        with conn:
+            conn.execute("DELETE FROM fills WHERE key = ? AND expires_at <= ?", (key, now))
+            cur = conn.execute(
+                "INSERT OR IGNORE INTO fills (key, token, expires_at) VALUES (?, ?, ?)", (key, token, now + ttl)
+            )
+        return cur.rowcount == 1
+
+    def release(self, key, token):
+        conn = self._conn()
+        with conn:
+            conn.execute("DELETE FROM fills WHERE key = ? AND token = ?", (key, token))
+
+    def clear(self):
+        conn = self._conn()
+        with conn:
+            conn.execute("DELETE FROM results")
+            conn.execute("DELETE FROM fills")
+
+
+class RedisBackend:
+    """Redis-compatible server; fill locks are SET NX PX keys"""
+
+    RELEASE_SCRIPT = "if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('del', KEYS[1]) end return 0"
+
+    def __init__(self, url):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("WALLET_SHARED_CACHE=redis://... requires the redis package: pip install redis")
+        self._redis = redis.Redis.from_url(url, socket_timeout=2, socket_connect_timeout=2)
+
+    def get(self, key):
+        raw = self._redis.get(KEY_PREFIX + key)
+        return json.loads(raw) if raw is not None else None
+
+    def set(self, key, value, ttl):
+        self._redis.set(KEY_PREFIX + key, json.dumps(value), ex=max(1, int(ttl)))
+
+    def acquire(self, key, token, ttl):
+        return bool(self._redis.set(f"{KEY_PREFIX}fill:{key}", token, nx=True, px=int(ttl * 1000)))
+
+    def release(self, key, token):
+        self._redis.eval(self.RELEASE_SCRIPT, 1, f"{KEY_PREFIX}fill:{key}", token)
+
+    def clear(self):
+        for name in self._redis.scan_iter(f"{KEY_PREFIX}*"):
+            self._redis.delete(name)
+
+
+def make_backend(url):
+    """Backend for a WALLET_SHARED_CACHE value; None disables the shared cache"""
+    if not url or url == "off":
+        return None
+    if url == "memory":
+        return MemoryBackend()
+    if url == "sqlite":
+        return SQLiteBackend()
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisBackend(url)
+    raise ValueError(f"unknown WALLET_SHARED_CACHE backend {url!r}")
+
+
+_backend = None
+_backend_ready = False
+_backend_lock = threading.Lock()
+
+
+def get_shared_cache():
+    """Process-wide backend selected by WALLET_SHARED_CACHE (None when disabled)"""
+    global _backend, _backend_ready
+    if not _backend_ready:
+        with _backend_lock:
+            if not _backend_ready:
+                try:
+                    _backend = make_backend(SHARED_CACHE_URL)
+                except (RuntimeError, ValueError) as e:
+                    # A misconfigured shared cache must not take lookups down with it
+                    print(f"Shared cache disabled: {e}")
+                _backend_ready = True
+    return _backend
+
+
+# ============================================================
+# Decorator
+# ============================================================
+def _lookup(backend, key):
+    """Stored {"v": value, "t": stored_at} entry, or None; backend errors count as a miss"""
+    try:
+        entry = backend.get(key)
+    except Exception:
+        return None
+    # Results are wrapped so a cached None / [] is still a hit
+    return entry if isinstance(entry, dict) and "v" in entry else None
+
+
+def _fill(backend, key, fn, args, ttl, token, filling):
+    try:
+        value = fn(*args)
+        try:
+            backend.set(key, {"v": value, "t": time.time()}, ttl)
+        except Exception:
+            pass
+        return value
+    finally:
+        if filling:
+            try:
+                backend.release(key, token)
+            except Exception:
+                pass
+
+
+def shared_cached(namespace, ttl):
+    """Cache fn's JSON-serialisable result in the shared backend, coalescing concurrent misses
+
+    Exceptions are never cached: the filler releases its lock and each waiter
+    then retries the fetch itself. `wrapper.refresh(*args)` re-fetches ahead
+    of expiry (see prefetch.py).
+    """
+    def decorator(fn):
+        def cache_key(args):
+            return f"{namespace}:{json.dumps(args, default=str)}"
+
+        @functools.wraps(fn)
+        def wrapper(*args):
+            backend = get_shared_cache()
+            if backend is None:
+                return fn(*args)
+            key = cache_key(args)
+            token = uuid.uuid4().hex
+            deadline = time.monotonic() + FILL_LOCK_TTL
+            while True:
+                entry = _lookup(backend, key)
+                if entry is not None:
+                    instrumentation.record_cache(f"shared:{namespace}", 1, 0)
+                    return entry["v"]
+                try:
+                    filling = backend.acquire(key, token, FILL_LOCK_TTL)
+                except Exception:
+                    filling = None  # backend down: fetch without coordination
+                if filling or filling is None or time.monotonic() >= deadline:
+                    break
+                time.sleep(FILL_WAIT_POLL)
+
+            instrumentation.record_cache(f"shared:{namespace}", 0, 1)
+            return _fill(backend, key, fn, args, ttl, token, filling)
+
+        def refresh(*args, max_age=0):
+            """Re-fetch and store the result unless it is younger than max_age seconds
+
+            Returns False when skipped (fresh enough, or another process is
+            already filling the key) and True after a refresh.
+            """
+            backend = get_shared_cache()
+            if backend is None:
+                return False
+            key = cache_key(args)
+            entry = _lookup(backend, key)
+            if entry is not None and time.time() - entry.get("t", 0) < max_age:
+                return False
+            token = uuid.uuid4().hex
+            try:
+                if not backend.acquire(key, token, FILL_LOCK_TTL):
+                    return False
+            except Exception:
+                return False
+            _fill(backend, key, fn, args, ttl, token, True)
+            return True
+
+        wrapper.refresh = refresh
+        return wrapper
+    return decorator
@@ -0,0 +1,217 @@
+# ============================================================
+# Normalized transaction records
+# 三條鏈共用的交易紀錄格式：保留完整 hash、時間戳、方向、資產、數量與對手方等原始欄位，
+# 顯示用的字串 (時間 / 摘要 / 縮短的 Tx Hash) 只在繪製表格時才產生
+#
+# Interpreters emit TxRecord objects (__slots__, no per-row dict); sorting and
+# filtering work on the typed attributes.
+# ============================================================
+
+import re
+import time
+from functools import lru_cache
+from operator import attrgetter
+
+import numpy as np
+import pandas as pd
+
+# kind: what the transaction did, from the wallet's point of view
+#   send / receive              native coin transfer (ETH, BTC, Solana net transfers)
+#   token_send / token_receive  ERC-20 transfer
+#   stake / unstake             staking deposit / withdrawal or reward (note: protocol, if known)
+#   swap / sell / buy           assets both sent and received / swap-typed with one side only
+#   internal                    no payment left the wallet (fee: paid for a consolidation / self-transfer)
+#   other / unknown             only a provider description / type is available (note)
+#   error                       could not be interpreted (note: reason, if any)
+KINDS = (
+    "send", "receive", "token_send", "token_receive", "stake", "unstake",
+    "swap", "sell", "buy", "internal", "other", "unknown", "error",
+)
+FIELDS = ("chain", "hash", "timestamp", "kind", "direction", "asset", "amount", "counterparty", "legs", "note", "fee")
+
+# Displayed decimals per asset chain
+AMOUNT_DECIMALS = {"bitcoin": 8}
+# All real-world UTC offset changes fall on quarter-hour boundaries
+TZ_OFFSET_BUCKET = 900
+BASE58_PATTERN = re.compile(r"[1-9A-HJ-NP-Za-km-z]{32,44}")
+# Joins a batch of descriptions for one sub() pass; never part of a base58 match
+BATCH_SEPARATOR = "\0"
+
+by_timestamp = attrgetter("timestamp")
+
+
+@lru_cache(maxsize=65536)
+def format_address(addr):
+    """Format address as {4 digits}...{3 digits}...{4 digits} (memoized: a wallet's peers repeat)"""
+    if not addr or len(addr) < 11:
+        return addr
+    return f"{addr[:4]}...{addr[-7:-4]}...{addr[-4:]}"
+
+
+def _shorten_match(match):
+    return format_address(match.group(0))
+
+
+def shorten_addresses(texts):
+    """Each text with every base58 address shortened, in a single sub() pass over the whole batch"""
+    texts = list(texts)
+    if not texts:
+        return []
+    parts = BASE58_PATTERN.sub(_shorten_match, BATCH_SEPARATOR.join(texts)).split(BATCH_SEPARATOR)
+    if len(parts) != len(texts):
+        # A text contained the separator itself: fall back to one pass per text
+        return [BASE58_PATTERN.sub(_shorten_match, text) for text in texts]
+    return parts
+
+
+class TxRecord:
+    """One transaction, normalized across chains
+
+    amount is positive; direction is "out", "in" or None. legs holds
+    (("out" | "in", symbol, amount), ...) when a transaction moved several
+    assets; asset / amount then describe the first leg. fee is set when the
+    wallet is known to have paid it (Bitcoin).
+    """
+
+    __slots__ = FIELDS
+
+    def __init__(self, chain, hash, timestamp, kind, direction=None, asset=None, amount=None,
+                 counterparty=None, legs=None, note=None, fee=None):
+        self.chain = chain
+        self.hash = hash
+        self.timestamp = timestamp
+        self.kind = kind
+        self.direction = direction
+        self.asset = asset
+        self.amount = amount
+        self.counterparty = counterparty
+        self.legs = legs
+        self.note = note
+        self.fee = fee
+
+    def __repr__(self):
+        return f"TxRecord({self.chain} {self.kind} {self.amount} {self.asset} @ {self.timestamp} {self.hash})"
+
+    def to_dict(self):
+        """JSON-serialisable fields (legs as lists)"""
+        row = {field: getattr(self, field) for field in FIELDS}
+        if self.legs is not None:
+            row["legs"] = [list(leg) for leg in self.legs]
+        return row
+
+    @classmethod
+    def from_dict(cls, row):
+        legs = row.get("legs")
+        return cls(**{field: row.get(field) for field in FIELDS if field != "legs"},
+                   legs=tuple(tuple(leg) for leg in legs) if legs is not None else None)
+
+    # ---------------- display (computed on demand) ----------------
+    def short_hash(self):
+        h = self.hash
+        return f"{h[:8]}...{h[-6:]}" if h else "N/A"
+
+    def assets_text(self, side=None):
+        """'1.0000 USDC, 2.0000 DAI' for the legs on one side ("out" / "in"); the first leg if side is None"""
+        places = AMOUNT_DECIMALS.get(self.chain, 4)
+        if self.legs is None or side is None:
+            return f"{self.amount:.{places}f} {self.asset}" if self.amount is not None else ""
+        return ", ".join(f"{amount:.{places}f} {symbol}" for leg_side, symbol, amount in self.legs if leg_side == side)
+
+    def _party(self, names=None):
+        if self.note:
+            return self.note
+        if self.counterparty is None:
+            return "Unknown"
+        name = names.get(self.counterparty.lower()) if names else None
+        return name or format_address(self.counterparty)
+
+    def summary(self, names=None):
+        """One-line description shown in the 摘要 column
+
+        names maps lower-case counterparty addresses to display names (ENS).
+        """
+        kind = self.kind
+        # Net-balance summaries (Solana) carry no counterparty clause; it is only indexed
+        party = self.chain != "solana"
+        if kind == "swap":
+            return f"💱 兌換 {self.assets_text('out')} → {self.assets_text('in')}"
+        if kind == "sell":
+            return f"💸 賣出/轉出 {self.assets_text('out')}"
+        if kind == "buy":
+            return f"📥 買入/接收 {self.assets_text('in')}"
+        if kind in ("send", "token_send"):
+            icon = "💰" if kind == "token_send" else "💸"
+            text = f"{icon} 轉出 {self.assets_text('out')}"
+            return f"{text} 給 {self._party(names)}" if party else text
+        if kind in ("receive", "token_receive"):
+            text = f"📥 接收 {self.assets_text('in')}"
+            return f"{text} 來自 {self._party(names)}" if party else text
+        if kind == "stake":
+            text = f"🪙 質押 {self.assets_text()}".rstrip()
+            return f"{text} 至 {self.note}" if self.note else text
+        if kind == "unstake":
+            if self.note:
+                return f"💎 解質押/獎勵 {self.assets_text()} 來自 {self.note}"
+            return f"💎 解質押 {self.assets_text()}".rstrip()
+        if kind == "internal":
+            if self.fee:
+                places = AMOUNT_DECIMALS.get(self.chain, 4)
+                return f"🔄 內部轉帳 / 整合 (手續費 {self.fee:.{places}f} {self.asset})"
+            return f"🔄 內部轉帳 (0 {self.asset} 淨變化)"
+        if kind == "other":
+            # Shorten any full addresses in the provider's description
+            return describe(shorten_addresses([self.note or ""])[0])
+        if kind == "unknown":
+            return f"🧩 {self.note}"
+        return f"❓ 解析錯誤: {self.note}" if self.note else "❓ 無法解析交易"
+
+
+def describe(text):
+    """Summary of an "other" record from its address-shortened description"""
+    return f"🧩 {text.capitalize()}"
+
+
+def summaries(records, names=None):
+    """summary(names) of each record, with all provider descriptions shortened in one batch pass"""
+    out = [None if r.kind == "other" else r.summary(names) for r in records]
+    described = [i for i, r in enumerate(records) if r.kind == "other"]
+    for i, text in zip(described, shorten_addresses(records[i].note or "" for i in described)):
+        out[i] = describe(text)
+    return out
+
+
+def newest_first(records, limit=None):
+    """Records sorted by timestamp, newest first (stable for equal timestamps)"""
+    ordered = sorted(records, key=by_timestamp, reverse=True)
+    return ordered[:limit] if limit is not None else ordered
+
+
+# ============================================================
+# Column views
+# ============================================================
+def format_timestamps(ts):
+    """Unix seconds -> local 'YYYY-MM-DD HH:MM' strings (same as datetime.fromtimestamp)
+
+    The local UTC offset is looked up once per quarter hour present in the
+    batch instead of once per row.
+    """
+    secs = np.asarray(ts, dtype="int64")
+    if not len(secs):
+        return []
+    buckets, inverse = np.unique(secs // TZ_OFFSET_BUCKET, return_inverse=True)
+    offsets = np.array([time.localtime(int(b) * TZ_OFFSET_BUCKET).tm_gmtoff for b in buckets], dtype="int64")
+    local = (secs + offsets[inverse.reshape(-1)]).astype("datetime64[s]")
+    return np.char.replace(np.datetime_as_string(local, unit="m"), "T", " ").tolist()
+
+
+def display_frame(records, names=None):
+    """The 時間 / 摘要 / Tx Hash table shown in the dashboard, formatted only for these rows
+
+    names: optional {lower-case address: name} shown instead of shortened counterparties.
+    """
+    return pd.DataFrame({
+        "時間": format_timestamps([r.timestamp for r in records]),
+        "摘要": summaries(records, names),
+        "Tx Hash": [r.short_hash() for r in records],
+    })
+
@@ -1,25 +1,52 @@
 # Ethereum + Solana + Hyperliquid + 名人下拉選單
 
-import requests
 import streamlit as st
 import pandas as pd
-import base58
-import ssl
+import json
+import threading
 import time
-import os
 from datetime import datetime
-from web3 import Web3
-from dotenv import load_dotenv
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+import instrumentation
 from known_wallets import KNOWN_WALLETS
-
-# ENS support is integrated in Web3 v6+
-HAS_ENS = True
-
-# ---------------- CONFIG ----------------
-load_dotenv()
-ETHERSCAN_API_KEY = os.getenv("ETH_API_KEY")
-INFURA_API = os.getenv("INFURA_API_URL")
-HELIUS_API_KEY = os.getenv("HELIUS_API_KEY")
+from prefetch import start_prefetcher
+from portfolio import (
+    MAX_PORTFOLIO_WALLETS,
+    PORTFOLIO_WORKERS,
+    account_value,
+    activity_frame,
+    exposure_frame,
+    exposure_totals,
+    load_portfolio,
+    merge_activity,
+    parse_wallet_lines,
+)
+from tx_records import KINDS, TxRecord, display_frame, format_address
+from http_client import UpstreamError
+from history_store import address_key, get_activity_index, get_activity_spool
+from hyperliquid_stream import get_hyperliquid_stream
+from dashboard_views import (
+    render_hyperliquid_positions,
+    render_portfolio_exposure,
+    render_records,
+)
+from wallet_core import (
+    ETHERSCAN_API_KEY,
+    INFURA_API,
+    HELIUS_API_KEY,
+    TX_PROCESSORS,
+    DEEP_ITERATORS,
+    EVM_CHAINS,
+    EVM_CHAIN_IDS,
+    detect_address_type,
+    evm_chain,
+    ens_counterparty_names,
+    resolve_ens,
+    get_hyperliquid_positions,
+    iter_activity_pages,
+    process_evm_transactions,
+)
 
 # Validate API keys
 if not ETHERSCAN_API_KEY:
@@ -31,755 +58,396 @@ if not INFURA_API:
 if not HELIUS_API_KEY:
     st.warning("⚠️ Missing HELIUS_API_KEY in .env file - Solana transactions will not work")
 
-w3 = Web3(Web3.HTTPProvider(INFURA_API))
-
-# ---------------- CONFIG: ADDR & CONSTANTS ----------------
-ETH_STAKING_CONTRACTS = {
-    "0x00000000219ab540356cbb839cbe05303d7705fa": "ETH2 Deposit",
-    "0xae7ab96520de3a18e5e111b5eaab095312d7fe84": "Lido stETH",
-    "0x1643e812ae58766192cf7d2cf9567df2c37e9b7f": "Rocket Pool rETH",
-    "0xdfe66b14d37c77f4e9b180ceb433d1b164f0281d": "Stakewise sETH2",
-    "0xc874b064f465bdd6411d45734b56fac750cda29a": "Coinbase Wrapped Staked ETH",
-}
-
-SOL_WSOL_MINT = "So11111111111111111111111111111111111111112"
-
-SOL_STAKING_ENTITIES = {
-    "Stake11111111111111111111111111111111111111",  # Native Solana staking
-    "SKRskrmtL83pcL4YqLWt6iPefDqwXQWHSw9S9vz94BZ",  # SKR Staking
-    "SKRuTecmFDZHjs2DxRTJNEK7m7hunKGTWJiaZ3tMVVA",  # Solana Mobile validator
-    "MarBmsSgKXdrN1egZf5sqe1TMai9K1rChYNDJgjq7aD",  # Marinade Finance
-    "StkitLLhKKPjPzBJTCLSJYUDVxqDiPJUdCQPKJqvLKK",  # Lido on Solana
-    "J1toso1uCk3RLmjorhTtrVwY9HJ7X8V9yYac6Y7kGCPn",  # Jito staking
-    "CREAMpdW4kfKTfFMtTBLqb5tQG5mvXeGAibnqjVCT2Qv",  # Cream Finance
-    "4HQy82s9CHTv1GsYKnANHMiHfhcqesYkK6sB3RDSYyqw",  # SKR staking pool
-    SOL_WSOL_MINT, # WSOL is often involved in staking/unstaking
-}
-
-
-
+# ---------------- CONFIG ----------------
+FETCH_WORKERS = 2  # Hyperliquid + chain-specific history
+DEEP_VIEW_PAGE = 500  # rows per page in deep history mode
+DEEP_PREVIEW_ROWS = 2000  # rows appended to the live preview while a deep history streams
+LIVE_REFRESH_SECONDS = 2  # live Hyperliquid panel redraw interval
+SEARCH_LIMIT = 500  # activity index rows shown per search
+SEARCH_PERIODS = {"全部": None, "最近 7 天": 7, "最近 30 天": 30, "本月": "month", "最近 365 天": 365}
 
 # Known wallets imported from known_wallets.py
 known_wallets = KNOWN_WALLETS
 
-# ============================================================
-# Helper functions
-# ============================================================
-def detect_address_type(addr: str):
-    addr = addr.strip()
-    
-    # Check Bitcoin addresses first (more specific patterns)
-    # Legacy P2PKH (starts with 1)
-    if addr.startswith('1') and 26 <= len(addr) <= 35:
-        return "bitcoin"
-    # P2SH (starts with 3)
-    if addr.startswith('3') and 26 <= len(addr) <= 35:
-        return "bitcoin"
-    # Bech32 SegWit (starts with bc1)
-    if addr.lower().startswith('bc1') and 42 <= len(addr) <= 62:
-        return "bitcoin"
-    
-    # Check Ethereum (0x + 40 hex chars)
-    if addr.lower().startswith("0x") and len(addr) == 42:
-        return "ethereum"
-    
-    # Check Solana (base58, 32-44 chars)
-    try:
-        base58.b58decode(addr)
-        if 32 <= len(addr) <= 44:
-            return "solana"
-    except Exception:
-        pass
-    
-    
-    return None
-
-
-def resolve_ens(name_or_addr: str):
-    """解析 ENS 名稱為以太坊地址"""
-    if not name_or_addr.endswith(".eth"):
-        return name_or_addr
-    
-    # Try using integrated ENS module if available
-    try:
-        addr = w3.ens.address(name_or_addr)
-        if addr:
-            return addr
-    except Exception:
-        pass
-    
-    # Fallback to API resolution
-    try:
-        res = requests.get(f"https://api.ensideas.com/ens/resolve/{name_or_addr}", timeout=10)
-        data = res.json()
-        if "address" in data and data["address"]:
-            return data["address"]
-    except Exception:
-        pass
-    
-    return None
-
-
-
-
-def safe_post_json(url, payload, retries=3):
-    """安全呼叫 Hyperliquid API"""
-    for _ in range(retries):
-        try:
-            res = requests.post(url, json=payload, timeout=10)
-            if res.status_code == 200 and res.text.strip():
-                return res.json()
-        except Exception:
-            pass
-        time.sleep(1)
-    return None
+# /metrics for Prometheus when WALLET_METRICS_PORT is set
+instrumentation.start_metrics_server()
+# Keep KNOWN_WALLETS (and the watchlist) warm so dropdown picks render from cache
+prefetcher = start_prefetcher()
 
 
 # ============================================================
-# Hyperliquid
+# Fetch fan-out
 # ============================================================
-@st.cache_data(ttl=300)  # Cache for 5 minutes
-def get_hyperliquid_positions(addr_or_seeker):
-    url = "https://api.hyperliquid.xyz/info"
-    payload = (
-        {"type": "clearinghouseStateSeeker", "seeker": addr_or_seeker}
-        if addr_or_seeker.endswith(".skr") or addr_or_seeker.lower().startswith("seeker")
-        else {"type": "clearinghouseState", "user": addr_or_seeker}
+def script_thread_pool(max_workers):
+    """ThreadPoolExecutor whose workers share the current Streamlit script context"""
+    ctx = get_script_run_ctx()
+    return ThreadPoolExecutor(
+        max_workers=max_workers,
+        initializer=lambda: add_script_run_ctx(threading.current_thread(), ctx),
     )
-    return safe_post_json(url, payload)
 
 
-def render_hyperliquid_positions(data):
-    if not data or "assetPositions" not in data or not data["assetPositions"]:
-        st.info("📭 目前沒有倉位資料")
-        return
+# ============================================================
+# Streamlit UI
+# ============================================================
+st.set_page_config(page_title="Multi-chain Wallet Dashboard v2.6", layout="wide")
+st.title("🌐 多鏈錢包儀表板 v2.6 — 名人下拉選單 + 手動輸入")
 
-    rows = []
-    for p in data["assetPositions"]:
-        pos = p["position"]
-        symbol = pos.get("coin", "N/A")
-        side = "多單 🟢" if float(pos.get("szi", 0)) > 0 else "空單 🔴"
-
-        lev_info = pos.get("leverage", {})
-        if isinstance(lev_info, dict):
-            lev_val = lev_info.get("value", "—")
-            lev_type = lev_info.get("type", "")
-            leverage = f"{lev_val}x ({lev_type.capitalize()})"
+portfolio_mode = st.checkbox("👥 多錢包合併檢視（同一實體的多個地址，可跨鏈）")
+deep_mode = live_mode = multi_evm = False
+evm_chain_ids = ()
+deep_limit = None
+
+if portfolio_mode:
+    curated = [name for name, meta in known_wallets.items() if meta["status"] != "manual"]
+    picks = st.multiselect("已知錢包", curated)
+    extra = st.text_area("其他地址 / ENS（每行一個）", "")
+    portfolio_wallets = [(known_wallets[name]["address"], name) for name in picks]
+    portfolio_wallets += [(address, None) for address in parse_wallet_lines(extra)]
+else:
+    options = list(known_wallets.keys())
+    sel = st.selectbox("選擇已知錢包（或選擇 '手動輸入地址'）", options)
+
+    if sel:
+        meta = known_wallets[sel]
+        if meta["status"] == "manual":
+            st.info("請輸入或貼上你要查詢的錢包地址（支持 ENS / 0x / Solana）")
+            addr_input = st.text_input("錢包地址 / ENS", "")
         else:
-            leverage = f"{lev_info}x" if lev_info != "—" else "—"
-
-        entry = float(pos.get("entryPx", 0))
-        mark = float(pos.get("markPx", entry))
-        pnl = float(pos.get("unrealizedPnl", 0))
-        pnl_pct = ((mark - entry) / entry * 100) if entry > 0 else 0
-        liq = pos.get("liqPx", "—")
-
-        rows.append({
-            "幣種": symbol,
-            "方向": side,
-            "開倉均價": f"{entry:,.2f}",
-            "現價": f"{mark:,.2f}",
-            "盈虧率": f"{pnl_pct:+.2f}%",
-            "未實現盈虧 (USD)": f"{pnl:,.2f}",
-            "槓桿": leverage,
-            "爆倉價": liq if liq != "—" else "—",
-        })
-
-    df = pd.DataFrame(rows)
-
-    def color_pnl(val):
-        try:
-            num = float(val.replace("%", "").replace(",", ""))
-            if num > 0:
-                return "color: #00ff00; font-weight: bold"
-            elif num < 0:
-                return "color: #ff4d4d; font-weight: bold"
-        except:
-            pass
-        return "color: #e0e0e0"
-
-    st.markdown("### 📊 Hyperliquid 倉位概覽")
-    st.dataframe(df.style.map(color_pnl, subset=["盈虧率", "未實現盈虧 (USD)"]))
+            addr_input = st.text_input("錢包地址（可編輯）", meta["address"])
+            st.markdown(f"**來源**：{meta['source']}（可信度：{meta['status']}）")
+
+    deep_mode = st.checkbox("🔍 深度歷史模式（讀取完整歷史，分頁瀏覽）")
+    if deep_mode:
+        deep_limit = st.number_input("最多讀取筆數", min_value=1000, max_value=500000, value=50000, step=1000)
+    live_mode = st.checkbox("📡 Hyperliquid 即時倉位串流 (WebSocket)")
+    multi_evm = st.checkbox("🌉 多條 EVM 鏈（Etherscan v2，僅 0x 地址）")
+    if multi_evm:
+        evm_chain_ids = st.multiselect(
+            "EVM 鏈", list(dict.fromkeys((*EVM_CHAIN_IDS, *EVM_CHAINS))), default=list(EVM_CHAIN_IDS),
+            format_func=lambda chainid: f"{evm_chain(chainid)[0]} ({chainid})",
+        )
+debug_mode = st.sidebar.checkbox("🛠️ 偵錯面板")
+
+start = st.button("開始分析")
 
 
 # ============================================================
-# Ethereum Transactions
+# Multi-wallet portfolio
 # ============================================================
-@st.cache_data(ttl=300)  # Cache for 5 minutes
-def get_eth_transactions_detailed(address):
-    base = "https://api.etherscan.io/v2/api"
-    txs, tokens = [], []
-    params_eth = {
-        "chainid": 1,
-        "module": "account",
-        "action": "txlist",
-        "address": address,
-        "page": 1,
-        "offset": 300,
-        "sort": "desc",
-        "apikey": ETHERSCAN_API_KEY
-    }
-    res = requests.get(base, params=params_eth, timeout=10)
-    if res.status_code == 200:
-        txs = res.json().get("result", [])
-
-    params_token = {
-        "chainid": 1,
-        "module": "account",
-        "action": "tokentx",
-        "address": address,
-        "page": 1,
-        "offset": 300,
-        "sort": "desc",
-        "apikey": ETHERSCAN_API_KEY
-    }
-    res2 = requests.get(base, params=params_token, timeout=10)
-    if res2.status_code == 200:
-        tokens = res2.json().get("result", [])
-
-    return txs, tokens
-
-
-def format_address(addr):
-    """Format address as {4 digits}...{3 digits}...{4 digits}"""
-    if not addr or len(addr) < 11:
-        return addr
-    return f"{addr[:4]}...{addr[-7:-4]}...{addr[-4:]}"
-
-
-def interpret_eth_tx(tx, address, is_token=False):
-    # Use centralized ETH_STAKING_CONTRACTS
-    
-    if not is_token:
-        try:
-            value = int(tx.get("value", 0)) / 1e18
-        except (ValueError, TypeError):
-            value = 0
-        
-        from_addr = tx.get("from", "").lower()
-        to_addr = tx.get("to", "").lower()
-        
-        # Check if it's a staking transaction
-        if from_addr == address.lower():
-            # Check if sending to a known staking contract
-            if to_addr in ETH_STAKING_CONTRACTS:
-                staking_protocol = ETH_STAKING_CONTRACTS[to_addr]
-                return f"🪙 質押 {value:.4f} ETH 至 {staking_protocol}"
-            direction = "💸 轉出"
-            return f"{direction} {value:.4f} ETH 給 {format_address(to_addr)}"
-        else:
-            # Check if receiving from a staking contract (unstaking/rewards)
-            if from_addr in ETH_STAKING_CONTRACTS:
-                staking_protocol = ETH_STAKING_CONTRACTS[from_addr]
-                return f"💎 解質押/獎勵 {value:.4f} ETH 來自 {staking_protocol}"
-            direction = "📥 接收"
-            return f"{direction} {value:.4f} ETH 來自 {format_address(from_addr)}"
-    else:
-        token = tx.get("tokenSymbol", "")
-        try:
-            value = int(tx.get("value", 0)) / (10 ** int(tx.get("tokenDecimal", 18)))
-        except (ValueError, TypeError, ZeroDivisionError):
-            value = 0
-        
-        from_addr = tx.get("from", "")
-        to_addr = tx.get("to", "")
-        if from_addr.lower() == address.lower():
-            return f"💰 轉出 {value:.4f} {token} 給 {format_address(to_addr)}"
+def run_portfolio(wallets):
+    if not wallets:
+        st.error("請至少選擇或輸入一個錢包地址。")
+        st.stop()
+    if len(wallets) > MAX_PORTFOLIO_WALLETS:
+        st.warning(f"⚠️ 一次最多合併 {MAX_PORTFOLIO_WALLETS} 個錢包，其餘已略過。")
+        wallets = wallets[:MAX_PORTFOLIO_WALLETS]
+
+    progress = st.empty()
+    progress.info(f"⏳ 正在並行讀取 {len(wallets)} 個錢包...")
+    with script_thread_pool(max_workers=PORTFOLIO_WORKERS) as pool:
+        results = load_portfolio(
+            wallets, pool, on_progress=lambda done, total: progress.info(f"⏳ 已完成 {done} / {total} 項查詢...")
+        )
+    progress.empty()
+
+    st.dataframe(
+        pd.DataFrame([{"錢包": r["label"], "地址": r["address"], "鏈": r["chain"] or "—",
+                       "交易筆數": len(r["records"]), "狀態": r["error"] or "✅"} for r in results]),
+        use_container_width=True, hide_index=True,
+    )
+    tabs = st.tabs(["💼 合併 Hyperliquid 曝險", "📜 合併交易紀錄"])
+    with tabs[0]:
+        exposure = exposure_frame(results)
+        render_portfolio_exposure(exposure, exposure_totals(exposure), account_value(results))
+    with tabs[1], instrumentation.span("render_transactions"):
+        activity = activity_frame(merge_activity(results))
+        if len(activity):
+            st.success(f"✅ 共 {len(activity)} 筆交易（{len(results)} 個錢包，依時間合併）")
+            st.dataframe(activity, use_container_width=True, height=800)
         else:
-            return f"📥 接收 {value:.4f} {token} 來自 {format_address(from_addr)}"
+            st.warning("⚠️ 未找到任何符合條件的交易紀錄。")
 
 
-# ============================================================
-# Bitcoin Transactions
-# ============================================================
-@st.cache_data(ttl=300)  # Cache for 5 minutes
-def get_bitcoin_transactions(address):
-    """Fetch Bitcoin transactions using Blockchain.info API"""
-    url = f"https://blockchain.info/rawaddr/{address}"
-    try:
-        res = requests.get(url, params={"limit": 300}, timeout=10)
-        if res.status_code == 200:
-            data = res.json()
-            return data.get("txs", [])
-    except Exception:
-        pass
-    return []
-
-
-def interpret_bitcoin_tx(tx, address):
-    """Interpret Bitcoin transaction for display"""
-    try:
-        # Calculate total input and output for this address
-        inputs_value = 0
-        outputs_value = 0
-        from_addr = None
-        to_addr = None
-        
-        # Check inputs (spending)
-        for inp in tx.get("inputs", []):
-            prev_out = inp.get("prev_out", {})
-            inp_addr = prev_out.get("addr", "")
-            if inp_addr == address:
-                inputs_value += prev_out.get("value", 0)
-            elif not from_addr:
-                from_addr = inp_addr
-        
-        # Check outputs (receiving)
-        for out in tx.get("out", []):
-            out_addr = out.get("addr", "")
-            if out_addr == address:
-                outputs_value += out.get("value", 0)
-            elif not to_addr:
-                to_addr = out_addr
-        
-        # Convert satoshis to BTC
-        net_value = (outputs_value - inputs_value) / 1e8
-        
-        if net_value > 0:
-            # Receiving
-            direction = "📥 接收"
-            from_display = format_address(from_addr) if from_addr else "Unknown"
-            return f"{direction} {abs(net_value):.8f} BTC 來自 {from_display}"
-        elif net_value < 0:
-            # Sending
-            direction = "💸 轉出"
-            to_display = format_address(to_addr) if to_addr else "Unknown"
-            return f"{direction} {abs(net_value):.8f} BTC 給 {to_display}"
-        else:
-            return f"🔄 內部轉帳 (0 BTC 淨變化)"
-    except Exception:
-        return "❓ 無法解析交易"
+if start and portfolio_mode:
+    with instrumentation.trace(f"portfolio ({len(portfolio_wallets)})") as lookup:
+        run_portfolio(portfolio_wallets)
+    st.session_state["last_trace"] = lookup.to_dict()
 
+elif start:
+    with instrumentation.trace(addr_input.strip()) as lookup:
+        actual_addr = addr_input.strip()
+        if not actual_addr:
+            st.error("請提供有效錢包地址。")
+            st.stop()
 
-# ============================================================
-# Solana Transactions
-# ============================================================
-@st.cache_data(ttl=300)
-def get_solana_transactions(address):
-    """Fetch Solana transactions using Helius Enhanced Transactions API (with pagination)"""
-    if not HELIUS_API_KEY:
-        return []
-    
-    all_txs = []
-    last_signature = None
-    
-    # Fetch up to 3 pages (300 transactions)
-    for _ in range(3):
-        url = f"https://api.helius.xyz/v0/addresses/{address}/transactions"
-        params = {
-            "api-key": HELIUS_API_KEY,
-            "limit": 100
-        }
-        if last_signature:
-            params["before"] = last_signature
-            
-        try:
-            res = requests.get(url, params=params, timeout=10)
-            if res.status_code == 200:
-                data = res.json()
-                if not data or not isinstance(data, list):
-                    break
-                all_txs.extend(data)
-                if len(data) < 100:
-                    break
-                last_signature = data[-1].get("signature")
-            else:
-                break
-        except Exception as e:
-            print(f"Helius API error: {e}")
-            break
-            
-    return all_txs
-
-
-@st.cache_data(ttl=86400)
-def get_solana_token_metadata(mint):
-    """Fetch token symbol from Helius DAS API (getAsset)"""
-    if not HELIUS_API_KEY or not mint:
-        return {}
-    
-    url = f"https://mainnet.helius-rpc.com/?api-key={HELIUS_API_KEY}"
-    payload = {
-        "jsonrpc": "2.0",
-        "id": "get-token-metadata",
-        "method": "getAsset",
-        "params": {"id": mint}
-    }
-    
-    try:
-        res = requests.post(url, json=payload, timeout=5)
-        if res.status_code == 200:
-            result = res.json().get("result", {})
-            token_info = result.get("token_info", {})
-            metadata = result.get("content", {}).get("metadata", {})
-            return {
-                "symbol": token_info.get("symbol") or metadata.get("symbol") or "",
-                "name": metadata.get("name") or ""
-            }
-    except Exception:
-        pass
-    return {}
-
-
-def interpret_solana_tx(tx, address):
-    """Interpret Helius enhanced transaction for display"""
-    try:
-        # Check for staking indicators in instructions first
-        instructions = tx.get("instructions", [])
-        is_staking_program = False
-        for instr in instructions:
-            if instr.get("programId") in SOL_STAKING_ENTITIES:
-                is_staking_program = True
-                break
-
-        # Net balance tracking: {mint_or_sol: net_amount}
-        net_balances = {}
-
-
-        # Analyze native transfers (SOL)
-        native_transfers = tx.get("nativeTransfers", [])
-        for transfer in native_transfers:
-            from_addr = transfer.get("fromUserAccount", "")
-            to_addr = transfer.get("toUserAccount", "")
-            amount = transfer.get("amount", 0) / 1e9
-            if amount <= 0: continue
-
-            if from_addr == address:
-                net_balances["SOL_NATIVE"] = net_balances.get("SOL_NATIVE", 0) - amount
-            if to_addr == address:
-                net_balances["SOL_NATIVE"] = net_balances.get("SOL_NATIVE", 0) + amount
-
-        # Analyze token transfers
-        token_transfers = tx.get("tokenTransfers", [])
-        for transfer in token_transfers:
-            from_addr = transfer.get("fromUserAccount", "")
-            to_addr = transfer.get("toUserAccount", "")
-            amount = transfer.get("tokenAmount", 0)
-            if amount <= 0: continue
-
-            mint = transfer.get("mint", "")
-            # We treat them as separate keys in net_balances to avoid summing Native + Wrapped
-            if from_addr == address:
-                net_balances[mint] = net_balances.get(mint, 0) - amount
-            if to_addr == address:
-                net_balances[mint] = net_balances.get(mint, 0) + amount
-
-        # Summarize net changes by symbol
-        sent_dict = {}     # {symbol: amount}
-        received_dict = {} # {symbol: amount}
-        
-        for mint, net_val in net_balances.items():
-            if abs(net_val) < 0.000001: continue # Filter out dust
-
-            if mint == "SOL_NATIVE":
-                symbol = "SOL"
-            elif mint == SOL_WSOL_MINT:
-                symbol = "WSOL"  # Keep separate from native SOL
-            else:
-                meta = get_solana_token_metadata(mint)
-                symbol = meta.get("symbol") or format_address(mint) or "Token"
-            
-            if net_val < 0:
-                sent_dict[symbol] = sent_dict.get(symbol, 0) + abs(net_val)
-            else:
-                received_dict[symbol] = received_dict.get(symbol, 0) + abs(net_val)
-
-        # Convert to display strings
-        sent_assets = [f"{amt:.4f} {sym}" for sym, amt in sent_dict.items()]
-        received_assets = [f"{amt:.4f} {sym}" for sym, amt in received_dict.items()]
-
-        # --- Interpretation Logic Priority ---
-        
-        tx_type = tx.get("type", "UNKNOWN")
-        description = tx.get("description", "").lower()
-
-        # 1. Swap detection (Sent AND Received)
-        if (sent_assets and received_assets) or tx_type == "SWAP":
-            sent_str = ", ".join(sent_assets)
-            recv_str = ", ".join(received_assets)
-            
-            if sent_str and recv_str:
-                return f"💱 兌換 {sent_str} → {recv_str}"
-            elif sent_str:
-                return f"💸 賣出/轉出 {sent_str}"
-            elif recv_str:
-                return f"📥 買入/接收 {recv_str}"
-
-        # 2. Staking Detection
-        is_staking = (
-            tx_type in ["STAKE", "UNSTAKE"] or
-            "stake" in description or
-            "deposit" in description or
-            is_staking_program
-        )
+        addr_type = detect_address_type(actual_addr)
 
-        if is_staking:
-            # Check if it's primarily unstaking
-            unstaking = tx_type == "UNSTAKE" or (received_dict and not sent_dict and any(key in SOL_STAKING_ENTITIES for key in net_balances))
-            amount_str = (sent_assets[0] if sent_assets else received_assets[0]) if (sent_assets or received_assets) else ""
-            
-            if unstaking:
-                return f"💎 解質押 {amount_str}" if amount_str else "💎 解質押"
+        if not addr_type and actual_addr.lower().endswith(".eth"):
+            st.info("🔍 正在解析 ENS ...")
+            resolved = resolve_ens(actual_addr)
+            if resolved:
+                actual_addr = resolved
+                addr_type = "ethereum"
+                st.success(f"✅ ENS 解析成功：{actual_addr}")
             else:
-                return f"🪙 質押 {amount_str}" if amount_str else "🪙 質押"
-
-        # 3. Simple Transfer Fallback
-        if sent_assets:
-            return f"💸 轉出 {', '.join(sent_assets)}"
-        elif received_assets:
-            return f"📥 接收 {', '.join(received_assets)}"
-        
-        # 4. Final Fallback to Helius description or type
-        if description:
-            # Clean up the description by shortening any full addresses
-            import re
-            cleaned_desc = description
-            # Match base58-like addresses (32-44 chars)
-            addr_pattern = r'[1-9A-HJ-NP-Za-km-z]{32,44}'
-            for match in re.findall(addr_pattern, description):
-                cleaned_desc = cleaned_desc.replace(match, format_address(match))
-            return f"🧩 {cleaned_desc.capitalize()}"
-        return f"🧩 {tx_type}"
-    except Exception as e:
-        return f"❓ 解析錯誤: {str(e)}"
+                st.error("❌ 無法解析 ENS 名稱。")
+                st.stop()
 
 
-# ============================================================
-# Transaction Processing Helpers
-# ============================================================
-def process_ethereum_transactions(address):
-    """Process Ethereum transactions and return formatted list"""
-    readable = []
-    eth_txs, token_txs = get_eth_transactions_detailed(address)
-    
-    # Process ETH transfers
-    for tx in eth_txs[:300]:
-        try:
-            timestamp = int(tx["timeStamp"])
-            time_str = datetime.fromtimestamp(timestamp).strftime("%Y-%m-%d %H:%M")
-            desc = interpret_eth_tx(tx, address, is_token=False)
-            h = tx["hash"]
-            readable.append({
-                "時間": time_str, 
-                "摘要": desc, 
-                "Tx Hash": f"{h[:8]}...{h[-6:]}",
-                "_timestamp": timestamp
-            })
-        except (ValueError, KeyError):
-            continue
-    
-    # Detect swaps by grouping token transfers by transaction hash
-    swap_txs = {}  # Group by tx hash
-    for tx in token_txs[:300]:
-        try:
-            h = tx["hash"]
-            if h not in swap_txs:
-                swap_txs[h] = []
-            swap_txs[h].append(tx)
-        except (ValueError, KeyError):
-            continue
-    
-    # Analyze each transaction for swap pattern
-    for tx_hash, transfers in swap_txs.items():
-        if len(transfers) >= 2:  # Potential swap
-            sent_tokens = []
-            received_tokens = []
-            timestamp = 0
-            
-            for tx in transfers:
-                try:
-                    from_addr = tx.get("from", "").lower()
-                    to_addr = tx.get("to", "").lower()
-                    token = tx.get("tokenSymbol", "Token")
-                    value = int(tx.get("value", 0)) / (10 ** int(tx.get("tokenDecimal", 18)))
-                    timestamp = int(tx.get("timeStamp", 0))
-                    
-                    if from_addr == address.lower():
-                        sent_tokens.append(f"{value:.4f} {token}")
-                    elif to_addr == address.lower():
-                        received_tokens.append(f"{value:.4f} {token}")
-                except (ValueError, TypeError, ZeroDivisionError, KeyError):
-                    continue
-            
-            # If we have both sent and received, it's a swap
-            if sent_tokens and received_tokens:
-                time_str = datetime.fromtimestamp(timestamp).strftime("%Y-%m-%d %H:%M")
-                sent_str = ", ".join(sent_tokens)
-                received_str = ", ".join(received_tokens)
-                desc = f"💱 兌換 {sent_str} → {received_str}"
-                
-                readable.append({
-                    "時間": time_str,
-                    "摘要": desc,
-                    "Tx Hash": f"{tx_hash[:8]}...{tx_hash[-6:]}",
-                    "_timestamp": timestamp
-                })
+        if not addr_type:
+            st.error("❌ 無法判斷地址類型。")
+            st.stop()
+
+        st.info(f"🔎 檢測到 {addr_type.upper()} 類型地址")
+
+        # A new lookup replaces any previous deep-history spool of this session
+        previous_spool = st.session_state.pop("deep_spool", None)
+        if previous_spool:
+            get_activity_spool().drop(previous_spool)
+
+        # ...and any previous live Hyperliquid subscription
+        previous_live = st.session_state.pop("live_address", None)
+        if previous_live and previous_live != actual_addr:
+            get_hyperliquid_stream().unwatch(previous_live)
+        if live_mode and addr_type == "ethereum":
+            get_hyperliquid_stream().watch(actual_addr)
+            st.session_state["live_address"] = actual_addr
+
+        # Launch Hyperliquid and the chain-specific history concurrently;
+        # each tab is filled in as soon as its own data lands.
+        tabs = st.tabs(["💼 Hyperliquid 倉位", "📜 交易紀錄"])
+        with tabs[0]:
+            hl_slot = st.empty()
+            if addr_type == "ethereum":
+                hl_slot.info("⏳ 正在獲取 Hyperliquid 倉位...")
             else:
-                # Not a swap, process normally
-                for tx in transfers:
-                    try:
-                        timestamp = int(tx["timeStamp"])
-                        time_str = datetime.fromtimestamp(timestamp).strftime("%Y-%m-%d %H:%M")
-                        desc = interpret_eth_tx(tx, address, is_token=True)
-                        h = tx["hash"]
-                        readable.append({
-                            "時間": time_str, 
-                            "摘要": desc, 
-                            "Tx Hash": f"{h[:8]}...{h[-6:]}",
-                            "_timestamp": timestamp
-                        })
-                    except (ValueError, KeyError):
-                        continue
-        else:
-            # Single transfer, not a swap
-            for tx in transfers:
+                # Hyperliquid accounts are EVM addresses
+                hl_slot.info("💭 此地址目前沒有 Hyperliquid 倉位資料")
+        with tabs[1]:
+            tx_slot = st.empty()
+            if addr_type == "seeker":
+                tx_slot.warning("由于 Seeker ID 未能解析為 Solana 地址，無法獲取鏈上交易紀錄。")
+            else:
+                tx_slot.info("⏳ 正在獲取交易紀錄" + ("..." if deep_mode else " (最多 300 筆)..."))
+
+        def render_result(fut):
+            if futures[fut] == "hyperliquid":
+                try:
+                    pos = fut.result()
+                except UpstreamError:
+                    hl_slot.error("❌ Hyperliquid API 暫時無法使用，請稍後再試。")
+                    return
+                has_hyperliquid = pos and "assetPositions" in pos and len(pos.get("assetPositions", [])) > 0
+                with hl_slot.container():
+                    if has_hyperliquid:
+                        render_hyperliquid_positions(pos)
+                    else:
+                        st.info("💭 此地址目前沒有 Hyperliquid 倉位資料")
+                return
+
+            # 📜 交易紀錄
+            try:
+                records = fut.result()
+            except UpstreamError:
+                tx_slot.error("❌ 上游 API 暫時無法使用 (可能被限流)，請稍後再試。")
+                return
+            failed = ()
+            if futures[fut] == "evm_transactions":
+                records, failed = records
+            with tx_slot.container(), instrumentation.span("render_transactions"):
+                if failed:
+                    st.warning("⚠️ 以下鏈讀取失敗 (Etherscan 暫時無法使用或方案不支援)，結果未包含："
+                               + "、".join(f"{evm_chain(chainid)[0]} ({chainid})" for chainid in failed))
+                if records:
+                    # Processors return records newest first: no re-sort, formatted
+                    # (with ENS names for the counterparties) only now
+                    st.success(f"✅ 成功讀取 {len(records)} 筆交易")
+                    render_records(records, ens_counterparty_names, chain_column=evm_feed)
+                else:
+                    st.warning("⚠️ 未找到任何符合條件的交易紀錄。")
+
+        with script_thread_pool(max_workers=FETCH_WORKERS) as pool:
+            futures = {}
+            if addr_type == "ethereum":
+                futures[pool.submit(instrumentation.propagate(get_hyperliquid_positions), actual_addr)] = "hyperliquid"
+            processor = TX_PROCESSORS.get(addr_type)
+            deep = deep_mode and addr_type in DEEP_ITERATORS
+            # One feed over every selected EVM chain, probed and fetched concurrently
+            evm_feed = multi_evm and addr_type == "ethereum" and bool(evm_chain_ids) and not deep
+            if evm_feed:
+                futures[pool.submit(instrumentation.propagate(process_evm_transactions), actual_addr,
+                                    tuple(evm_chain_ids))] = "evm_transactions"
+            elif processor and not deep:
+                futures[pool.submit(instrumentation.propagate(processor), actual_addr)] = "transactions"
+
+            rendered = set()
+            if deep:
+                # Stream the full history on this thread, spilling pages to disk
+                spool = get_activity_spool()
+                spool_id = spool.create()
+                st.session_state["deep_spool"] = spool_id
+                total = 0
+                preview_frames = []
+                with tx_slot.container():
+                    progress = st.empty()
+                    preview = st.empty()
+                progress.info("⏳ 深度模式：正在逐頁讀取完整交易歷史...")
                 try:
-                    timestamp = int(tx["timeStamp"])
-                    time_str = datetime.fromtimestamp(timestamp).strftime("%Y-%m-%d %H:%M")
-                    desc = interpret_eth_tx(tx, address, is_token=True)
-                    h = tx["hash"]
-                    readable.append({
-                        "時間": time_str, 
-                        "摘要": desc, 
-                        "Tx Hash": f"{h[:8]}...{h[-6:]}",
-                        "_timestamp": timestamp
-                    })
-                except (ValueError, KeyError):
-                    continue
-    
-    # Final sorting and hard limit of 300
-    readable.sort(key=lambda x: x.get("_timestamp", 0), reverse=True)
-    return readable[:300]
-
-
-def process_solana_transactions(address):
-    """Process Solana transactions and return formatted list"""
-    readable = []
-    txs = get_solana_transactions(address)
-    
-    for tx in txs: # Process all fetched transactions up to limit
-        try:
-            # Helius uses 'timestamp' field (Unix timestamp)
-            timestamp = tx.get("timestamp", 0)
-            time_str = datetime.fromtimestamp(timestamp).strftime("%Y-%m-%d %H:%M")
-            desc = interpret_solana_tx(tx, address)
-            # Helius uses 'signature' field
-            h = tx.get("signature", "")
-            readable.append({
-                "時間": time_str, 
-                "摘要": desc, 
-                "Tx Hash": f"{h[:8]}...{h[-6:]}" if h else "N/A",
-                "_timestamp": timestamp
-            })
-        except (ValueError, KeyError):
-            continue
-    
-    return readable
-
-
-def process_bitcoin_transactions(address):
-    """Process Bitcoin transactions and return formatted list"""
-    readable = []
-    btc_txs = get_bitcoin_transactions(address)
-    
-    for tx in btc_txs: # Process all fetched transactions up to limit
-        try:
-            timestamp = tx.get("time", 0)
-            time_str = datetime.fromtimestamp(timestamp).strftime("%Y-%m-%d %H:%M")
-            desc = interpret_bitcoin_tx(tx, address)
-            h = tx.get("hash", "")
-            readable.append({
-                "時間": time_str, 
-                "摘要": desc, 
-                "Tx Hash": f"{h[:8]}...{h[-6:]}",
-                "_timestamp": timestamp
-            })
-        except (ValueError, KeyError):
-            continue
-    
-    return readable
+                    for page in iter_activity_pages(addr_type, actual_addr, DEEP_VIEW_PAGE, deep_limit):
+                        spool.append(spool_id, [record.to_dict() for record in page])
+                        if total < DEEP_PREVIEW_ROWS:
+                            # Append each page to the preview as soon as it is read
+                            preview_frames.append(display_frame(page))
+                            preview.dataframe(pd.concat(preview_frames, ignore_index=True),
+                                              use_container_width=True, height=400)
+                        total += len(page)
+                        progress.info(f"⏳ 深度模式：已讀取 {total} 筆交易...")
+                        for fut in futures:
+                            if fut.done() and fut not in rendered:
+                                render_result(fut)
+                                rendered.add(fut)
+                    preview.empty()
+                    progress.success(f"✅ 深度模式共讀取 {total} 筆交易，請於下方「📚 深度交易歷史」分頁瀏覽")
+                except UpstreamError:
+                    progress.warning(f"⚠️ 上游 API 中斷，僅讀取到 {total} 筆交易（已保存於下方分頁）")
+
+            for fut in as_completed(futures):
+                if fut not in rendered:
+                    render_result(fut)
+
+    st.session_state["last_trace"] = lookup.to_dict()
 
 
 # ============================================================
-# Streamlit UI
+# Live Hyperliquid positions (persists across reruns)
 # ============================================================
-st.set_page_config(page_title="Multi-chain Wallet Dashboard v2.6", layout="wide")
-st.title("🌐 多鏈錢包儀表板 v2.6 — 名人下拉選單 + 手動輸入")
-
-options = list(known_wallets.keys())
-sel = st.selectbox("選擇已知錢包（或選擇 '手動輸入地址'）", options)
-
-if sel:
-    meta = known_wallets[sel]
-    if meta["status"] == "manual":
-        st.info("請輸入或貼上你要查詢的錢包地址（支持 ENS / 0x / Solana）")
-        addr_input = st.text_input("錢包地址 / ENS", "")
-    else:
-        addr_input = st.text_input("錢包地址（可編輯）", meta["address"])
-        st.markdown(f"**來源**：{meta['source']}（可信度：{meta['status']}）")
-
-if st.button("開始分析"):
-    actual_addr = addr_input.strip()
-    if not actual_addr:
-        st.error("請提供有效錢包地址。")
-        st.stop()
-
-    addr_type = detect_address_type(actual_addr)
-
-    if not addr_type and actual_addr.lower().endswith(".eth"):
-        st.info("🔍 正在解析 ENS ...")
-        resolved = resolve_ens(actual_addr)
-        if resolved:
-            actual_addr = resolved
-            addr_type = "ethereum"
-            st.success(f"✅ ENS 解析成功：{actual_addr}")
+@st.fragment(run_every=LIVE_REFRESH_SECONDS)
+def render_live_positions(address):
+    stream = get_hyperliquid_stream()
+    stream.watch(address)  # re-subscribes if the watch expired while the tab was idle
+    st.markdown("### 📡 Hyperliquid 即時倉位")
+    snapshot = stream.snapshot(address)
+    if snapshot is None:
+        if stream.last_error:
+            st.warning(f"⚠️ 即時串流連線中斷，重試中... ({stream.last_error})")
         else:
-            st.error("❌ 無法解析 ENS 名稱。")
-            st.stop()
+            st.info("⏳ 正在連線 Hyperliquid 即時串流...")
+        return
+    state, received_at = snapshot
+    render_hyperliquid_positions(state)
+    st.caption(f"倉位更新於 {datetime.fromtimestamp(received_at):%H:%M:%S}，現價與未實現盈虧依即時中價計算"
+               + ("" if stream.connected else " (連線中斷，重試中)"))
 
 
-    if not addr_type:
-        st.error("❌ 無法判斷地址類型。")
-        st.stop()
+if st.session_state.get("live_address"):
+    render_live_positions(st.session_state["live_address"])
 
-    st.info(f"🔎 檢測到 {addr_type.upper()} 類型地址")
 
-    # Check if Hyperliquid positions exist
-    pos = get_hyperliquid_positions(actual_addr)
-    has_hyperliquid = pos and "assetPositions" in pos and len(pos.get("assetPositions", [])) > 0
-    
-    # Reverting to original simple Tabs
-    tabs = st.tabs(["💼 Hyperliquid 倉位", "📜 交易紀錄"])
+# ============================================================
+# Deep history browser (persists across reruns)
+# ============================================================
+if st.session_state.get("deep_spool"):
+    spool = get_activity_spool()
+    spool_id = st.session_state["deep_spool"]
+    total = spool.count(spool_id)
+    if total:
+        st.markdown("### 📚 深度交易歷史")
+        pages = (total + DEEP_VIEW_PAGE - 1) // DEEP_VIEW_PAGE
+        page_no = st.number_input(f"頁數 (共 {pages} 頁，{total} 筆)", min_value=1, max_value=pages, value=1)
+        records = [TxRecord.from_dict(row) for row in spool.page(spool_id, page_no - 1, DEEP_VIEW_PAGE)]
+        st.dataframe(display_frame(records, ens_counterparty_names(records)), use_container_width=True, height=800)
 
-    with tabs[0]:
-        if has_hyperliquid:
-            render_hyperliquid_positions(pos)
+
+# ============================================================
+# Activity index search (every wallet looked up so far)
+# ============================================================
+def period_start(period):
+    """Unix start of a SEARCH_PERIODS choice (local time), or None for all time"""
+    days = SEARCH_PERIODS[period]
+    if days is None:
+        return None
+    if days == "month":
+        return datetime.now().replace(day=1, hour=0, minute=0, second=0, microsecond=0).timestamp()
+    return time.time() - days * 86400
+
+
+known_labels = {address_key(meta["address"]): name for name, meta in known_wallets.items() if meta["address"]}
+
+
+def index_wallet_label(wallet):
+    """Known-wallet name of an indexed wallet, else its shortened address"""
+    return known_labels.get(wallet) or format_address(wallet)
+
+
+with st.expander("🗂️ 活動索引搜尋（所有查詢過的錢包）"):
+    activity_index = get_activity_index()
+    indexed_wallets, indexed_rows = activity_index.stats()
+    st.caption(f"已索引 {indexed_wallets} 個錢包、{indexed_rows} 筆交易（每次查詢後自動更新）")
+    cols = st.columns(4)
+    peer = cols[0].text_input("對手方地址 / ENS", "")
+    kinds = cols[1].multiselect("類型", KINDS)
+    asset = cols[2].text_input("資產（例如 ETH、USDC）", "")
+    note = cols[3].text_input("協議 / 備註關鍵字（例如 Lido）", "")
+    period = st.selectbox("期間", list(SEARCH_PERIODS))
+    if peer.strip() or kinds or asset.strip() or note.strip():
+        peer = peer.strip()
+        if peer.lower().endswith(".eth"):
+            peer = resolve_ens(peer) or peer
+        filters = dict(counterparty=peer, asset=asset, kinds=tuple(kinds), note=note, since=period_start(period))
+        started = time.perf_counter()
+        with instrumentation.span("activity_search"):
+            wallets_hit = activity_index.interactions(**filters)
+            hits = activity_index.search(limit=SEARCH_LIMIT, **filters)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        if not wallets_hit:
+            st.warning("⚠️ 索引中沒有符合條件的交易。")
         else:
-            st.info("💭 此地址目前沒有 Hyperliquid 倉位資料")
+            st.success(f"✅ {len(wallets_hit)} 個錢包共 {sum(w['count'] for w in wallets_hit)} 筆符合（{elapsed_ms:.0f} ms）")
+            st.dataframe(
+                pd.DataFrame([{"錢包": index_wallet_label(w["wallet"]), "地址": w["wallet"], "鏈": w["chain"],
+                               "筆數": w["count"], "最早": datetime.fromtimestamp(w["first"]),
+                               "最近": datetime.fromtimestamp(w["last"])} for w in wallets_hit]),
+                use_container_width=True, hide_index=True,
+            )
+            records = [TxRecord.from_dict(row) for _, row in hits]
+            df = display_frame(records)
+            df.insert(1, "錢包", [index_wallet_label(wallet) for wallet, _ in hits])
+            df.insert(2, "鏈", [record.chain for record in records])
+            st.dataframe(df, use_container_width=True, height=400)
+            if len(hits) == SEARCH_LIMIT:
+                st.caption(f"僅顯示最近 {SEARCH_LIMIT} 筆")
 
-    with tabs[1]:
-        # 📜 交易紀錄
-        readable = []
-        with st.spinner("⏳ 正在獲取交易紀錄 (最多 300 筆)..."):
-            if addr_type == "ethereum":
-                readable = process_ethereum_transactions(actual_addr)
-            elif addr_type == "solana":
-                readable = process_solana_transactions(actual_addr)
-            elif addr_type == "bitcoin":
-                readable = process_bitcoin_transactions(actual_addr)
-            elif addr_type == "seeker":
-                st.warning("由于 Seeker ID 未能解析為 Solana 地址，無法獲取鏈上交易紀錄。")
-            
-        if readable and len(readable) > 0:
-            # Sort by timestamp in descending order (newest first)
-            readable.sort(key=lambda x: x.get("_timestamp", 0), reverse=True)
-            
-            # Remove hidden fields and display ALL fetched records
-            df = pd.DataFrame(readable)
-            if "_timestamp" in df.columns:
-                df = df.drop(columns=["_timestamp"])
-            
-            st.success(f"✅ 成功讀取 {len(readable)} 筆交易")
-            st.dataframe(df, use_container_width=True, height=800)
+
+# ============================================================
+# Debug panel: timing breakdown of the last lookup
+# ============================================================
+if debug_mode:
+    with st.sidebar:
+        st.markdown("### 🛠️ 上次查詢耗時")
+        last = st.session_state.get("last_trace")
+        if not last:
+            st.caption("尚無查詢紀錄")
         else:
-            st.warning("⚠️ 未找到任何符合條件的交易紀錄。")
+            st.caption(f"{last['label']} — 共 {last['duration_ms']:.0f} ms")
+            st.dataframe(pd.DataFrame(last["summary"]), use_container_width=True, hide_index=True)
+            upstream = [s for s in last["spans"] if s["kind"] == "upstream"]
+            if upstream:
+                st.markdown("**上游請求**")
+                st.dataframe(
+                    pd.DataFrame(upstream)[["offset_ms", "provider", "endpoint", "status", "bytes", "ms", "attempt"]],
+                    use_container_width=True, hide_index=True,
+                )
+            errors = [s for s in last["spans"] if s["kind"] == "error"]
+            if errors:
+                st.markdown("**上游錯誤**")
+                st.dataframe(pd.DataFrame(errors)[["offset_ms", "provider", "endpoint", "reason", "detail"]],
+                             use_container_width=True, hide_index=True)
+            st.download_button("下載 trace (JSON)", json.dumps(last, ensure_ascii=False, indent=2),
+                               file_name="wallet_trace.json", mime="application/json")
+        if prefetcher.status["last_cycle_at"]:
+            status = prefetcher.status
+            st.caption(f"背景預載：{datetime.fromtimestamp(status['last_cycle_at']):%H:%M:%S} 完成第 {status['cycles']} 輪，"
+                       f"刷新 {status['refreshed']} / 略過 {status['skipped']} / 失敗 {status['errors']}")
+        with st.expander("Prometheus 指標"):
+            st.code(instrumentation.get_metrics().render(), language="text")
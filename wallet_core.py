@@ -0,0 +1,1355 @@
+# ============================================================
+# Wallet core: fetchers, interpreters and per-chain processing
+# 抓取 / 解析 / 整理交易紀錄的核心邏輯，供 Streamlit 介面與批次模式共用
+# ============================================================
+
+import streamlit as st
+import numpy as np
+import pandas as pd
+import os
+import heapq
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from dotenv import load_dotenv
+import ens_batch
+import http_client
+import instrumentation
+from http_client import UpstreamError
+from persistent_cache import get_cache
+from shared_cache import shared_cached
+from history_store import get_activity_index, get_history_store
+from instrumentation import timed
+from address_types import classify_address, is_extended_pubkey
+from tx_records import TxRecord, by_timestamp, format_address, newest_first
+
+# ENS support is integrated in Web3 v6+
+HAS_ENS = True
+
+# ---------------- CONFIG ----------------
+load_dotenv()
+ETHERSCAN_API_KEY = os.getenv("ETH_API_KEY")
+INFURA_API = os.getenv("INFURA_API_URL")
+HELIUS_API_KEY = os.getenv("HELIUS_API_KEY")
+
+_web3 = None
+_web3_lock = threading.Lock()
+
+
+def get_web3():
+    """Process-wide Web3 client for ENS, created on first use
+
+    Importing web3 takes about a second, so Solana / Bitcoin lookups and
+    worker boots never pay for it.
+    """
+    global _web3
+    if _web3 is None:
+        with _web3_lock:
+            if _web3 is None:
+                from web3 import Web3
+
+                _web3 = Web3(Web3.HTTPProvider(INFURA_API, session=http_client.get_session()))
+    return _web3
+
+# ---------------- CONFIG: ADDR & CONSTANTS ----------------
+# Provider endpoints (overridable, e.g. to point at benchmarks/mock_server.py)
+ETHERSCAN_API_BASE = os.getenv("ETHERSCAN_API_BASE", "https://api.etherscan.io/v2/api")
+HELIUS_API_BASE = os.getenv("HELIUS_API_BASE", "https://api.helius.xyz")
+HELIUS_RPC_URL = os.getenv("HELIUS_RPC_URL", "https://mainnet.helius-rpc.com")
+BLOCKCHAIN_INFO_BASE = os.getenv("BLOCKCHAIN_INFO_BASE", "https://blockchain.info")
+HYPERLIQUID_API_URL = os.getenv("HYPERLIQUID_API_URL", "https://api.hyperliquid.xyz/info")
+ETHERSCAN_PAGE_SIZE = 300
+BTC_PAGE_SIZE = 300
+BTC_SYNC_PROBE = 50  # newest records fetched to detect new BTC activity
+BTC_MULTIADDR_PAGE = 100  # Blockchain.info multiaddr max n per call (xpub lookups)
+HELIUS_PAGE_SIZE = 100
+SOL_RECENT_PAGES = 3  # latest 300 transactions
+# Signature prefetch: list signatures first (cheap, 1000 per call), then parse
+# them in concurrent chunks instead of chaining `before` page after page.
+# HELIUS_PARALLEL_PAGES=0 restores the serial enhanced-transactions paging.
+HELIUS_PARALLEL_PAGES = os.getenv("HELIUS_PARALLEL_PAGES", "1") != "0"
+HELIUS_SIGNATURE_PAGE = 1000  # getSignaturesForAddress max limit
+HELIUS_PARSE_BATCH = 100  # /v0/transactions max signatures per call
+HELIUS_PARSE_WORKERS = 4
+
+# Multi-EVM mode: one 0x address across several Etherscan v2 chains
+# chainid -> (chain name, native symbol); any other v2 chain id also works
+EVM_CHAINS = {
+    1: ("ethereum", "ETH"),
+    42161: ("arbitrum", "ETH"),
+    8453: ("base", "ETH"),
+    10: ("optimism", "ETH"),
+    137: ("polygon", "POL"),
+    56: ("bsc", "BNB"),
+}
+EVM_CHAIN_IDS = tuple(int(c) for c in os.getenv("EVM_CHAIN_IDS", "1,42161,8453,10").split(",") if c.strip())
+EVM_FANOUT_WORKERS = 4  # chains fetched at once; all share the Etherscan token bucket
+
+# Deep history mode: upstream page sizes while streaming full histories
+DEEP_ETHERSCAN_PAGE = 1000
+DEEP_BTC_PAGE = 100
+
+ETH_STAKING_CONTRACTS = {
+    "0x00000000219ab540356cbb839cbe05303d7705fa": "ETH2 Deposit",
+    "0xae7ab96520de3a18e5e111b5eaab095312d7fe84": "Lido stETH",
+    "0x1643e812ae58766192cf7d2cf9567df2c37e9b7f": "Rocket Pool rETH",
+    "0xdfe66b14d37c77f4e9b180ceb433d1b164f0281d": "Stakewise sETH2",
+    "0xc874b064f465bdd6411d45734b56fac750cda29a": "Coinbase Wrapped Staked ETH",
+}
+
+SOL_WSOL_MINT = "So11111111111111111111111111111111111111112"
+SOL_ASSET_BATCH_SIZE = 1000  # Helius DAS getAssetBatch max ids per call
+
+# Persistent cache TTLs (seconds)
+TOKEN_METADATA_TTL = 30 * 86400  # mint symbols are effectively immutable
+TOKEN_METADATA_MISS_TTL = 86400  # mints DAS does not know (yet)
+ENS_TTL = 86400  # names can be re-pointed
+ENS_MISS_TTL = 3600  # unregistered names / addresses without a primary name
+EVM_PROBE_TTL = 86400  # chains an address is active on
+EVM_PROBE_MISS_TTL = 3600  # chains without activity (yet)
+
+SOL_STAKING_ENTITIES = {
+    "Stake11111111111111111111111111111111111111",  # Native Solana staking
+    "SKRskrmtL83pcL4YqLWt6iPefDqwXQWHSw9S9vz94BZ",  # SKR Staking
+    "SKRuTecmFDZHjs2DxRTJNEK7m7hunKGTWJiaZ3tMVVA",  # Solana Mobile validator
+    "MarBmsSgKXdrN1egZf5sqe1TMai9K1rChYNDJgjq7aD",  # Marinade Finance
+    "StkitLLhKKPjPzBJTCLSJYUDVxqDiPJUdCQPKJqvLKK",  # Lido on Solana
+    "J1toso1uCk3RLmjorhTtrVwY9HJ7X8V9yYac6Y7kGCPn",  # Jito staking
+    "CREAMpdW4kfKTfFMtTBLqb5tQG5mvXeGAibnqjVCT2Qv",  # Cream Finance
+    "4HQy82s9CHTv1GsYKnANHMiHfhcqesYkK6sB3RDSYyqw",  # SKR staking pool
+    SOL_WSOL_MINT, # WSOL is often involved in staking/unstaking
+}
+
+
+# ============================================================
+# Helper functions
+# ============================================================
+def evm_chain(chainid):
+    """(chain name, native symbol) of an Etherscan v2 chain id"""
+    return EVM_CHAINS.get(chainid) or (f"evm-{chainid}", "ETH")
+
+
+def detect_address_type(addr: str):
+    """'bitcoin', 'ethereum', 'solana' or None; checksums are validated (see address_types.py)"""
+    return classify_address(addr)
+
+
+@timed("resolve_ens")
+def resolve_ens(name_or_addr: str):
+    """解析 ENS 名稱為以太坊地址"""
+    if not name_or_addr.endswith(".eth"):
+        return name_or_addr
+    return resolve_ens_names([name_or_addr]).get(name_or_addr.lower())
+
+
+@timed("resolve_ens_names")
+def resolve_ens_names(names):
+    """{lower-case name: address or None} for many ENS names: persistent cache, then one Multicall3 pass
+
+    Only names without a resolver in the registry (wildcard / off-chain
+    names), or every name when the node is unreachable, fall back to
+    resolve_ens_uncached one by one; a resolver answering the zero address
+    is a miss.
+    """
+    names = list(dict.fromkeys(name.lower() for name in names))
+    cache = get_cache()
+    found = cache.get_many("ens", names)
+    missing = [name for name in names if name not in found]
+    if missing:
+        try:
+            fetched = ens_batch.forward_lookup(INFURA_API, missing) if INFURA_API else None
+        except Exception:
+            fetched = None
+        resolved = {name: fetched[name] if name in (fetched or {}) else resolve_ens_uncached(name) for name in missing}
+        cache.set_many("ens", {name: addr for name, addr in resolved.items() if addr}, ENS_TTL)
+        if fetched is not None:
+            # Only remember misses the node actually answered
+            cache.set_many("ens", {name: "" for name, addr in resolved.items() if not addr}, ENS_MISS_TTL)
+        found.update(resolved)
+    return {name: found.get(name) or None for name in names}
+
+
+def resolve_ens_uncached(name_or_addr: str):
+    """ENS lookup without the persistent cache (Web3 first, ensideas fallback)"""
+    # Try using integrated ENS module if available
+    try:
+        addr = get_web3().ens.address(name_or_addr)
+        if addr:
+            return addr
+    except Exception:
+        pass
+    
+    # Fallback to API resolution
+    try:
+        res = http_client.get(f"https://api.ensideas.com/ens/resolve/{name_or_addr}")
+        data = res.json()
+        if "address" in data and data["address"]:
+            return data["address"]
+    except Exception:
+        pass
+    
+    return None
+
+
+@timed("ens_reverse")
+def lookup_ens_names(addresses):
+    """{lower-case address: primary ENS name} for the 0x addresses that have one
+
+    Cached per address; the rest are reverse-resolved (and forward-verified)
+    in a few Multicall3 calls. Returns what is known so far when no node is
+    configured or it fails.
+    """
+    addrs = list(dict.fromkeys(a.lower() for a in addresses if a and len(a) == 42 and a[:2] in ("0x", "0X")))
+    if not addrs:
+        return {}
+    cache = get_cache()
+    found = cache.get_many("ens_reverse", addrs)
+    missing = [addr for addr in addrs if addr not in found]
+    if missing and INFURA_API:
+        try:
+            fetched = ens_batch.reverse_lookup(INFURA_API, missing)
+        except Exception:
+            fetched = {}
+        cache.set_many("ens_reverse", {addr: name for addr, name in fetched.items() if name}, ENS_TTL)
+        cache.set_many("ens_reverse", {addr: "" for addr, name in fetched.items() if not name}, ENS_MISS_TTL)
+        found.update(fetched)
+    return {addr: name for addr, name in found.items() if name}
+
+
+def ens_counterparty_names(records):
+    """Primary ENS names of the distinct EVM counterparties among records (for display_frame)"""
+    return lookup_ens_names({r.counterparty for r in records if r.chain in EVM_CHAIN_NAMES and r.counterparty})
+
+
+
+
+def safe_post_json(url, payload):
+    """安全呼叫 Hyperliquid API: the JSON body, {} when the request is rejected (4xx, e.g. no such user), None on outage
+
+    http_client already retries 429 / 5xx / connection errors with backoff;
+    other 4xx answers are deterministic, so they are not retried.
+    """
+    try:
+        res = http_client.post(url, json=payload)
+    except Exception:
+        return None
+    if res.status_code == 200 and res.text.strip():
+        try:
+            return res.json()
+        except ValueError:
+            return None
+    if 400 <= res.status_code < 500 and res.status_code != 429:
+        return {}
+    return None
+
+
+# ============================================================
+# Hyperliquid
+# ============================================================
+@st.cache_data(ttl=300)  # Cache for 5 minutes
+@shared_cached("hyperliquid_positions", ttl=300)
+@timed("fetch_hyperliquid")
+def get_hyperliquid_positions(addr_or_seeker):
+    """clearinghouseState of a 0x account ({} when Hyperliquid has none); UpstreamError on outage"""
+    url = HYPERLIQUID_API_URL
+    payload = (
+        {"type": "clearinghouseStateSeeker", "seeker": addr_or_seeker}
+        if addr_or_seeker.endswith(".skr") or addr_or_seeker.lower().startswith("seeker")
+        else {"type": "clearinghouseState", "user": addr_or_seeker}
+    )
+    data = safe_post_json(url, payload)
+    if data is None:
+        # Raise rather than return None so the failure is not cached
+        raise UpstreamError("Hyperliquid clearinghouseState unavailable")
+    return data
+
+
+# ============================================================
+# Ethereum Transactions
+# ============================================================
+def fetch_etherscan_list(address, action, startblock=None, endblock=None, offset=ETHERSCAN_PAGE_SIZE, chainid=1):
+    """Fetch one Etherscan v2 account list (txlist / tokentx); None on upstream failure"""
+    params = {
+        "chainid": chainid,
+        "module": "account",
+        "action": action,
+        "address": address,
+        "page": 1,
+        "offset": offset,
+        "sort": "desc",
+        "apikey": ETHERSCAN_API_KEY
+    }
+    if startblock is not None:
+        params["startblock"] = startblock
+    if endblock is not None:
+        params["endblock"] = endblock
+    try:
+        res = http_client.get(ETHERSCAN_API_BASE, params=params)
+        if res.status_code == 200:
+            result = res.json().get("result", [])
+            # Errors such as rate limiting come back as a string result
+            if isinstance(result, list):
+                return result
+    except Exception:
+        pass
+    return None
+
+
+def etherscan_record_id(tx, action):
+    """Stable id of an Etherscan record (token transfers share their tx hash)"""
+    if action == "txlist":
+        return tx.get("hash", "")
+    if "logIndex" in tx:
+        return f"{tx.get('hash', '')}:{tx['logIndex']}"
+    return ":".join(str(tx.get(k, "")) for k in ("hash", "contractAddress", "from", "to", "value"))
+
+
+@timed("sync_etherscan")
+def sync_etherscan_history(address, action, chainid=1):
+    """Fetch only records from the newest stored block onwards and merge them"""
+    store = get_history_store()
+    chain = evm_chain(chainid)[0]
+    key = address.lower()
+    cursor = store.get_cursor(chain, key, action)
+    fresh = fetch_etherscan_list(address, action, startblock=int(cursor) if cursor else None, chainid=chainid)
+    if fresh is None:
+        if cursor is None:
+            raise UpstreamError(f"Etherscan {action} unavailable (chain {chainid})")
+        # Upstream failure: serve the stored history rather than nothing
+        return store.load(chain, key, action)
+
+    newest_block = max((int(tx.get("blockNumber", 0)) for tx in fresh), default=cursor)
+    store.merge(
+        chain, key, action,
+        [(etherscan_record_id(tx, action), tx.get("timeStamp", 0), tx) for tx in fresh],
+        newest_block,
+        # A full page means there may be a gap behind it; start over from it
+        replace=cursor is None or len(fresh) >= ETHERSCAN_PAGE_SIZE,
+    )
+    return store.load(chain, key, action)
+
+
+def sync_evm_lists(address, chainid=1):
+    """(txlist, tokentx) records of one chain"""
+    # txlist and tokentx are independent, so sync them concurrently
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        sync = instrumentation.propagate(sync_etherscan_history)
+        fut_eth = pool.submit(sync, address, "txlist", chainid)
+        fut_token = pool.submit(sync, address, "tokentx", chainid)
+        txs, tokens = fut_eth.result(), fut_token.result()
+    return txs, tokens
+
+
+@st.cache_data(ttl=300)  # Cache for 5 minutes
+@shared_cached("eth_transactions", ttl=300)
+@timed("fetch_ethereum")
+def get_eth_transactions_detailed(address):
+    return sync_evm_lists(address)
+
+
+@st.cache_data(ttl=300)
+@shared_cached("evm_transactions", ttl=300)
+@timed("fetch_evm")
+def get_evm_transactions(address, chainid):
+    """get_eth_transactions_detailed for another Etherscan v2 chain"""
+    return sync_evm_lists(address, chainid)
+
+
+def probe_evm_activity(address, chainid):
+    """Whether the address has any transaction on chainid: True / False, None if unknown
+
+    Costs at most two 1-record Etherscan lists (txlist, then tokentx), and
+    nothing for chains already synced or probed recently.
+    """
+    store = get_history_store()
+    chain, key = evm_chain(chainid)[0], address.lower()
+    if store.get_cursor(chain, key, "txlist") or store.get_cursor(chain, key, "tokentx"):
+        return True
+    cache = get_cache()
+    cached = cache.get("evm_probe", f"{chainid}:{key}")
+    if cached is not None:
+        return cached
+    active = False
+    for action in ("txlist", "tokentx"):
+        found = fetch_etherscan_list(address, action, offset=1, chainid=chainid)
+        if found is None:
+            return None
+        if found:
+            active = True
+            break
+    cache.set("evm_probe", f"{chainid}:{key}", active, EVM_PROBE_TTL if active else EVM_PROBE_MISS_TTL)
+    return active
+
+
+# ============================================================
+# Bitcoin Transactions
+# ============================================================
+def fetch_bitcoin_page(address, limit, offset=0):
+    """One Blockchain.info history page ({n_tx, txs, ...}); None on upstream failure
+
+    Plain addresses use rawaddr; an xpub / ypub / zpub is looked up with
+    multiaddr, which covers every derived address of the account.
+    """
+    if is_extended_pubkey(address):
+        return fetch_bitcoin_multiaddr(address, limit, offset)
+    url = f"{BLOCKCHAIN_INFO_BASE}/rawaddr/{address}"
+    try:
+        res = http_client.get(url, params={"limit": limit, "offset": offset})
+        if res.status_code == 200:
+            return res.json()
+    except Exception:
+        pass
+    return None
+
+
+def fetch_bitcoin_multiaddr(active, limit, offset=0):
+    """multiaddr history for '|'-joined addresses / xpubs, in BTC_MULTIADDR_PAGE calls; None on upstream failure"""
+    url = f"{BLOCKCHAIN_INFO_BASE}/multiaddr"
+    txs = []
+    n_tx = None
+    while len(txs) < limit:
+        n = min(BTC_MULTIADDR_PAGE, limit - len(txs))
+        try:
+            res = http_client.get(url, params={"active": active, "n": n, "offset": offset + len(txs)})
+            if res.status_code != 200:
+                return None
+            data = res.json()
+        except Exception:
+            return None
+        page = data.get("txs", [])
+        n_tx = (data.get("wallet") or {}).get("n_tx", n_tx)
+        txs.extend(page)
+        if len(page) < n:
+            break
+    return {"n_tx": n_tx, "txs": txs}
+
+
+@st.cache_data(ttl=300)  # Cache for 5 minutes
+@shared_cached("btc_transactions", ttl=300)
+@timed("fetch_bitcoin")
+def get_bitcoin_transactions(address):
+    """Fetch Bitcoin transactions using Blockchain.info API (incremental via n_tx offsets)"""
+    store = get_history_store()
+    cursor = store.get_cursor("bitcoin", address, "tx")
+
+    data = fetch_bitcoin_page(address, BTC_SYNC_PROBE if cursor else BTC_PAGE_SIZE)
+    if data is None:
+        if cursor is None:
+            raise UpstreamError("Blockchain.info rawaddr unavailable")
+        return stored_bitcoin_history(store, address)
+    n_tx = data.get("n_tx")
+    txs = data.get("txs", [])
+    replace = cursor is None
+    complete = True
+
+    if cursor is not None and n_tx is not None:
+        new_count = n_tx - int(cursor)
+        if new_count >= BTC_PAGE_SIZE:
+            # Too far behind to patch: refetch the newest page and start over
+            full = fetch_bitcoin_page(address, BTC_PAGE_SIZE)
+            if full is None:
+                complete = False
+            else:
+                txs, replace = full.get("txs", []), True
+        elif new_count > len(txs):
+            # Newer records beyond the probe page: fetch just those by offset
+            more = fetch_bitcoin_page(address, new_count - len(txs), offset=len(txs))
+            if more is None:
+                complete = False
+            else:
+                txs = txs + more.get("txs", [])
+
+    # Unconfirmed transactions may still be dropped or RBF-replaced: they are
+    # shown from this response but only stored once they have a block
+    pending = [tx for tx in txs if not tx.get("block_height")]
+    store.merge(
+        "bitcoin", address, "tx",
+        [(tx.get("hash", ""), tx.get("time", 0), tx) for tx in txs if tx.get("block_height")],
+        n_tx if complete else None,
+        replace=replace,
+    )
+    return pending + stored_bitcoin_history(store, address)
+
+
+def stored_bitcoin_history(store, address):
+    """Stored confirmed transactions, newest first (rows stored unconfirmed by older versions are skipped)"""
+    return [tx for tx in store.load("bitcoin", address, "tx") if tx.get("block_height")]
+
+
+def owned_bitcoin_addresses(owned):
+    """frozenset of a wallet's addresses from one address (or xpub) or an iterable of them"""
+    return frozenset((owned,)) if isinstance(owned, str) else frozenset(owned)
+
+
+def interpret_bitcoin_tx(tx, owned):
+    """Interpret a Blockchain.info transaction as a TxRecord (net BTC change of the owned addresses)
+
+    owned is a frozenset of the wallet's addresses; an xpub's derived
+    addresses are recognised by Blockchain.info's `xpub` annotations. One
+    pass over inputs and outputs sums owned / foreign value: owned outputs of
+    a spend are change, the counterparty is the largest foreign input
+    (receive) or output (send), and the fee is kept when the wallet alone
+    funded the transaction. A spend with no foreign output (consolidation,
+    self-transfer) is internal.
+    """
+    if isinstance(owned, str):
+        owned = owned_bitcoin_addresses(owned)
+    record = TxRecord("bitcoin", tx.get("hash", ""), int(tx.get("time", 0)), "error", asset="BTC")
+    try:
+        owned_in = foreign_in = owned_out = foreign_out = 0
+        source, source_value = None, -1
+        payee, payee_value = None, -1
+
+        for inp in tx.get("inputs", ()):
+            prev_out = inp.get("prev_out") or {}
+            value = prev_out.get("value", 0)
+            addr = prev_out.get("addr")
+            if addr in owned or "xpub" in prev_out:
+                owned_in += value
+            else:
+                foreign_in += value
+                if addr and value > source_value:
+                    source, source_value = addr, value
+
+        for out in tx.get("out", ()):
+            value = out.get("value", 0)
+            addr = out.get("addr")
+            if addr in owned or "xpub" in out:
+                owned_out += value
+            else:
+                foreign_out += value
+                if addr and value > payee_value:
+                    payee, payee_value = addr, value
+
+        # Convert satoshis to BTC
+        net = owned_out - owned_in
+        if owned_in and not foreign_in:
+            fee = tx.get("fee")
+            if fee is None:
+                fee = owned_in - owned_out - foreign_out
+            record.fee = fee / 1e8
+
+        if net > 0:
+            # Receiving
+            record.kind, record.direction, record.counterparty = "receive", "in", source
+        elif net < 0 and foreign_out:
+            # Sending: owned outputs were change
+            record.kind, record.direction, record.counterparty = "send", "out", payee
+        else:
+            record.kind = "internal"
+        record.amount = abs(net) / 1e8
+    except Exception:
+        record.kind = "error"
+    return record
+
+
+# ============================================================
+# Solana Transactions
+# ============================================================
+def helius_json(send, url, endpoint, **kwargs):
+    """Decoded JSON body of a Helius call; None on upstream failure, recorded through instrumentation"""
+    try:
+        res = send(url, **kwargs)
+    except Exception as e:
+        instrumentation.record_upstream_error("helius", endpoint, type(e).__name__, e)
+        return None
+    if res.status_code != 200:
+        instrumentation.record_upstream_error("helius", endpoint, f"http_{res.status_code}", res.text[:200])
+        return None
+    try:
+        data = res.json()
+    except ValueError as e:
+        instrumentation.record_upstream_error("helius", endpoint, "invalid_json", e)
+        return None
+    return data
+
+
+def fetch_helius_page(address, before=None, until=None):
+    """One page of Helius enhanced transactions (newest first); None on upstream failure"""
+    url = f"{HELIUS_API_BASE}/v0/addresses/{address}/transactions"
+    params = {
+        "api-key": HELIUS_API_KEY,
+        "limit": HELIUS_PAGE_SIZE
+    }
+    if before:
+        params["before"] = before
+    if until:
+        params["until"] = until
+
+    data = helius_json(http_client.get, url, "addresses/transactions", params=params)
+    return data if data is None or isinstance(data, list) else []
+
+
+def fetch_solana_signatures(address, before=None, until=None, limit=HELIUS_SIGNATURE_PAGE):
+    """Transaction signatures for an address, newest first (getSignaturesForAddress); None on upstream failure"""
+    options = {"limit": limit}
+    if before:
+        options["before"] = before
+    if until:
+        options["until"] = until
+    payload = {
+        "jsonrpc": "2.0",
+        "id": "get-signatures",
+        "method": "getSignaturesForAddress",
+        "params": [address, options]
+    }
+    body = helius_json(http_client.post, f"{HELIUS_RPC_URL}/?api-key={HELIUS_API_KEY}", "rpc:getSignaturesForAddress",
+                       json=payload)
+    if body is None:
+        return None
+    result = body.get("result") if isinstance(body, dict) else None
+    if not isinstance(result, list):
+        detail = body.get("error") if isinstance(body, dict) else body
+        instrumentation.record_upstream_error("helius", "rpc:getSignaturesForAddress", "rpc_error", detail)
+        return None
+    return [entry["signature"] for entry in result if isinstance(entry, dict) and entry.get("signature")]
+
+
+def fetch_helius_parsed(signatures):
+    """Enhanced transactions for up to HELIUS_PARSE_BATCH signatures, in order; None on upstream failure"""
+    data = helius_json(http_client.post, f"{HELIUS_API_BASE}/v0/transactions", "transactions",
+                       params={"api-key": HELIUS_API_KEY}, json={"transactions": signatures})
+    return data if data is None or isinstance(data, list) else []
+
+
+def iter_parsed_chunks(signatures):
+    """Yield enhanced-transaction pages for `signatures` in order, parsed concurrently (None for a failed chunk)"""
+    chunks = [signatures[i:i + HELIUS_PARSE_BATCH] for i in range(0, len(signatures), HELIUS_PARSE_BATCH)]
+    if len(chunks) <= 1:
+        yield from map(fetch_helius_parsed, chunks)
+        return
+    with ThreadPoolExecutor(max_workers=min(HELIUS_PARSE_WORKERS, len(chunks))) as pool:
+        yield from pool.map(instrumentation.propagate(fetch_helius_parsed), chunks)
+
+
+def fetch_recent_solana_serial(address, cursor):
+    """(txs, complete, more_pages) for the newest pages, chaining `before` from page to page"""
+    all_txs = []
+    last_signature = None
+    complete = True
+    more_pages = False
+    for page in range(SOL_RECENT_PAGES):
+        data = fetch_helius_page(address, before=last_signature, until=cursor)
+        if data is None:
+            complete = False
+            break
+        if not data:
+            break
+        all_txs.extend(data)
+        if len(data) < HELIUS_PAGE_SIZE:
+            break
+        last_signature = data[-1].get("signature")
+        more_pages = page == SOL_RECENT_PAGES - 1
+    return all_txs, complete, more_pages
+
+
+def fetch_recent_solana_parallel(address, cursor):
+    """(txs, complete, more_pages) for the newest pages: one signature listing, then concurrent parses"""
+    limit = SOL_RECENT_PAGES * HELIUS_PAGE_SIZE
+    # One extra signature tells whether older records remain beyond the window
+    signatures = fetch_solana_signatures(address, until=cursor, limit=limit + 1)
+    if signatures is None:
+        return [], False, False
+    more_pages = len(signatures) > limit
+    all_txs = []
+    for page in iter_parsed_chunks(signatures[:limit]):
+        if page is None:
+            # Keep only the contiguous newest prefix
+            return all_txs, False, more_pages
+        all_txs.extend(page)
+    return all_txs, True, more_pages
+
+
+@st.cache_data(ttl=300)
+@shared_cached("sol_transactions", ttl=300)
+@timed("fetch_solana")
+def get_solana_transactions(address):
+    """Fetch Solana transactions using Helius Enhanced Transactions API (with pagination)
+
+    Only signatures newer than the last synced one are requested (Helius `until`)
+    and merged into the stored history.
+    """
+    if not HELIUS_API_KEY:
+        return []
+
+    store = get_history_store()
+    cursor = store.get_cursor("solana", address, "tx")
+    fetch_recent = fetch_recent_solana_parallel if HELIUS_PARALLEL_PAGES else fetch_recent_solana_serial
+    all_txs, complete, more_pages = fetch_recent(address, cursor)
+
+    if not all_txs and not complete and cursor is None:
+        raise UpstreamError("Helius transactions unavailable")
+
+    newest = all_txs[0].get("signature") if all_txs else cursor
+    store.merge(
+        "solana", address, "tx",
+        [(tx.get("signature", ""), tx.get("timestamp", 0), tx) for tx in all_txs],
+        newest if complete else None,
+        # Still more than 300 newer records: the stored tail is no longer contiguous
+        replace=cursor is None or more_pages,
+    )
+    return store.load("solana", address, "tx")
+
+
+def parse_asset_metadata(asset):
+    """Extract {symbol, name} from a Helius DAS asset"""
+    token_info = asset.get("token_info", {})
+    metadata = asset.get("content", {}).get("metadata", {})
+    return {
+        "symbol": token_info.get("symbol") or metadata.get("symbol") or "",
+        "name": metadata.get("name") or ""
+    }
+
+
+def get_solana_token_metadata(mint):
+    """Fetch token symbol from Helius DAS API (getAsset); persisted per mint, failures are not cached"""
+    if not HELIUS_API_KEY or not mint:
+        return {}
+
+    cache = get_cache()
+    cached = cache.get("sol_token", mint)
+    if cached is not None:
+        return cached
+    
+    url = f"{HELIUS_RPC_URL}/?api-key={HELIUS_API_KEY}"
+    payload = {
+        "jsonrpc": "2.0",
+        "id": "get-token-metadata",
+        "method": "getAsset",
+        "params": {"id": mint}
+    }
+    
+    try:
+        res = http_client.post(url, json=payload, timeout=5)
+        body = res.json() if res.status_code == 200 else {}
+        if body.get("result"):
+            meta = parse_asset_metadata(body["result"])
+            cache.set("sol_token", mint, meta, TOKEN_METADATA_TTL)
+            return meta
+        if "result" in body:
+            # The node answered: no such asset; remember the miss for a shorter period
+            cache.set("sol_token", mint, {"symbol": "", "name": ""}, TOKEN_METADATA_MISS_TTL)
+    except Exception:
+        pass
+    return {}
+
+
+@timed("solana_token_symbols")
+def get_solana_token_symbols(mints):
+    """Resolve symbols for many mints with Helius DAS getAssetBatch -> {mint: symbol}
+
+    Not memoised beyond the per-mint persistent cache: a chunk that fails is
+    simply missing from the result and is asked for again on the next call.
+    """
+    if not HELIUS_API_KEY or not mints:
+        return {}
+
+    cache = get_cache()
+    metas = cache.get_many("sol_token", mints)
+    missing = [mint for mint in mints if mint not in metas]
+
+    url = f"{HELIUS_RPC_URL}/?api-key={HELIUS_API_KEY}"
+    for i in range(0, len(missing), SOL_ASSET_BATCH_SIZE):
+        chunk = missing[i:i + SOL_ASSET_BATCH_SIZE]
+        payload = {
+            "jsonrpc": "2.0",
+            "id": "get-token-metadata-batch",
+            "method": "getAssetBatch",
+            "params": {"ids": chunk}
+        }
+        try:
+            res = http_client.post(url, json=payload)
+            if res.status_code != 200:
+                continue
+            fetched = {}
+            for asset in res.json().get("result") or []:
+                # Unknown ids come back as null
+                if asset and asset.get("id"):
+                    fetched[asset["id"]] = parse_asset_metadata(asset)
+            # Remember unknown mints too, for a shorter period
+            unknown = {mint: {"symbol": "", "name": ""} for mint in chunk if mint not in fetched}
+            cache.set_many("sol_token", fetched, TOKEN_METADATA_TTL)
+            cache.set_many("sol_token", unknown, TOKEN_METADATA_MISS_TTL)
+            metas.update(fetched)
+            metas.update(unknown)
+        except Exception:
+            continue
+    return {mint: meta.get("symbol", "") for mint, meta in metas.items()}
+
+
+def collect_solana_mints(txs):
+    """Distinct SPL mints across a batch of Helius transactions (WSOL excluded)"""
+    mints = set()
+    for tx in txs:
+        for transfer in tx.get("tokenTransfers") or []:
+            mint = transfer.get("mint")
+            if mint and mint != SOL_WSOL_MINT:
+                mints.add(mint)
+    return mints
+
+
+def interpret_solana_tx(tx, address, token_symbols=None):
+    """Interpret a Helius enhanced transaction as a TxRecord (net balance changes of `address`)
+
+    token_symbols: pre-resolved {mint: symbol}; when given, no network I/O is done here.
+    """
+    record = TxRecord("solana", tx.get("signature", ""), int(tx.get("timestamp", 0)), "error")
+    try:
+        # Check for staking indicators in instructions first
+        instructions = tx.get("instructions", [])
+        is_staking_program = False
+        for instr in instructions:
+            if instr.get("programId") in SOL_STAKING_ENTITIES:
+                is_staking_program = True
+                break
+
+        # Net balance tracking: {mint_or_sol: net_amount}
+        net_balances = {}
+        # The other side of the wallet's transfers: {"out": recipients, "in": senders}
+        peers = {"out": set(), "in": set()}
+        token_transfers = tx.get("tokenTransfers", [])
+        # SOL paid to a token account is rent for creating it, not a payment to a peer
+        token_accounts = {transfer.get(side) for transfer in token_transfers
+                          for side in ("fromTokenAccount", "toTokenAccount")}
+
+        # Analyze native transfers (SOL)
+        native_transfers = tx.get("nativeTransfers", [])
+        for transfer in native_transfers:
+            from_addr = transfer.get("fromUserAccount", "")
+            to_addr = transfer.get("toUserAccount", "")
+            amount = transfer.get("amount", 0) / 1e9
+            if amount <= 0: continue
+
+            if from_addr == address:
+                net_balances["SOL_NATIVE"] = net_balances.get("SOL_NATIVE", 0) - amount
+                if to_addr and to_addr != address and to_addr not in token_accounts:
+                    peers["out"].add(to_addr)
+            if to_addr == address:
+                net_balances["SOL_NATIVE"] = net_balances.get("SOL_NATIVE", 0) + amount
+                if from_addr and from_addr != address and from_addr not in token_accounts:
+                    peers["in"].add(from_addr)
+
+        # Analyze token transfers
+        for transfer in token_transfers:
+            from_addr = transfer.get("fromUserAccount", "")
+            to_addr = transfer.get("toUserAccount", "")
+            amount = transfer.get("tokenAmount", 0)
+            if amount <= 0: continue
+
+            mint = transfer.get("mint", "")
+            # We treat them as separate keys in net_balances to avoid summing Native + Wrapped
+            if from_addr == address:
+                net_balances[mint] = net_balances.get(mint, 0) - amount
+                if to_addr and to_addr != address:
+                    peers["out"].add(to_addr)
+            if to_addr == address:
+                net_balances[mint] = net_balances.get(mint, 0) + amount
+                if from_addr and from_addr != address:
+                    peers["in"].add(from_addr)
+
+        # Summarize net changes by symbol
+        sent_dict = {}     # {symbol: amount}
+        received_dict = {} # {symbol: amount}
+        
+        for mint, net_val in net_balances.items():
+            if abs(net_val) < 0.000001: continue # Filter out dust
+
+            if mint == "SOL_NATIVE":
+                symbol = "SOL"
+            elif mint == SOL_WSOL_MINT:
+                symbol = "WSOL"  # Keep separate from native SOL
+            elif token_symbols is not None:
+                symbol = token_symbols.get(mint) or format_address(mint) or "Token"
+            else:
+                meta = get_solana_token_metadata(mint)
+                symbol = meta.get("symbol") or format_address(mint) or "Token"
+            
+            if net_val < 0:
+                sent_dict[symbol] = sent_dict.get(symbol, 0) + abs(net_val)
+            else:
+                received_dict[symbol] = received_dict.get(symbol, 0) + abs(net_val)
+
+        # Legs and the leading asset; summaries are built at render time
+        record.legs = tuple(("out", sym, amt) for sym, amt in sent_dict.items()) + \
+            tuple(("in", sym, amt) for sym, amt in received_dict.items())
+        if record.legs:
+            side, record.asset, record.amount = record.legs[0]
+            record.direction = side if not (sent_dict and received_dict) else None
+
+        # --- Interpretation Logic Priority ---
+        
+        tx_type = tx.get("type", "UNKNOWN")
+        # Original case is kept for display: lowercasing would break the base58 address matches
+        description = tx.get("description") or ""
+        keywords = description.lower()
+
+        # 1. Swap detection (Sent AND Received)
+        if (sent_dict and received_dict) or tx_type == "SWAP":
+            if sent_dict and received_dict:
+                record.kind = "swap"
+                return record
+            elif sent_dict:
+                record.kind = "sell"
+                return record
+            elif received_dict:
+                record.kind = "buy"
+                return record
+
+        # 2. Staking Detection
+        is_staking = (
+            tx_type in ["STAKE", "UNSTAKE"] or
+            "stake" in keywords or
+            "deposit" in keywords or
+            is_staking_program
+        )
+
+        if is_staking:
+            # Check if it's primarily unstaking
+            unstaking = tx_type == "UNSTAKE" or (received_dict and not sent_dict and any(key in SOL_STAKING_ENTITIES for key in net_balances))
+            record.kind = "unstake" if unstaking else "stake"
+            return record
+
+        # 3. Simple Transfer Fallback (counterparty only when there is exactly one)
+        if sent_dict or received_dict:
+            record.kind = "send" if sent_dict else "receive"
+            others = peers["out" if sent_dict else "in"]
+            if len(others) == 1:
+                record.counterparty = next(iter(others))
+            return record
+        
+        # 4. Final Fallback to Helius description or type
+        record.legs = None
+        if description:
+            record.kind, record.note = "other", description
+        else:
+            record.kind, record.note = "unknown", tx_type
+        return record
+    except Exception as e:
+        record.kind, record.note, record.legs = "error", str(e), None
+        return record
+
+
+# ============================================================
+# Vectorised parsing helpers
+# ============================================================
+# Strings int() accepts (pd.to_numeric alone would also take '12.5' or '1e3')
+INT_PATTERN = r"\s*[+-]?\d+\s*"
+# Above this a double's ulp is coarser than the 4 displayed decimals
+EXACT_AMOUNT_LIMIT = 2.0 ** 38
+
+
+def parse_ints(values):
+    """Series of integer strings -> float Series, NaN wherever int() would fail"""
+    raw = values.astype(str)
+    return raw.where(raw.str.fullmatch(INT_PATTERN), "nan").astype(float)
+
+
+def scale_amounts(raw, decimals):
+    """Integer strings / 10**decimals as floats (NaN where unparsable)
+
+    Float division agrees with int(value) / 10 ** int(decimals) to well below
+    display precision; only rows where it may not (10**decimals not exact in
+    a double, amounts whose ulp exceeds 4 decimals, overflow) are divided as
+    Python ints.
+    """
+    raw = raw.astype(str)
+    if isinstance(decimals, int):
+        decimals = pd.Series(float(decimals), index=raw.index)
+    else:
+        decimals = parse_ints(decimals)
+    scaled = parse_ints(raw) / 10.0 ** decimals
+    exact = (decimals > 22) | (decimals < 0) | ~(scaled.abs() < EXACT_AMOUNT_LIMIT)
+    exact &= raw.str.fullmatch(INT_PATTERN) & decimals.notna()
+    if exact.any():
+        scaled[exact] = [int(v) / 10 ** int(d) for v, d in zip(raw[exact], decimals[exact])]
+    return scaled
+
+
+def optional(values):
+    """Series -> list with missing values as None"""
+    return values.astype(object).where(values.notna(), None).tolist()
+
+
+# ============================================================
+# Transaction Processing Helpers
+# ============================================================
+@timed("interpret_eth")
+def interpret_eth_transfers(eth_txs, address, chainid=1):
+    """TxRecords for native ETH transfers (txlist records), in input order
+
+    Vectorised: scaling, direction and staking lookup are column operations
+    over the whole batch. Other EVM chains get their own chain name and
+    native symbol; the staking contracts are mainnet addresses.
+    """
+    df = pd.DataFrame.from_records(eth_txs, columns=["timeStamp", "hash", "from", "to", "value"])
+    ts = parse_ints(df["timeStamp"])
+    keep = ts.notna() & df["hash"].notna()
+    if not keep.any():
+        return []
+    df, ts = df[keep], ts[keep].astype("int64")
+
+    addr = address.lower()
+    amount = scale_amounts(df["value"].fillna(0), 18).fillna(0)
+    from_addr = df["from"].fillna("").astype(str).str.lower()
+    to_addr = df["to"].fillna("").astype(str).str.lower()
+    outgoing = from_addr == addr
+    chain, native = evm_chain(chainid)
+    staking = ETH_STAKING_CONTRACTS if chainid == 1 else {}
+    stake_to = to_addr.map(staking)
+    stake_from = from_addr.map(staking)
+
+    stake = outgoing & stake_to.notna()
+    unstake = ~outgoing & stake_from.notna()
+    kind = np.select([stake, outgoing, unstake], ["stake", "send", "unstake"], "receive")
+    direction = np.where(outgoing, "out", "in")
+    counterparty = to_addr.where(outgoing, from_addr)
+    protocol = optional(stake_to.where(stake, stake_from.where(unstake)))
+    return [
+        TxRecord(chain, h, t, k, d, native, a, c, None, n)
+        for h, t, k, d, a, c, n in zip(
+            df["hash"].astype(str).tolist(), ts.tolist(), kind.tolist(), direction.tolist(),
+            amount.tolist(), counterparty.tolist(), protocol,
+        )
+    ]
+
+
+@timed("interpret_eth_tokens")
+def interpret_eth_token_transfers(token_txs, address, chainid=1):
+    """TxRecords for ERC-20 transfers (tokentx records), folding same-hash legs into swaps
+
+    All legs of a transaction must be in the same batch for swap detection.
+    Records come out grouped by hash in first-appearance order; a hash whose
+    legs both send and receive becomes one swap record, other legs are listed
+    singly.
+    """
+    df = pd.DataFrame.from_records(
+        token_txs, columns=["timeStamp", "hash", "from", "to", "value", "tokenDecimal", "tokenSymbol"]
+    )
+    df = df[df["hash"].notna()].reset_index(drop=True)
+    if df.empty:
+        return []
+
+    addr = address.lower()
+    scaled = scale_amounts(df["value"].fillna(0), df["tokenDecimal"].fillna(18))
+    ts_leg = parse_ints(df["timeStamp"].fillna(0))  # swap legs default to 0
+    ts_row = parse_ints(df["timeStamp"])            # single rows need the field
+    from_raw = df["from"].fillna("").astype(str)
+    to_raw = df["to"].fillna("").astype(str)
+    sent = from_raw.str.lower() == addr
+    received = ~sent & (to_raw.str.lower() == addr)
+
+    groups = df.groupby("hash", sort=False)
+    group_no = groups.ngroup()
+
+    # Swap legs: multi-transfer hashes whose value and timestamp parse
+    valid = (groups["hash"].transform("size") >= 2) & scaled.notna() & ts_leg.notna()
+    legs = pd.DataFrame({
+        "hash": df["hash"], "_ts": ts_leg, "_sent": sent, "_received": received,
+        "_symbol": df["tokenSymbol"].fillna("Token").astype(str), "_amount": scaled,
+    })[valid]
+    # A swap both sends and receives; only those hashes need their legs collected
+    is_swap = legs.groupby("hash", sort=False)[["_sent", "_received"]].transform("any").all(axis=1)
+    legs = legs[is_swap]
+    swap_ts = legs.groupby("hash", sort=False)["_ts"].last().astype("int64").to_dict()
+    swap_legs = {}  # hash -> (sent legs, received legs), in row order
+    moved = legs[legs["_sent"] | legs["_received"]]
+    for h, is_sent, symbol, amount in zip(moved["hash"].tolist(), moved["_sent"].tolist(),
+                                          moved["_symbol"].tolist(), moved["_amount"].tolist()):
+        out, into = swap_legs.setdefault(h, ([], []))
+        (out if is_sent else into).append(("out" if is_sent else "in", symbol, amount))
+
+    # Each swap is emitted at its hash's first row, every other row on its own
+    single = ~df["hash"].isin(swap_legs) & ts_row.notna()
+    first_row = ~df["hash"].duplicated()
+    rows = df.index[single | (first_row & df["hash"].isin(swap_legs))]
+    rows = rows[np.argsort(group_no[rows].to_numpy(), kind="stable")]
+
+    chain = evm_chain(chainid)[0]
+    hashes = df["hash"].tolist()
+    stamps = ts_row.fillna(0).astype("int64").tolist()
+    symbols = df["tokenSymbol"].fillna("").astype(str).tolist()
+    amounts = scaled.fillna(0).tolist()
+    sent_rows = sent.tolist()
+    senders, recipients = from_raw.tolist(), to_raw.tolist()
+    records = []
+    for i in rows.tolist():
+        h = hashes[i]
+        if h in swap_legs:
+            out, into = swap_legs[h]
+            _, asset, value = out[0]
+            records.append(TxRecord(chain, str(h), swap_ts[h], "swap", None, asset, value,
+                                    legs=tuple(out + into)))
+        elif sent_rows[i]:
+            records.append(TxRecord(chain, str(h), stamps[i], "token_send", "out",
+                                    symbols[i], amounts[i], recipients[i]))
+        else:
+            records.append(TxRecord(chain, str(h), stamps[i], "token_receive", "in",
+                                    symbols[i], amounts[i], senders[i]))
+    return records
+
+
+def index_activity(address, records, complete=True):
+    """Add a wallet's records to the cross-wallet activity index and return them unchanged
+
+    complete=False: a capped list whose oldest transaction may be missing legs (see ActivityIndex.add)
+    """
+    with instrumentation.span("index_activity"):
+        get_activity_index().add(address, records, complete)
+    return records
+
+
+def evm_chain_records(address, chainid=1):
+    """Latest 300 native + ERC-20 TxRecords of one EVM chain, newest first"""
+    eth_txs, token_txs = get_eth_transactions_detailed(address) if chainid == 1 else get_evm_transactions(address, chainid)
+    records = interpret_eth_transfers(eth_txs[:300], address, chainid)
+    records += interpret_eth_token_transfers(token_txs[:300], address, chainid)
+    return newest_first(records, 300)
+
+
+@timed("process_ethereum")
+def process_ethereum_transactions(address):
+    """Latest 300 ETH + ERC-20 TxRecords, newest first"""
+    return index_activity(address, evm_chain_records(address), complete=False)
+
+
+def active_chain_records(address, chainid):
+    """evm_chain_records, or [] without fetching when the probe finds no activity"""
+    if probe_evm_activity(address, chainid) is False:
+        return []
+    return evm_chain_records(address, chainid)
+
+
+@timed("process_evm")
+def process_evm_transactions(address, chain_ids=EVM_CHAIN_IDS):
+    """(records, failed chain ids): one 0x address's TxRecords across several EVM chains, merged newest first
+
+    Each chain is probed and, if active, fetched on its own worker (all
+    within the shared Etherscan quota); record.chain names the network. A
+    failing chain (Etherscan down, or the chain not on this API plan) is left
+    out and listed in failed; UpstreamError only if every chain failed.
+    """
+    chain_ids = list(dict.fromkeys(chain_ids))
+    with ThreadPoolExecutor(max_workers=EVM_FANOUT_WORKERS) as pool:
+        futures = [pool.submit(instrumentation.propagate(active_chain_records), address, c) for c in chain_ids]
+        streams, failed = [], []
+        for chainid, fut in zip(chain_ids, futures):
+            try:
+                streams.append(fut.result())
+            except UpstreamError:
+                failed.append(chainid)
+    if chain_ids and len(failed) == len(chain_ids):
+        raise UpstreamError(f"Etherscan unavailable for chains {failed}")
+    records = list(heapq.merge(*streams, key=by_timestamp, reverse=True))
+    return index_activity(address, records, complete=False), failed
+
+
+@timed("interpret_solana")
+def interpret_solana_batch(txs, address):
+    """TxRecords for a batch of Helius transactions, in input order"""
+    records = []
+    # Resolve every mint in the batch up front so the loop does no network I/O
+    token_symbols = get_solana_token_symbols(tuple(sorted(collect_solana_mints(txs))))
+    for tx in txs:
+        try:
+            records.append(interpret_solana_tx(tx, address, token_symbols))
+        except (ValueError, TypeError, KeyError):
+            continue
+    return records
+
+
+@timed("process_solana")
+def process_solana_transactions(address):
+    """Solana TxRecords, newest first"""
+    return index_activity(address, newest_first(interpret_solana_batch(get_solana_transactions(address), address)))
+
+
+@timed("interpret_bitcoin")
+def interpret_bitcoin_batch(btc_txs, owned):
+    """TxRecords for a batch of Blockchain.info transactions, in input order
+
+    owned: the wallet's address (or xpub) or an iterable of addresses treated as one wallet
+    """
+    owned = owned_bitcoin_addresses(owned)
+    records = []
+    for tx in btc_txs:
+        try:
+            records.append(interpret_bitcoin_tx(tx, owned))
+        except (ValueError, TypeError, KeyError):
+            continue
+    return records
+
+
+@timed("process_bitcoin")
+def process_bitcoin_transactions(address, owned=None):
+    """Bitcoin TxRecords, newest first
+
+    owned: other addresses of the same wallet (e.g. a portfolio's BTC
+    addresses), so transfers between them show as internal
+    """
+    owned = owned_bitcoin_addresses(owned or ()) | {address}
+    return index_activity(address, newest_first(interpret_bitcoin_batch(get_bitcoin_transactions(address), owned)))
+
+
+EVM_CHAIN_NAMES = {evm_chain(c)[0] for c in (*EVM_CHAINS, *EVM_CHAIN_IDS)}
+
+TX_PROCESSORS = {
+    "ethereum": process_ethereum_transactions,
+    "solana": process_solana_transactions,
+    "bitcoin": process_bitcoin_transactions,
+}
+
+# Raw (cached) history fetchers behind each processor, for cache warming
+TX_FETCHERS = {
+    "ethereum": get_eth_transactions_detailed,
+    "solana": get_solana_transactions,
+    "bitcoin": get_bitcoin_transactions,
+}
+
+
+# ============================================================
+# Deep History (streaming pagination)
+# ============================================================
+def iter_etherscan_pages(address, action, page_size=DEEP_ETHERSCAN_PAGE):
+    """Yield pages of Etherscan records, newest first, until the history is exhausted
+
+    Etherscan caps page * offset at 10k records, so paging walks `endblock`
+    downwards instead. The oldest block of each page may be cut off, so it is
+    deferred to the next request; every yielded page holds whole blocks, which
+    keeps all legs of a token swap together.
+    """
+    endblock = None
+    while True:
+        page = fetch_etherscan_list(address, action, endblock=endblock, offset=page_size)
+        if page is None:
+            raise UpstreamError(f"Etherscan {action} unavailable")
+        if len(page) < page_size:
+            if page:
+                yield page
+            return
+        oldest = int(page[-1].get("blockNumber", 0))
+        whole_blocks = [tx for tx in page if int(tx.get("blockNumber", 0)) > oldest]
+        if whole_blocks:
+            yield whole_blocks
+            endblock = oldest
+        else:
+            # A single block fills the whole page: emit it and step past it
+            yield page
+            endblock = oldest - 1
+        if endblock < 0:
+            return
+
+
+def iter_helius_pages(address):
+    """Yield pages of Helius enhanced transactions, newest first, until the history is exhausted"""
+    if not HELIUS_API_KEY:
+        return
+    if HELIUS_PARALLEL_PAGES:
+        yield from iter_helius_pages_parallel(address)
+        return
+    before = None
+    while True:
+        data = fetch_helius_page(address, before=before)
+        if data is None:
+            raise UpstreamError("Helius transactions unavailable")
+        if not data:
+            return
+        yield data
+        if len(data) < HELIUS_PAGE_SIZE:
+            return
+        before = data[-1].get("signature")
+
+
+def iter_helius_pages_parallel(address):
+    """iter_helius_pages via 1000-signature listings, each parsed in concurrent chunks"""
+    before = None
+    while True:
+        signatures = fetch_solana_signatures(address, before=before)
+        if signatures is None:
+            raise UpstreamError("Helius signatures unavailable")
+        if not signatures:
+            return
+        for page in iter_parsed_chunks(signatures):
+            if page is None:
+                raise UpstreamError("Helius transactions unavailable")
+            if page:
+                yield page
+        if len(signatures) < HELIUS_SIGNATURE_PAGE:
+            return
+        before = signatures[-1]
+
+
+def iter_bitcoin_pages(address, page_size=DEEP_BTC_PAGE):
+    """Yield pages of Blockchain.info transactions, newest first, by offset"""
+    offset = 0
+    while True:
+        data = fetch_bitcoin_page(address, page_size, offset)
+        if data is None:
+            raise UpstreamError("Blockchain.info rawaddr unavailable")
+        txs = data.get("txs", [])
+        if not txs:
+            return
+        yield txs
+        offset += len(txs)
+        if offset >= data.get("n_tx", 0):
+            return
+
+
+def iter_ethereum_activity(address):
+    """ETH + ERC-20 TxRecords for the full history, newest first, interpreted page by page"""
+    def stream(action, interpret):
+        for page in iter_etherscan_pages(address, action):
+            yield from newest_first(interpret(page, address))
+
+    # Both streams are already newest-first: merge them lazily
+    yield from heapq.merge(
+        stream("txlist", interpret_eth_transfers),
+        stream("tokentx", interpret_eth_token_transfers),
+        key=by_timestamp,
+        reverse=True,
+    )
+
+
+def iter_solana_activity(address):
+    """Solana TxRecords for the full history, newest first, interpreted page by page"""
+    for page in iter_helius_pages(address):
+        yield from interpret_solana_batch(page, address)
+
+
+def iter_bitcoin_activity(address):
+    """Bitcoin TxRecords for the full history, newest first, interpreted page by page"""
+    for page in iter_bitcoin_pages(address):
+        yield from interpret_bitcoin_batch(page, address)
+
+
+DEEP_ITERATORS = {
+    "ethereum": iter_ethereum_activity,
+    "solana": iter_solana_activity,
+    "bitcoin": iter_bitcoin_activity,
+}
+
+
+def iter_activity_pages(addr_type, address, page_size=500, max_records=None):
+    """Group a chain's deep-history TxRecords into display pages of page_size records
+
+    Each page is indexed as it is read, except the records at its oldest
+    timestamp: a transaction's legs may continue on the next page, so those
+    are indexed together with it.
+    """
+    rows = DEEP_ITERATORS[addr_type](address)
+    if max_records:
+        rows = islice(rows, max_records)
+    page, held, total = [], [], 0
+    for row in rows:
+        page.append(row)
+        total += 1
+        if len(page) == page_size:
+            batch = held + page
+            oldest = min(r.timestamp for r in batch)
+            held = [r for r in batch if r.timestamp == oldest]
+            index_activity(address, [r for r in batch if r.timestamp != oldest])
+            yield page
+            page = []
+    # Stopping at max_records may cut the last transaction short
+    index_activity(address, held + page, complete=not max_records or total < max_records)
+    if page:
+        yield page